@@ -0,0 +1,340 @@
+"""Headless access-control flow: authentication, appliances, power and faults
+
+The Streamlit app and the simulator drive the same AccessController. It holds
+one site's system status and appliance states, writes every event through the
+shared log writer and raises every alert through an AlertEngine. All times come
+from its clock, so a simulator can run it on a virtual clock. Nothing here
+touches the UI: methods return outcomes and the caller decides what to show.
+"""
+import time
+import datetime
+import metrics
+from alert_engine import AlertEngine
+from decision import SequentialDecision, MATCH_TOLERANCE, ACCEPT_VOTES, MAX_FRAMES, TIME_BUDGET
+from face_gallery import UNKNOWN_NAME
+from liveness import LivenessCheck
+from unknown_faces import UnknownFaceClusters
+
+# Access Control Configuration
+FALLBACK_PIN = "123456"  # Default PIN for fallback access
+RFID_DATABASE = {"card1": "Admin", "card2": "Guest"}  # Simulated RFID database
+BATTERY_SECONDS = 300  # Battery backup runtime after a power outage
+FAULT_LIMIT = 3  # Camera faults that raise a critical alert and trigger self-healing
+BATTERY_LOCKED = ("Light", "Smart TV")  # Appliances that cannot be switched on battery
+APPLIANCE_EVENTS = {
+    "Light": ("Light turned OFF", "Light turned ON"),
+    "Security System": ("Security system DISARMED", "Security system ARMED"),
+    "Smart TV": ("TV turned OFF", "TV turned ON"),
+}
+
+
+class AccessController:
+    """One site's access-control state and actions, independent of the UI
+
+    `notify(message, level)` is called once for every new (not coalesced or
+    rate-limited) alert, e.g. to show a toast. `status` and `appliances` may be
+    passed in to share existing dicts with the caller.
+    """
+
+    def __init__(self, writer, alerts=None, unknown_faces=None, clock=time.time, notify=None,
+                 status=None, appliances=None, pin=FALLBACK_PIN, rfid_cards=None,
+                 battery_seconds=BATTERY_SECONDS, fault_limit=FAULT_LIMIT):
+        self.writer = writer
+        self.clock = clock
+        self.alerts = alerts if alerts is not None else AlertEngine(clock=clock)
+        self.unknown_faces = unknown_faces if unknown_faces is not None else UnknownFaceClusters(clock=clock)
+        self.notify = notify
+        self.pin = pin
+        self.rfid_cards = RFID_DATABASE if rfid_cards is None else rfid_cards
+        self.battery_seconds = battery_seconds
+        self.fault_limit = fault_limit
+        self.status = status if status is not None else {
+            "uptime": clock(),
+            "battery_backup": False,
+            "last_self_heal": None,
+            "faults": 0,
+            "battery_depletion_time": None  # Track when battery will deplete
+        }
+        self.appliances = appliances if appliances is not None else {name: False for name in APPLIANCE_EVENTS}
+
+    # Event Logging
+    def log_event(self, event_type, details, user="System"):
+        """Queue one event for the background writer (never blocks)"""
+        timestamp = datetime.datetime.fromtimestamp(self.clock()).strftime("%Y-%m-%d %H:%M:%S")
+        self.writer.write((timestamp, event_type, user, details))
+
+    def send_alert(self, message, level="warning", alert_type=None, camera=None, track=None):
+        """Raise an alert, returns True for a new alert and False for a repeat or a rate-limited one"""
+        alert, is_new = self.alerts.raise_alert(alert_type or message, message, level, camera=camera, track=track)
+        if is_new and self.notify is not None:
+            self.notify(message, level)
+        return is_new
+
+    # Fallback Authentication
+    def pin_attempt(self, pin):
+        """Check a fallback PIN; returns True if access is granted"""
+        if pin == self.pin:
+            self.log_event("Access", "PIN authentication successful")
+            return True
+        self.log_event("Security Alert", "Invalid PIN attempt")
+        self.send_alert("Invalid PIN attempt detected", "warning")
+        return False
+
+    def rfid_attempt(self, card):
+        """Check an RFID card; returns its user, or None if the card is not registered"""
+        user = self.rfid_cards.get(card)
+        if user:
+            self.log_event("Access", f"RFID authentication successful: {user}")
+            return user
+        self.log_event("Security Alert", "Invalid RFID card used")
+        self.send_alert("Unauthorized RFID access attempt", "warning")
+        return None
+
+    def start_authentication(self, camera, **options):
+        """Begin a face authentication attempt on one camera; see FaceAuthentication"""
+        return FaceAuthentication(self, camera, **options)
+
+    # Appliance Control
+    def control(self, appliance, state):
+        """Switch an appliance; returns False if battery mode keeps it from being switched"""
+        if self.status["battery_backup"] and appliance in BATTERY_LOCKED:
+            return False
+        self.appliances[appliance] = state
+        self.log_event("Appliance Control", APPLIANCE_EVENTS[appliance][bool(state)])
+        return True
+
+    def _switch_off(self, appliances):
+        for appliance in appliances:
+            if self.appliances[appliance]:
+                self.appliances[appliance] = False
+                self.log_event("Appliance Control", APPLIANCE_EVENTS[appliance][False])
+
+    # Battery Backup
+    def power_outage(self):
+        """Switch to battery backup and shed non-essential devices; False if already on battery"""
+        if self.status["battery_backup"]:
+            return False
+        self.status["battery_backup"] = True
+        self.status["battery_depletion_time"] = self.clock() + self.battery_seconds
+        self.send_alert("Power outage detected! Switching to battery backup", "critical")
+        self.log_event("System Event", "Power failure - battery backup activated")
+
+        # Disable non-essential features
+        if self.appliances["Smart TV"]:
+            self._switch_off(["Smart TV"])
+            self.send_alert("Non-essential devices disabled to conserve power", "warning")
+        return True
+
+    def restore_power(self):
+        """Back to main power; False if the system was not on battery"""
+        if not self.status["battery_backup"]:
+            return False
+        self.status["battery_backup"] = False
+        self.status["battery_depletion_time"] = None
+        self.log_event("System Event", "Power restored")
+        self.send_alert("Main power restored", "info")
+        return True
+
+    def check_battery(self):
+        """Shut everything down once the battery runs out; returns True on depletion"""
+        depletion_time = self.status["battery_depletion_time"]
+        if not self.status["battery_backup"] or not depletion_time or self.clock() < depletion_time:
+            return False
+        self.status["battery_backup"] = False
+        self.status["battery_depletion_time"] = None
+        self.send_alert("Battery depleted! System shutting down", "critical")
+        self.log_event("System Event", "Battery depleted - system shutdown")
+        self._switch_off(list(self.appliances))
+        return True
+
+    # Fault Tolerance
+    def self_heal(self):
+        """Simulate self-healing capabilities"""
+        self.log_event("System Event", "Self-healing initiated")
+        self.status["faults"] = 0
+        self.status["last_self_heal"] = self.clock()
+
+        # Simulate recovery actions
+        if not self.status["battery_backup"]:
+            self.status["battery_backup"] = True
+            self.send_alert("System recovered from fault condition", "info")
+
+        self.log_event("System Event", "Self-healing completed successfully")
+
+    def camera_failure(self):
+        """Count a camera fault; the fault limit raises a critical alert and self-heals"""
+        self.log_event("System Error", "Camera failure detected")
+        self.status["faults"] += 1
+        if self.status["faults"] >= self.fault_limit:
+            self.send_alert("Critical hardware failure detected", "critical")
+            self.self_heal()
+
+    def uptime(self):
+        return self.clock() - self.status["uptime"]
+
+
+def face_area(face):
+    top, right, bottom, left = face["location"]
+    return (bottom - top) * (right - left)
+
+
+class FaceAuthentication:
+    """One face authentication attempt, fed frame by frame from any camera source
+
+    process() takes each BGR frame (before overlays are drawn) with its faces as
+    {"location", "name", "distance", "encoding", "landmarks", "track"} dicts (name
+    None for faces the quality gate skipped). It checks liveness on the largest
+    named face, restarting it whenever the name or tracked face changes, opens an intruder incident for every clear stranger and returns True
+    once the attempt is over. finish() then logs and alerts the outcome; access
+    is only granted when the face proven live is the one recognized.
+    """
+
+    def __init__(self, controller, camera, tolerance=MATCH_TOLERANCE, accept_votes=ACCEPT_VOTES,
+                 max_frames=MAX_FRAMES, time_budget=TIME_BUDGET, liveness=True):
+        self.controller = controller
+        self.camera = camera
+        self.time_budget = time_budget
+        # Access needs several agreeing frames; a steady stranger ends the attempt early
+        self.decider = SequentialDecision(tolerance=tolerance, accept_votes=accept_votes, max_frames=max_frames,
+                                          time_budget=time_budget, clock=controller.clock)
+        if liveness:
+            self.liveness = LivenessCheck()
+            self.live_state, self.live_reason = "pending", None
+        else:
+            self.liveness = None
+            self.live_state, self.live_reason = "live", "disabled"
+        self.decision = None
+        self.candidate = None
+        self.live_identity = None  # (name, track) of the face the liveness evidence belongs to
+        self.incidents = set()
+        self.done = False
+
+    def process(self, frame, faces):
+        """Add one frame; returns True when the attempt has its answer"""
+        if self.done:
+            return True
+        named = [face for face in faces if face["name"] not in (None, UNKNOWN_NAME)]
+        self.candidate = max(named, key=face_area, default=None)
+        if self.liveness is not None and self.candidate is not None:
+            # Evidence only counts for the identity it was gathered on
+            identity = (self.candidate["name"], self.candidate.get("track"))
+            if identity != self.live_identity:
+                self.liveness.reset()
+                self.live_identity = identity
+            self.live_state, self.live_reason = self.liveness.update(frame, self.candidate["location"],
+                                                                     self.candidate.get("landmarks"))
+
+        for face in faces:
+            if face["name"] is None:
+                continue  # Skipped by the quality gate: no vote, no intruder alert
+
+            # Group clear strangers into incidents, alert and log once per incident
+            if self.decider.is_stranger(face["name"], face["distance"]):
+                with metrics.timer("log"):
+                    self._intruder(face, frame)
+
+        self.decision = self.decider.update([(face["name"], face["distance"]) for face in faces
+                                             if face["name"] is not None])
+
+        # A match still waits for liveness evidence, within the same time budget
+        if self.live_state == "spoof":
+            self.done = True
+        elif self.decision is not None and (self.decision["outcome"] != "accept"
+                                            or self.verified(self.decision["name"])
+                                            or self.decider.clock() - self.decider.started >= self.time_budget):
+            self.done = True
+        return self.done
+
+    def verified(self, name):
+        """True if the live face is the one recognized as name"""
+        if self.liveness is None:
+            return True
+        return self.live_state == "live" and self.live_identity is not None and self.live_identity[0] == name
+
+    def _intruder(self, face, frame):
+        controller = self.controller
+        incident, is_new = controller.unknown_faces.add(face["encoding"], frame, face["location"], self.camera)
+        self.incidents.add(incident["id"])
+        # Every new incident is audited; only the notification is throttled
+        if is_new:
+            controller.log_event("Security Alert", f"Unauthorized face detected (incident #{incident['id']})")
+        controller.send_alert(f"Intruder alert! Unknown face detected (incident #{incident['id']})",
+                              "critical", alert_type="intruder", camera=self.camera, track=incident["id"])
+
+    def finish(self):
+        """Log and alert the outcome; returns {"outcome", "name", "reason", "decision"}
+
+        outcome is "granted", "spoof" (liveness failed), "not_live" (matched but
+        liveness never confirmed), "unknown" (a consistent stranger) or "no_match".
+        """
+        controller, decision = self.controller, self.decision
+        summary = f"{decision['frames']} frames, {decision['elapsed']:.1f}s" if decision else "no frames"
+        if self.live_state == "spoof":
+            claimed = self.candidate["name"] if self.candidate is not None else "unknown"
+            controller.log_event("Security Alert", f"Spoofing attempt as {claimed}: {self.live_reason} ({summary})")
+            controller.send_alert(f"Spoofing attempt detected ({self.live_reason})", "critical",
+                                  alert_type="spoof", camera=self.camera)
+            return {"outcome": "spoof", "name": claimed, "reason": self.live_reason, "decision": decision}
+        if decision and decision["outcome"] == "accept" and not self.verified(decision["name"]):
+            controller.log_event("Access", f"Face authentication failed: {decision['name']} matched but liveness "
+                                           f"not confirmed ({summary})")
+            controller.send_alert("Authentication failed", "warning")
+            return {"outcome": "not_live", "name": decision["name"], "reason": None, "decision": decision}
+        if decision and decision["outcome"] == "accept":
+            controller.log_event("Access", f"Face authentication successful: {decision['name']} "
+                                           f"({decision['votes']} matching frames, mean distance "
+                                           f"{decision['mean_distance']:.2f}, liveness: {self.live_reason}, "
+                                           f"{summary})")
+            return {"outcome": "granted", "name": decision["name"], "reason": self.live_reason, "decision": decision}
+        outcome = "unknown" if decision and decision["outcome"] == "reject" else "no_match"
+        controller.log_event("Access", "Face authentication failed: "
+                                       f"{'unknown face' if outcome == 'unknown' else 'no confident match'} ({summary})")
+        controller.send_alert("Authentication failed", "warning")
+        return {"outcome": outcome, "name": None, "reason": None, "decision": decision}
+
+
+def recognize_frame(rgb_frame, tracker, gate, gallery, tolerance=MATCH_TOLERANCE):
+    """Detect, quality-gate, encode and match one RGB frame; returns the face dicts process() takes
+
+    Faces rejected by the quality gate have name None and a "quality" assessment instead.
+    """
+    # Imported here so the app can start before the face models have loaded
+    import face_recognition
+
+    # Find faces in the frame
+    with metrics.timer("detect"):
+        face_locations = tracker.update(rgb_frame)
+        track_ids = tracker.track_ids
+
+    # Skip faces too blurry, dark, small or turned away to recognize
+    with metrics.timer("quality"):
+        good_locations, assessments = gate.filter(rgb_frame, face_locations)
+
+    face_encodings, matches = [], []
+    if good_locations:
+        # Get face encodings
+        with metrics.timer("encode"):
+            face_encodings = face_recognition.face_encodings(rgb_frame, good_locations)
+
+        # Match every face in the frame against the gallery at once
+        with metrics.timer("match"):
+            matches = gallery.match(face_encodings, tolerance=tolerance)
+
+    # Counted here, where recognition runs: the service counts its own frames the same way
+    matched = sum(1 for name, _ in matches if name != UNKNOWN_NAME)
+    metrics.count("frames")
+    metrics.count("faces", len(face_locations))
+    metrics.count("matches", matched)
+    metrics.count("unknown_faces", len(matches) - matched)
+    recognized = iter(zip(matches, face_encodings))
+    faces = []
+    for location, assessment, track in zip(face_locations, assessments, track_ids):
+        if assessment is None or assessment["passed"]:
+            (name, distance), encoding = next(recognized)
+            faces.append({"location": location, "name": name, "distance": distance, "encoding": encoding,
+                          "landmarks": assessment["landmarks"] if assessment else None, "track": track})
+        else:
+            # Not recognized at all: no name, no vote, no intruder alert
+            faces.append({"location": location, "name": None, "distance": None, "encoding": None,
+                          "quality": assessment, "track": track})
+    return faces
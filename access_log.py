@@ -0,0 +1,201 @@
+import os
+import re
+import csv
+import gzip
+import queue
+import shutil
+import atexit
+import datetime
+import threading
+import time
+from event_store import EventStore
+
+# Log Writer Configuration
+LOG_QUEUE_SIZE = 10000  # Events buffered before new ones are dropped
+LOG_BATCH_SIZE = 200  # Flush once this many events are waiting
+LOG_FLUSH_INTERVAL = 1.0  # ...or this many seconds after the oldest one arrived
+LOG_MAX_BYTES = 5 * 1024 * 1024  # Rotate the CSV file at this size
+LOG_BACKUPS = 10  # Rotated files kept
+LOG_HEADER = ["Timestamp", "Event", "User", "Details"]
+
+
+class CsvLogSink:
+    """Appends event rows to a CSV file, rotating by size and by day"""
+
+    def __init__(self, path, max_bytes=LOG_MAX_BYTES, rotate_daily=True, compress=True, backups=LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.compress = compress
+        self.backups = backups
+
+    def _needs_rotation(self):
+        if not os.path.exists(self.path):
+            return False
+        stat = os.stat(self.path)
+        if self.max_bytes and stat.st_size >= self.max_bytes:
+            return True
+        if self.rotate_daily:
+            modified = datetime.date.fromtimestamp(stat.st_mtime)
+            return modified != datetime.date.today() and stat.st_size > 0
+        return False
+
+    def rotate(self):
+        """Move the current file aside (optionally gzipped) and prune old backups"""
+        # Microseconds keep names unique and in order when a burst rotates twice in one second
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        base, ext = os.path.splitext(self.path)
+        rotated = f"{base}.{stamp}{ext}"
+        counter = 1
+        while os.path.exists(rotated) or os.path.exists(rotated + ".gz"):
+            rotated = f"{base}.{stamp}-{counter}{ext}"
+            counter += 1
+        os.replace(self.path, rotated)
+        if self.compress:
+            with open(rotated, "rb") as src, gzip.open(rotated + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(rotated)
+        # Only prune names this method generates, never e.g. access_log.csv.bak or an import
+        directory = os.path.dirname(os.path.abspath(self.path))
+        pattern = re.compile(re.escape(os.path.basename(base)) + r"\.(\d{8}-\d{6}-\d{6})(?:-(\d+))?"
+                             + re.escape(ext) + r"(?:\.gz)?$")
+        backups = []
+        for name in os.listdir(directory):
+            match = pattern.match(name)
+            if match:
+                backups.append((match.group(1), int(match.group(2) or 0), name))
+        for _, _, name in sorted(backups)[:-self.backups] if self.backups else []:
+            os.remove(os.path.join(directory, name))
+
+    def write_batch(self, events):
+        if self._needs_rotation():
+            self.rotate()
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, "a", newline="") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(LOG_HEADER)
+            writer.writerows(events)
+
+    def close(self):
+        pass
+
+
+class AsyncLogWriter:
+    """Bounded queue drained by a background thread that writes events in batches
+
+    write() never blocks: when the queue is full the event is dropped and counted.
+    The queue is flushed on close(), which is registered to run at interpreter exit.
+    """
+
+    def __init__(self, sink, queue_size=LOG_QUEUE_SIZE, batch_size=LOG_BATCH_SIZE,
+                 flush_interval=LOG_FLUSH_INTERVAL):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_error = None
+        self._thread = threading.Thread(target=self._run, name="access-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, event):
+        """Queue one event row (timestamp, event_type, user, details)"""
+        if self._closed:
+            return False
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far is on disk"""
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        if self._closed:
+            return
+        self._closed = True
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return  # Writer is stuck (e.g. disk hung): don't block exit, and leave its sink open
+        self._thread.join(max(0.0, deadline - time.monotonic()))
+        if not self._thread.is_alive():
+            self.sink.close()
+
+    def _write(self, batch):
+        try:
+            self.sink.write_batch(batch)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.errors += 1
+            self.last_error = str(e)
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # Flush interval elapsed
+            if isinstance(item, tuple):
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) < self.batch_size:
+                    continue
+            if batch:
+                self._write(batch)
+                batch = []
+            deadline = None
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is None:
+                return
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def open_log(path, **sink_options):
+    """Return the process-wide writer for a log, so the app and the service share one
+
+    .db / .sqlite paths go to an EventStore, anything else to a rotating CSV file.
+    """
+    key = os.path.abspath(path)
+    with _writers_lock:
+        if key not in _writers:
+            if path.endswith((".db", ".sqlite")):
+                sink = EventStore(path)
+            else:
+                sink = CsvLogSink(path, **sink_options)
+            _writers[key] = AsyncLogWriter(sink)
+        return _writers[key]
@@ -0,0 +1,135 @@
+import time
+import datetime
+import threading
+from collections import OrderedDict
+
+# Alert Engine Configuration
+ALERT_WINDOW = 60.0  # Seconds during which repeats of the same alert are coalesced
+ALERT_HISTORY_SIZE = 200  # Alerts kept, acknowledged ones evicted first
+DEFAULT_RATE_LIMIT = (1 / 30, 3)  # (alerts per second, burst) per alert type
+RATE_LIMITS = {
+    "intruder": (1 / 10, 5),
+}
+
+
+class TokenBucket:
+    """Allows `burst` alerts at once, refilled at `rate` per second"""
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class AlertEngine:
+    """Coalesces repeated alerts, rate-limits new ones per type and keeps a bounded history
+
+    Alerts with the same key (type, camera, face track) raised within `window`
+    seconds of the last one update a single alert's count instead of adding rows.
+    """
+
+    def __init__(self, window=ALERT_WINDOW, history_size=ALERT_HISTORY_SIZE,
+                 rate_limits=None, default_rate_limit=DEFAULT_RATE_LIMIT, clock=time.time):
+        self.window = window
+        self.history_size = history_size
+        self.rate_limits = dict(RATE_LIMITS if rate_limits is None else rate_limits)
+        self.default_rate_limit = default_rate_limit
+        self.clock = clock
+        self._alerts = OrderedDict()  # id -> alert, oldest first
+        self._open = {}  # key -> id of the alert currently absorbing repeats
+        self._buckets = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self.raised = 0
+        self.coalesced = 0
+        self.suppressed = {}
+        self.evicted = 0
+
+    def raise_alert(self, alert_type, message, level="warning", camera=None, track=None):
+        """Record one occurrence, returns (alert, is_new); alert is None when rate-limited"""
+        now = self.clock()
+        key = (alert_type, camera, track)
+        with self._lock:
+            self.raised += 1
+            alert = self._alerts.get(self._open.get(key))
+            if alert is not None and not alert["acknowledged"] and now - alert["last_seen"] <= self.window:
+                alert["count"] += 1
+                alert["last_seen"] = now
+                alert["message"] = message
+                self.coalesced += 1
+                return alert, False
+
+            bucket = self._buckets.get(alert_type)
+            if bucket is None:
+                rate, burst = self.rate_limits.get(alert_type, self.default_rate_limit)
+                bucket = self._buckets[alert_type] = TokenBucket(rate, burst, now)
+            if not bucket.take(now):
+                self.suppressed[alert_type] = self.suppressed.get(alert_type, 0) + 1
+                return None, False
+
+            alert = {
+                "id": self._next_id,
+                "type": alert_type,
+                "camera": camera,
+                "track": track,
+                "message": message,
+                "level": level,
+                "time": datetime.datetime.fromtimestamp(now).strftime("%H:%M:%S"),
+                "first_seen": now,
+                "last_seen": now,
+                "count": 1,
+                "acknowledged": False,
+            }
+            self._next_id += 1
+            self._alerts[alert["id"]] = alert
+            self._open[key] = alert["id"]
+            self._evict()
+            return alert, True
+
+    def _evict(self):
+        while len(self._alerts) > self.history_size:
+            victim = next((alert_id for alert_id, alert in self._alerts.items() if alert["acknowledged"]),
+                          next(iter(self._alerts)))
+            alert = self._alerts.pop(victim)
+            key = (alert["type"], alert["camera"], alert["track"])
+            if self._open.get(key) == victim:
+                del self._open[key]
+            self.evicted += 1
+
+    def active(self, limit=None):
+        """Unacknowledged alerts, most recently seen first"""
+        with self._lock:
+            alerts = sorted((alert for alert in self._alerts.values() if not alert["acknowledged"]),
+                            key=lambda alert: alert["last_seen"], reverse=True)
+        return alerts[:limit] if limit else alerts
+
+    def history(self):
+        with self._lock:
+            return list(self._alerts.values())
+
+    def acknowledge(self, alert_id=None):
+        """Acknowledge one alert, or all of them when alert_id is None"""
+        with self._lock:
+            for alert in ([self._alerts[alert_id]] if alert_id in self._alerts else
+                          [] if alert_id is not None else self._alerts.values()):
+                alert["acknowledged"] = True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "raised": self.raised,
+                "alerts": len(self._alerts),
+                "active": sum(1 for alert in self._alerts.values() if not alert["acknowledged"]),
+                "coalesced": self.coalesced,
+                "suppressed": sum(self.suppressed.values()),
+                "evicted": self.evicted,
+            }
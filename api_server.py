@@ -0,0 +1,300 @@
+"""Headless recognition HTTP API for door controllers, NVRs and load tests
+
+Detection and encoding run in a process pool; the event loop only parses
+requests, matches against the shared GalleryCache and queries the event
+store. The face store and events.db are the same ones the Streamlit app
+uses, so enrollments and events show up on both sides.
+
+Endpoints:
+    GET  /health                       gallery size and pool load
+    POST /identify                     multipart "image" (+ optional "camera")
+    POST /identify/batch               multipart "images" (repeatable)
+    POST /enroll                       multipart "name", "images"; X-Admin-Password header
+    GET  /events?event=&user=&start=&end=&limit=&offset=
+    GET  /metrics                      Prometheus text format
+
+Usage: python api_server.py [--host 0.0.0.0] [--port 8000] [--workers 4]
+"""
+import os
+import time
+import asyncio
+import argparse
+import datetime
+import functools
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+from access_log import open_log
+from config import FACE_STORE_DIR, INDEX_FILE, INDEX_BACKEND, EVENT_DB_FILE
+from face_gallery import UNKNOWN_NAME, select_diverse
+from gallery_cache import GalleryCache
+from recognition_service import _init_worker, detect_and_encode, log_result
+import metrics
+
+# API Configuration
+ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "admin123")
+MATCH_TOLERANCE = 0.5
+ENROLL_EMBEDDINGS = 5  # Diverse encodings kept per enrolled user
+DETECTOR_BACKEND = "hog"
+DETECTOR_DOWNSCALE = 0.5
+DETECTOR_CONFIDENCE = 0.5
+MAX_PENDING = 32  # Images queued for the pool before requests are refused with 503
+REQUEST_TIMEOUT = 10.0  # Seconds before a request is abandoned with 504
+MAX_BATCH_IMAGES = 16
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+MAX_EVENTS_PAGE = 500
+
+
+def decode_and_encode(image_bytes):
+    """Worker task: decode an uploaded image, return (face_locations, encodings)"""
+    image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR) if image_bytes else None
+    if image is None:
+        raise ValueError("Not a readable image")
+    return detect_and_encode(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+
+
+class Overloaded(Exception):
+    pass
+
+
+class RecognitionAPI:
+    """Shared state behind the routes: pool, admission control, gallery and event writer"""
+
+    def __init__(self, workers=None, max_pending=MAX_PENDING, timeout=REQUEST_TIMEOUT):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self.served = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.pool = None
+        self.gallery_cache = GalleryCache(FACE_STORE_DIR, INDEX_FILE, INDEX_BACKEND)
+        self.log = open_log(EVENT_DB_FILE)
+
+    def start(self):
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                        initargs=(DETECTOR_BACKEND, DETECTOR_DOWNSCALE, DETECTOR_CONFIDENCE))
+
+    def stop(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        self.log.flush()
+
+    async def encode(self, images):
+        """Detect and encode several images in the pool, refusing work beyond max_pending"""
+        if self.pending + len(images) > self.max_pending:
+            self.rejected += 1
+            raise Overloaded()
+        self.pending += len(images)
+        loop = asyncio.get_running_loop()
+        futures = []
+        for image in images:
+            future = self.pool.submit(decode_and_encode, image)
+            # Count work as pending until the pool is really done with it, even after a timeout
+            future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._finished))
+            futures.append(asyncio.wrap_future(future))
+        try:
+            return await asyncio.wait_for(asyncio.gather(*futures, return_exceptions=True), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise
+
+    def _finished(self):
+        self.pending -= 1
+
+    async def identify(self, images, camera):
+        start = time.perf_counter()
+        results = []
+        with metrics.timer("detect_encode"):
+            outcomes = await self.encode(images)
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                results.append({"error": str(outcome)})
+                continue
+            locations, encodings = outcome
+            with metrics.timer("match"):
+                matches = (await asyncio.to_thread(self.gallery_cache.match, encodings, MATCH_TOLERANCE)
+                           if encodings else [])
+            matched = sum(1 for name, _ in matches if name != UNKNOWN_NAME)
+            metrics.count("frames")
+            metrics.count("faces", len(locations))
+            metrics.count("matches", matched)
+            metrics.count("unknown_faces", len(matches) - matched)
+            faces = [{"location": list(location), "name": name, "distance": distance}
+                     for location, (name, distance) in zip(locations, matches)]
+            log_result({"camera": camera, "timestamp": time.time(), "faces": faces})
+            results.append({"faces": faces})
+        self.served += 1
+        return results, (time.perf_counter() - start) * 1000
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "served": self.served,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+async def read_images(request, field, limit):
+    """Uploaded files from a multipart form, plus the form itself"""
+    if int(request.headers.get("content-length", 0)) > MAX_UPLOAD_BYTES * limit:
+        raise ValueError("Upload too large")
+    form = await request.form()
+    uploads = form.getlist(field)
+    if not uploads:
+        raise ValueError(f"No '{field}' file in the request")
+    if len(uploads) > limit:
+        raise ValueError(f"At most {limit} images per request")
+    return [await upload.read() for upload in uploads], [upload.filename for upload in uploads], form
+
+
+def guarded(handler):
+    """Route decorator mapping overload, timeouts and bad input to HTTP errors"""
+    @functools.wraps(handler)
+    async def route(request):
+        try:
+            with metrics.timer("api_request"):
+                return await handler(request)
+        except Overloaded:
+            return JSONResponse({"error": "Too many pending requests"}, status_code=503,
+                                headers={"Retry-After": "1"})
+        except asyncio.TimeoutError:
+            return JSONResponse({"error": "Recognition timed out"}, status_code=504)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+    return route
+
+
+async def health(request):
+    api = request.app.state.api
+    stats = api.stats()
+    stats["gallery_size"] = len(await asyncio.to_thread(lambda: api.gallery_cache.gallery))
+    return JSONResponse(dict(stats, status="ok"))
+
+
+async def metrics_text(request):
+    return PlainTextResponse(metrics.REGISTRY.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+@guarded
+async def identify(request):
+    images, _, form = await read_images(request, "image", 1)
+    results, elapsed_ms = await request.app.state.api.identify(images, form.get("camera", "api"))
+    if "error" in results[0]:
+        raise ValueError(results[0]["error"])
+    return JSONResponse(dict(results[0], elapsed_ms=elapsed_ms))
+
+
+@guarded
+async def identify_batch(request):
+    images, filenames, form = await read_images(request, "images", MAX_BATCH_IMAGES)
+    results, elapsed_ms = await request.app.state.api.identify(images, form.get("camera", "api"))
+    for filename, result in zip(filenames, results):
+        result["filename"] = filename
+    return JSONResponse({"results": results, "elapsed_ms": elapsed_ms})
+
+
+@guarded
+async def enroll(request):
+    if request.headers.get("x-admin-password") != ADMIN_PASSWORD:
+        return JSONResponse({"error": "Admin password required"}, status_code=401)
+    api = request.app.state.api
+    images, filenames, form = await read_images(request, "images", MAX_BATCH_IMAGES)
+    name = (form.get("name") or "").strip()
+    if not name:
+        raise ValueError("Missing 'name'")
+    encodings, scores, skipped = [], [], []
+    for filename, outcome in zip(filenames, await api.encode(images)):
+        if isinstance(outcome, Exception) or not outcome[0]:
+            skipped.append(filename)
+            continue
+        # Enrollment photos show one person: keep the largest face
+        locations, image_encodings = outcome
+        areas = [(b - t) * (r - l) for t, r, b, l in locations]
+        best = int(np.argmax(areas))
+        encodings.append(image_encodings[best])
+        scores.append(areas[best])
+    if not encodings:
+        raise ValueError("No face found in any image")
+    selected = select_diverse(encodings, scores, ENROLL_EMBEDDINGS)
+    replace = form.get("replace", "true").lower() != "false"
+    await asyncio.to_thread(api.gallery_cache.enroll, name, [encodings[i] for i in selected], replace)
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    api.log.write((timestamp, "Admin Action", "System",
+                   f"Registered new user via API: {name} ({len(selected)} samples)"))
+    return JSONResponse({"name": name, "samples": len(selected), "skipped": skipped})
+
+
+@guarded
+async def events(request):
+    params = request.query_params
+    try:
+        limit = min(int(params.get("limit", 50)), MAX_EVENTS_PAGE)
+        offset = int(params.get("offset", 0))
+    except ValueError:
+        raise ValueError("limit and offset must be integers")
+    if limit < 0 or offset < 0:
+        # SQLite reads LIMIT -1 as "no limit"
+        raise ValueError("limit and offset must not be negative")
+    filters = {
+        "event_type": params.getlist("event"),
+        "user": params.get("user"),
+        "start": params.get("start"),
+        "end": params.get("end"),
+        "search": params.get("search"),
+    }
+    store = request.app.state.api.log.sink
+
+    def query():
+        return store.count(**filters), store.query(limit=limit, offset=offset, **filters)
+
+    total, rows = await asyncio.wait_for(asyncio.to_thread(query), REQUEST_TIMEOUT)
+    return JSONResponse({
+        "total": total,
+        "events": [dict(zip(("timestamp", "event", "user", "details"), row)) for row in rows],
+    })
+
+
+def create_app(workers=None, max_pending=MAX_PENDING, timeout=REQUEST_TIMEOUT):
+    api = RecognitionAPI(workers, max_pending, timeout)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        api.start()
+        app.state.api = api
+        try:
+            yield
+        finally:
+            api.stop()
+
+    return Starlette(routes=[
+        Route("/health", health),
+        Route("/identify", identify, methods=["POST"]),
+        Route("/identify/batch", identify_batch, methods=["POST"]),
+        Route("/enroll", enroll, methods=["POST"]),
+        Route("/events", events),
+        Route("/metrics", metrics_text),
+    ], lifespan=lifespan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless face recognition HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None, help="Detection/encoding processes")
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING)
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.workers, args.max_pending, args.timeout), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
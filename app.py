@@ -1,17 +1,51 @@
 import os
 import cv2
-import numpy as np
 import streamlit as st
-import face_recognition
-import pickle
 import time
+import queue
 import datetime
-import pandas as pd
+import tempfile
 from io import StringIO
+from face_gallery import UNKNOWN_NAME, select_diverse
+from face_store import migrate_pickle
+from gallery_cache import GalleryCache
+from camera_stream import CameraStream
+from access_log import open_log
+from alert_engine import AlertEngine
+from unknown_faces import UnknownFaceClusters
+from preview import PreviewRenderer
+from access_control import AccessController, recognize_frame
+from config import DATABASE_FILE, FACE_STORE_DIR, INDEX_FILE, INDEX_BACKEND, EVENT_DB_FILE, ACCESS_LOG_FILE
+from model_manager import ModelManager, timed_import
+import metrics
 
 # System Configuration
-DATABASE_FILE = "face_database.pkl"
-ACCESS_LOG_FILE = "access_log.csv"
+CAMERA_SOURCE = 0  # Camera index, video file path or image folder
+USE_RECOGNITION_SERVICE = False  # True: authenticate from the shared multi-camera service
+SERVICE_SOURCES = {"front_door": CAMERA_SOURCE}  # Cameras owned by the recognition service
+SERVICE_CAMERA = "front_door"  # Service camera this kiosk authenticates from
+SERVICE_WORKERS = None  # Detection/encoding processes (None = one per CPU core)
+SERVICE_BATCH_SIZE = 1  # Faces per shared encoder batch (1 = encode in the workers; >1 only on CUDA dlib, see README)
+SERVICE_BATCH_WAIT_MS = 20  # Longest a face waits for its batch to fill
+EVENTS_PAGE_SIZE = 10  # Events per page on the dashboard
+ALERTS_SHOWN = 10  # Active alerts rendered on the dashboard
+METRICS_REFRESH_SECONDS = 2  # Live pipeline metrics panel refresh interval
+MODEL_STATUS_REFRESH_SECONDS = 1  # Sidebar model loading status refresh interval
+MODEL_LOAD_TIMEOUT = 120  # Seconds a scan waits for the face models before giving up
+MATCH_TOLERANCE = 0.5  # Maximum face distance accepted as a match
+AUTH_MAX_FRAMES = 30  # Frames processed per authentication attempt at most
+AUTH_TIME_BUDGET = 6.0  # Seconds per authentication attempt at most
+AUTH_ACCEPT_VOTES = 3  # Frames that must agree on the same user before access is granted
+ENROLL_EMBEDDINGS = 5  # Diverse encodings kept per registered user
+ENROLL_MIN_QUALITY = 0.5  # Registration scan ends once a face scores this well (0-1)
+ENROLL_MIN_FRAMES = 30  # Frames scanned at least, for varied encodings
+ENROLL_MAX_FRAMES = 150  # Frames scanned at most before registration gives up on quality
+QUALITY_GATE = True  # Skip blurry, dark, tiny or side-on faces before encoding
+LIVENESS_CHECK = True  # Require a blink or real head motion, reject screens and prints
+DETECTOR_BACKEND = "hog"  # hog, cnn, haar, yolo, dnn or yunet (see face_detectors.py)
+DETECTOR_DOWNSCALE = 0.5  # Detect on a resized copy of each frame, boxes mapped back
+REDETECT_INTERVAL = 5  # Full detection every N frames, faces are tracked in between
+DETECTOR_CONFIDENCE = 0.5  # Minimum score for detectors that report one
 ADMIN_PASSWORD = "admin123"
 FALLBACK_PIN = "123456"  # Default PIN for fallback access
 RFID_DATABASE = {"card1": "Admin", "card2": "Guest"}  # Simulated RFID database
@@ -29,10 +63,8 @@ if 'appliances' not in st.session_state:
     }
 if 'simulation_mode' not in st.session_state:
     st.session_state.simulation_mode = True  # Start in simulation mode
-if 'access_logs' not in st.session_state:
-    st.session_state.access_logs = []
 if 'alerts' not in st.session_state:
-    st.session_state.alerts = []
+    st.session_state.alerts = AlertEngine()
 if 'system_status' not in st.session_state:
     st.session_state.system_status = {
         "uptime": time.time(),
@@ -43,103 +75,259 @@ if 'system_status' not in st.session_state:
     }
 if 'clear_db_mode' not in st.session_state:  # NEW: Track clear database state
     st.session_state.clear_db_mode = False
+if 'detector_settings' not in st.session_state:
+    st.session_state.detector_settings = {
+        "backend": DETECTOR_BACKEND,
+        "downscale": DETECTOR_DOWNSCALE,
+        "confidence": DETECTOR_CONFIDENCE
+    }
+
+# Face models load in the background while the page renders
+@st.cache_resource
+def get_models():
+    """Process-wide model loader, started on the first script run after the server starts"""
+    # Warm the cached detector every session gets from get_detector(), not a throwaway copy
+    return ModelManager(DETECTOR_BACKEND, {"downscale": DETECTOR_DOWNSCALE,
+                                           "confidence": DETECTOR_CONFIDENCE},
+                        detector_factory=lambda: load_detector(DETECTOR_BACKEND, DETECTOR_DOWNSCALE,
+                                                               DETECTOR_CONFIDENCE)).start()
+
+def wait_for_models():
+    """Wait up to MODEL_LOAD_TIMEOUT for the face models, showing progress; False if not ready"""
+    models = get_models()
+    if models.state == "loading":
+        progress = st.empty()
+        deadline = time.monotonic() + MODEL_LOAD_TIMEOUT
+        while models.state == "loading" and time.monotonic() < deadline:
+            progress.info(f"⏳ Loading face models... {models.status()['elapsed_ms'] / 1000:.0f} s")
+            models.wait(timeout=MODEL_STATUS_REFRESH_SECONDS)
+        progress.empty()
+    if models.state == "loading":
+        st.warning(f"Face models are still loading after {MODEL_LOAD_TIMEOUT} s. Please try again shortly.")
+        return False
+    if not models.ready:
+        st.error(f"Face models failed to load: {models.error}")
+        return False
+    return True
+
+get_models()
 
 # Initialize face database
+def migrate_database():
+    """Import a legacy pickle database into the embedding store once"""
+    if (not os.path.exists(FACE_STORE_DIR) and os.path.exists(DATABASE_FILE)
+            and os.path.getsize(DATABASE_FILE) > 0):
+        store = migrate_pickle(DATABASE_FILE, FACE_STORE_DIR, remove_source=True)
+        log_event("System Event", f"Migrated {len(store)} faces from {DATABASE_FILE}")
+
+@st.cache_resource
+def get_gallery_cache():
+    """Process-wide gallery shared by every session and rerun"""
+    migrate_database()
+    return GalleryCache(FACE_STORE_DIR, INDEX_FILE, INDEX_BACKEND)
+
 def load_database():
+    """Return the shared gallery cache, reloaded only if the store changed on disk"""
     try:
-        if os.path.exists(DATABASE_FILE) and os.path.getsize(DATABASE_FILE) > 0:
-            with open(DATABASE_FILE, 'rb') as f:
-                return pickle.load(f)
+        cache = get_gallery_cache()
+        cache.get()
+        return cache
     except Exception as e:
         st.error(f"Error loading database: {e}")
         log_event("System Error", f"Database load failed: {str(e)}")
-    return {}
+    return None
 
-def save_database(db):
+def save_face(user_name, encodings):
+    """Append a user's encodings, replacing any previous enrollment for the same name"""
     try:
-        with open(DATABASE_FILE, 'wb') as f:
-            pickle.dump(db, f)
+        get_gallery_cache().enroll(user_name, encodings)
+        return True
     except Exception as e:
         st.error(f"Error saving database: {e}")
         log_event("System Error", f"Database save failed: {str(e)}")
+    return False
+
+@st.cache_resource
+def get_unknown_faces():
+    """Unknown-face incidents shared by every session and camera"""
+    return UnknownFaceClusters()
+
+def promote_incident(incident_id, user_name):
+    """Enroll an unknown-face incident's stored encodings under user_name"""
+    incident = get_unknown_faces().remove(incident_id)
+    if incident is None:
+        return False
+    samples = list(incident["samples"])
+    selected = select_diverse(samples, list(incident["scores"]), ENROLL_EMBEDDINGS)
+    return save_face(user_name, [samples[i] for i in selected])
+
+def clear_database():
+    """Drop every enrollment from the embedding store"""
+    try:
+        get_gallery_cache().clear()
+        return True
+    except Exception as e:
+        st.error(f"Error clearing database: {e}")
+        log_event("System Error", f"Database clear failed: {str(e)}")
+    return False
+
+# Face Detection
+@st.cache_resource
+def load_detector(backend, downscale, confidence):
+    """One detector instance per configuration, shared by all sessions"""
+    from face_detectors import make_detector
+    return make_detector(backend, downscale=downscale, confidence=confidence)
+
+@st.cache_resource
+def detector_failures():
+    """{backend: error} for detectors that failed to load; st.cache_resource does not cache exceptions"""
+    return {}
+
+def get_detector():
+    """Return the configured detector, falling back to HOG if it cannot load"""
+    settings = st.session_state.detector_settings
+    failures = detector_failures()
+    if settings["backend"] not in failures:
+        try:
+            return load_detector(settings["backend"], settings["downscale"], settings["confidence"])
+        except Exception as e:
+            # Remembered, so a missing model file is not reloaded and reported on every rerun
+            failures[settings["backend"]] = str(e)
+            st.error(f"Detector error: {e}")
+            log_event("System Error", f"{settings['backend']} detector failed to load: {str(e)}")
+    return load_detector("hog", settings["downscale"], settings["confidence"])
+
+def show_capture_stats(tracker, stream):
+    """Summarize detection vs tracking and dropped camera frames for a capture loop"""
+    stats = tracker.stats()
+    stream_stats = stream.stats()
+    if stats["frames"]:
+        st.caption(f"Detection ran on {stats['detections']}/{stats['frames']} frames "
+                   f"({stats['detect_ms']:.1f} ms each), tracked the rest "
+                   f"({stats['track_ms']:.1f} ms each). "
+                   f"Camera: {stream_stats['read']} frames read, {stream_stats['dropped']} stale frames dropped")
+
+def make_preview(placeholder):
+    # Rate, width and JPEG quality come from the Preview Configuration in preview.py
+    return PreviewRenderer(placeholder)
+
+def show_quality_stats(gate):
+    stats = gate.stats()
+    if stats["skipped"]:
+        reasons = ", ".join(f"{count} {reason}" for reason, count in stats["reasons"].items())
+        st.caption(f"Quality gate skipped {stats['skipped']}/{stats['checked']} faces ({reasons}), "
+                   f"saving ~{stats['saved_ms']:.0f} ms of encoding for {stats['gate_ms']:.1f} ms of checks each")
+
+def show_liveness_stats(liveness):
+    stats = liveness.stats()
+    if stats["checked"]:
+        st.caption(f"Liveness: {stats['checked']} frames checked ({stats['avg_ms']:.1f} ms each), "
+                   f"{stats['blinks']} blinks, depth motion {stats['depth_motion']:.3f}")
+
+def show_preview_stats(preview):
+    stats = preview.stats()
+    if stats["rendered"]:
+        st.caption(f"Preview: {stats['rendered']} frames sent ({stats['avg_kb']:.0f} KB, "
+                   f"{stats['avg_ms']:.1f} ms each), {stats['skipped']} skipped")
+
+@st.fragment(run_every=MODEL_STATUS_REFRESH_SECONDS)
+def show_model_status():
+    """Face model loading progress; reruns the app once loading finishes to show detector settings"""
+    status = get_models().status()
+    if status["state"] == "loading":
+        st.session_state.models_loading = True
+        st.caption(f"⏳ Loading face models... {status['elapsed_ms'] / 1000:.1f} s")
+        return
+    if st.session_state.pop("models_loading", False):
+        st.rerun()
+    if status["state"] == "failed":
+        st.error(f"Face models failed to load: {status['error']}")
+        return
+    details = []
+    if "face_recognition" in status["import_ms"]:
+        details.append(f"dlib import {status['import_ms']['face_recognition']:.0f} ms")
+    if "encode" in status["first_inference_ms"]:
+        details.append(f"first encode {status['first_inference_ms']['encode']:.0f} ms, "
+                       f"then {status['steady_ms']['encode']:.0f} ms")
+    st.caption(f"Face models ready in {status['elapsed_ms'] / 1000:.1f} s"
+               + (f" ({', '.join(details)})" if details else ""))
+
+@st.fragment(run_every=METRICS_REFRESH_SECONDS)
+def show_pipeline_metrics():
+    """Live per-stage latency and throughput of the recognition pipeline"""
+    snapshot = metrics.REGISTRY.snapshot()
+    stages, counters = snapshot["stages"], snapshot["counters"]
+    frame_ms = stages.get("frame", {}).get("mean")
+    metric_cols = st.columns(4)
+    metric_cols[0].metric("Pipeline FPS", f"{1000 / frame_ms:.1f}" if frame_ms else "–")
+    metric_cols[1].metric("Frames", counters.get("frames", 0))
+    metric_cols[2].metric("Faces", counters.get("faces", 0))
+    metric_cols[3].metric("Dropped Frames", counters.get("dropped_frames", 0))
+    rows = [[stage, stats["p50"], stats["p95"], stats["p99"], stats["count"]]
+            for stage, stats in stages.items() if "p50" in stats]
+    if rows:
+        pd = timed_import("pandas")
+        stage_df = pd.DataFrame(rows, columns=["Stage", "p50 ms", "p95 ms", "p99 ms", "Samples"])
+        st.dataframe(stage_df.round(2), hide_index=True)
+    elif not metrics.REGISTRY.enabled:
+        st.caption("Pipeline metrics are disabled (FACE_METRICS=0)")
 
 # Event Logging
+@st.cache_resource
+def get_log_writer():
+    """Background writer into the event store, shared by every session and the recognition service"""
+    new_store = not os.path.exists(EVENT_DB_FILE)
+    writer = open_log(EVENT_DB_FILE)
+    if new_store:
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if os.path.exists(ACCESS_LOG_FILE):
+            count = writer.sink.import_csv(ACCESS_LOG_FILE)
+            os.replace(ACCESS_LOG_FILE, ACCESS_LOG_FILE + ".imported")
+            writer.write((timestamp, "System Event", "System", f"Imported {count} events from {ACCESS_LOG_FILE}"))
+        else:
+            writer.write((timestamp, "System Event", "System", "Event store initialized"))
+    return writer
+
+def get_event_store():
+    return get_log_writer().sink
+
 def log_event(event_type, details, user="System"):
     """Log security events"""
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    entry = f"{timestamp},{event_type},{user},{details}"
-    
-    # Add to session state
-    st.session_state.access_logs.append(entry)
-    
-    # Save to file
-    try:
-        with open(ACCESS_LOG_FILE, "a") as f:
-            f.write(entry + "\n")
-    except Exception as e:
-        st.error(f"Error saving log: {e}")
+    # Queue for the background writer (never blocks the UI)
+    get_controller().log_event(event_type, details, user)
+
+def get_controller():
+    """This session's access controller, sharing its status, appliances and alerts with the UI"""
+    if 'controller' not in st.session_state:
+        st.session_state.controller = AccessController(
+            get_log_writer(), alerts=st.session_state.alerts, unknown_faces=get_unknown_faces(),
+            notify=notify_alert, status=st.session_state.system_status,
+            appliances=st.session_state.appliances, pin=FALLBACK_PIN, rfid_cards=RFID_DATABASE)
+    return st.session_state.controller
 
 # Alert System
-def send_alert(message, level="warning"):
-    """Send real-time alerts"""
-    timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-    alert = {
-        "time": timestamp,
-        "message": message,
-        "level": level,
-        "acknowledged": False
-    }
-    st.session_state.alerts.append(alert)
-    
-    # Visual notification
+def notify_alert(message, level):
+    """Visual notification, once per alert rather than once per repeat"""
     st.toast(f"ALERT: {message}", icon="⚠️" if level == "warning" else "🚨")
 
+def send_alert(message, level="warning", alert_type=None, camera=None, track=None):
+    """Send real-time alerts, returns True for a new alert and False for a repeat or a rate-limited one"""
+    return get_controller().send_alert(message, level, alert_type=alert_type, camera=camera, track=track)
+
 # Battery Backup Simulation - MODIFIED TO WORK IN MAIN THREAD
 def simulate_power_outage():
     """Simulate power failure and battery backup"""
-    if not st.session_state.system_status["battery_backup"]:
-        st.session_state.system_status["battery_backup"] = True
-        st.session_state.system_status["battery_depletion_time"] = time.time() + 300  # 5 minutes
-        send_alert("Power outage detected! Switching to battery backup", "critical")
-        log_event("System Event", "Power failure - battery backup activated")
-        
-        # Disable non-essential features
-        if st.session_state.appliances["Smart TV"]:
-            control_tv(False)
-            send_alert("Non-essential devices disabled to conserve power", "warning")
+    get_controller().power_outage()
 
 # Battery depletion check - CALLED FROM MAIN THREAD
 def check_battery_status():
     """Check if battery has depleted"""
-    if st.session_state.system_status["battery_backup"]:
-        depletion_time = st.session_state.system_status["battery_depletion_time"]
-        if depletion_time and time.time() >= depletion_time:
-            st.session_state.system_status["battery_backup"] = False
-            st.session_state.system_status["battery_depletion_time"] = None
-            send_alert("Battery depleted! System shutting down", "critical")
-            log_event("System Event", "Battery depleted - system shutdown")
-            
-            # Disable all appliances
-            if st.session_state.appliances["Light"]:
-                control_light(False)
-            if st.session_state.appliances["Security System"]:
-                control_security_system(False)
-            if st.session_state.appliances["Smart TV"]:
-                control_tv(False)
+    get_controller().check_battery()
 
 # Self-Healing System
 def self_heal():
     """Simulate self-healing capabilities"""
-    log_event("System Event", "Self-healing initiated")
-    st.session_state.system_status["faults"] = 0
-    st.session_state.system_status["last_self_heal"] = time.time()
-    
-    # Simulate recovery actions
-    if not st.session_state.system_status["battery_backup"]:
-        st.session_state.system_status["battery_backup"] = True
-        send_alert("System recovered from fault condition", "info")
-    
-    log_event("System Event", "Self-healing completed successfully")
+    get_controller().self_heal()
 
 # Uptime Monitoring
 def get_uptime():
@@ -152,12 +340,7 @@ def get_uptime():
 # Fault Tolerance
 def handle_camera_failure():
     """Simulate camera fault recovery"""
-    log_event("System Error", "Camera failure detected")
-    st.session_state.system_status["faults"] += 1
-    
-    if st.session_state.system_status["faults"] >= 3:
-        send_alert("Critical hardware failure detected", "critical")
-        self_heal()
+    get_controller().camera_failure()
 
 # Fallback Authentication Methods
 def pin_authentication():
@@ -165,14 +348,11 @@ def pin_authentication():
     pin = st.text_input("Enter 6-digit PIN", type="password", max_chars=6)
     
     if st.button("Authenticate with PIN"):
-        if pin == FALLBACK_PIN:
+        if get_controller().pin_attempt(pin):
             st.session_state.authenticated = True
             st.session_state.current_user = "Fallback User"
-            log_event("Access", "PIN authentication successful")
             st.success("Access Granted via PIN!")
         else:
-            log_event("Security Alert", "Invalid PIN attempt")
-            send_alert("Invalid PIN attempt detected", "warning")
             st.error("Invalid PIN")
 
 def rfid_authentication():
@@ -180,15 +360,12 @@ def rfid_authentication():
     rfid_id = st.selectbox("Select RFID Card", list(RFID_DATABASE.keys()))
     
     if st.button("Authenticate with RFID"):
-        user = RFID_DATABASE.get(rfid_id)
+        user = get_controller().rfid_attempt(rfid_id)
         if user:
             st.session_state.authenticated = True
             st.session_state.current_user = user
-            log_event("Access", f"RFID authentication successful: {user}")
             st.success(f"Access Granted to {user} via RFID!")
         else:
-            log_event("Security Alert", "Invalid RFID card used")
-            send_alert("Unauthorized RFID access attempt", "warning")
             st.error("Invalid RFID Card")
 
 # Face Registration with Admin Password
@@ -221,9 +398,18 @@ def register_face():
     """)
     
     if st.button("Start Face Scan"):
+        if not wait_for_models():
+            return
+        import face_recognition
+        from face_tracking import FaceTracker
+        from face_quality import QualityGate
         with st.spinner("Scanning your face..."):
             try:
-                video_capture = cv2.VideoCapture(0)
+                if USE_RECOGNITION_SERVICE:
+                    # The service owns the camera, scan its frames rather than opening the device twice
+                    video_capture = get_recognition_service().open_frames(SERVICE_CAMERA)
+                else:
+                    video_capture = CameraStream(CAMERA_SOURCE).start()
                 if not video_capture.isOpened():
                     raise Exception("Camera not available")
             except Exception as e:
@@ -232,13 +418,17 @@ def register_face():
                 handle_camera_failure()
                 return
                 
+            tracker = FaceTracker(get_detector(), redetect_interval=REDETECT_INTERVAL)
+            gate = QualityGate(enabled=QUALITY_GATE)
             frame_count = 0
-            best_face_encoding = None
             best_face_score = 0
+            scanned_encodings = []
+            scanned_scores = []
             scan_complete = False
             
             scan_placeholder = st.empty()
             status_placeholder = st.empty()
+            preview = make_preview(scan_placeholder)
             
             while not scan_complete:
                 ret, frame = video_capture.read()
@@ -252,53 +442,77 @@ def register_face():
                 rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
                 
                 # Find faces in the frame
-                face_locations = face_recognition.face_locations(rgb_frame)
+                face_locations = tracker.update(rgb_frame)
+                
+                # Only the person being registered, the largest face, is enrolled: diversity
+                # selection would otherwise favour a bystander's face as the most different one
+                subjects = sorted(face_locations, key=lambda l: (l[2] - l[0]) * (l[1] - l[3]))[-1:]
+                for top, right, bottom, left in face_locations:
+                    if (top, right, bottom, left) not in subjects:
+                        cv2.rectangle(frame, (left, top), (right, bottom), (128, 128, 128), 1)
                 
-                if face_locations:
+                # Score the face before encoding, only a good one is worth the encoder
+                good_locations, assessments = gate.filter(rgb_frame, subjects)
+                for (top, right, bottom, left), assessment in zip(subjects, assessments):
+                    if assessment is not None and not assessment["passed"]:
+                        cv2.rectangle(frame, (left, top), (right, bottom), (0, 165, 255), 2)
+                        cv2.putText(frame, assessment["reason"], (left, bottom + 30),
+                                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
+                
+                if good_locations:
                     # Get face encodings
-                    face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+                    face_encodings = face_recognition.face_encodings(rgb_frame, good_locations)
+                    scores = {location: a["score"] for location, a in zip(subjects, assessments) if a}
                     
-                    for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
+                    for location, face_encoding in zip(good_locations, face_encodings):
+                        top, right, bottom, left = location
                         # Draw rectangle around face
                         cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
                         
-                        # Calculate face quality score
-                        face_size = (right - left) * (bottom - top)
-                        center_x = (left + right) / 2
-                        center_y = (top + bottom) / 2
-                        frame_center_x = frame.shape[1] / 2
-                        frame_center_y = frame.shape[0] / 2
-                        distance_to_center = np.sqrt((center_x - frame_center_x)**2 + (center_y - frame_center_y)**2)
-                        score = face_size / (distance_to_center + 1)
+                        # Quality score from the gate (sharpness, exposure, size, pose)
+                        score = scores.get(location, 1.0)
                         
-                        # Keep the best face encoding
-                        if score > best_face_score:
-                            best_face_score = score
-                            best_face_encoding = face_encoding
+                        # Keep every candidate, the best and most varied are chosen after the scan
+                        scanned_encodings.append(face_encoding)
+                        scanned_scores.append(score)
+                        best_face_score = max(best_face_score, score)
                         
                         # Display quality score
-                        cv2.putText(frame, f"Quality: {score:.1f}", (left, bottom + 30),
+                        cv2.putText(frame, f"Quality: {score:.2f}", (left, bottom + 30),
                                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
                 
-                # Display the frame
-                scan_placeholder.image(frame, channels="BGR", use_container_width=True)
+                # Display the frame (rate-limited, recognition never waits on the browser)
+                preview.show(frame)
                 
                 frame_count += 1
                 
-                # Stop after collecting enough good frames
-                if frame_count >= 30 and best_face_score > 500:
+                # Stop after collecting enough good frames, or give up and release the camera
+                if frame_count >= ENROLL_MIN_FRAMES and best_face_score >= ENROLL_MIN_QUALITY:
                     scan_complete = True
+                elif frame_count >= ENROLL_MAX_FRAMES:
+                    break
             
             # Release resources
             video_capture.release()
+            show_capture_stats(tracker, video_capture)
+            show_quality_stats(gate)
+            show_preview_stats(preview)
+            
+            if not scan_complete and frame_count >= ENROLL_MAX_FRAMES:
+                status_placeholder.error(f"Face quality too low (best {best_face_score:.2f}, need "
+                                         f"{ENROLL_MIN_QUALITY:.2f}). Face the camera in better "
+                                         "lighting and try again.")
+                log_event("System Event", f"Face registration failed - low quality ({best_face_score:.2f} "
+                                          f"after {frame_count} frames)")
+                return
             
-            # Save the best face encoding
-            if best_face_encoding is not None:
-                database = load_database()
-                database[user_name] = best_face_encoding
-                save_database(database)
+            # Save a diverse subset of good-quality encodings
+            selected = select_diverse(scanned_encodings, scanned_scores, ENROLL_EMBEDDINGS)
+            if selected and save_face(user_name, [scanned_encodings[i] for i in selected]):
                 status_placeholder.success(f"Successfully registered {user_name}!")
-                log_event("Admin Action", f"Registered new user: {user_name}")
+                log_event("Admin Action", f"Registered new user: {user_name} ({len(selected)} samples)")
+            elif selected:
+                status_placeholder.error("Registration could not be saved. Please try again.")
             else:
                 status_placeholder.error("No good face detected. Please try again with better lighting.")
                 log_event("System Event", "Face registration failed - low quality")
@@ -310,132 +524,190 @@ def authenticate_face():
     ### Authentication Instructions:
     1. Look straight at the camera
     2. Make sure your face is clearly visible
-    3. Hold still for recognition
+    3. Blink or turn your head slightly while we check you are live
     """)
     
     if st.button("Start Authentication"):
+        if not wait_for_models():
+            return
         with st.spinner("Authenticating..."):
-            try:
-                video_capture = cv2.VideoCapture(0)
-                if not video_capture.isOpened():
-                    raise Exception("Camera not available")
-            except Exception as e:
-                st.error(f"Camera error: {str(e)}")
-                log_event("System Error", f"Camera access failed: {str(e)}")
-                handle_camera_failure()
-                return
-                
-            database = load_database()
+            if USE_RECOGNITION_SERVICE:
+                camera = SERVICE_CAMERA
+                frames = service_recognition(AUTH_MAX_FRAMES)
+            else:
+                camera = str(CAMERA_SOURCE)
+                gallery = load_database()
+                if gallery is None:
+                    return
+                frames = local_recognition(AUTH_MAX_FRAMES, gallery)
+            
             auth_placeholder = st.empty()
             status_placeholder = st.empty()
-            authenticated = False
-            recognized_name = None
+            preview = make_preview(auth_placeholder)
+            attempt = get_controller().start_authentication(
+                camera, tolerance=MATCH_TOLERANCE, accept_votes=AUTH_ACCEPT_VOTES,
+                max_frames=AUTH_MAX_FRAMES, time_budget=AUTH_TIME_BUDGET, liveness=LIVENESS_CHECK)
             
-            for _ in range(30):
-                ret, frame = video_capture.read()
-                if not ret:
-                    st.error("Failed to access camera")
-                    log_event("System Error", "Camera frame capture failed")
-                    handle_camera_failure()
-                    break
-                
-                # Convert to RGB for face recognition
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                
-                # Find faces in the frame
-                face_locations = face_recognition.face_locations(rgb_frame)
-                
-                if face_locations:
-                    # Get face encodings
-                    face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+            try:
+                frame_start = time.perf_counter()
+                for frame, faces in frames:
+                    # Liveness and intruder incidents work on the frame before overlays are drawn
+                    done = attempt.process(frame, faces)
                     
-                    for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-                        # Compare with known faces
-                        matches = face_recognition.compare_faces(
-                            list(database.values()), 
-                            face_encoding,
-                            tolerance=0.5
-                        )
-                        
-                        name = "Unknown"
-                        if True in matches:
-                            first_match_index = matches.index(True)
-                            name = list(database.keys())[first_match_index]
-                            authenticated = True
-                            recognized_name = name
+                    for face in faces:
+                        (top, right, bottom, left), name = face["location"], face["name"]
+                        if name is None:
+                            # Skipped by the quality gate: tell the user why
+                            cv2.rectangle(frame, (left, top), (right, bottom), (0, 165, 255), 2)
+                            cv2.putText(frame, face["quality"]["reason"], (left, top - 10),
+                                       cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 165, 255), 2)
+                            continue
                         
                         # Draw rectangle and label
-                        color = (0, 255, 0) if name != "Unknown" else (0, 0, 255)
+                        color = (0, 255, 0) if name != UNKNOWN_NAME else (0, 0, 255)
                         cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
                         cv2.putText(frame, name, (left, top - 10), 
                                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
-                        
-                        # Log intruder detection
-                        if name == "Unknown":
-                            log_event("Security Alert", "Unauthorized face detected")
-                            send_alert("Intruder alert! Unknown face detected", "critical")
-                
-                # Display the frame
-                auth_placeholder.image(frame, channels="BGR", use_container_width=True)
-                
-                if authenticated:
-                    st.session_state.authenticated = True
-                    st.session_state.current_user = recognized_name
-                    status_placeholder.success(f"Access Granted! Welcome {recognized_name}!")
-                    log_event("Access", f"Face authentication successful: {recognized_name}")
-                    break
-            
-            video_capture.release()
+                        if face is attempt.candidate and attempt.liveness is not None:
+                            cv2.putText(frame, f"Liveness: {attempt.live_state}", (left, bottom + 25),
+                                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+                    
+                    # Display the frame (rate-limited; the final frame is always shown)
+                    with metrics.timer("render"):
+                        preview.show(frame, force=attempt.decision is not None)
+                    metrics.observe("frame", (time.perf_counter() - frame_start) * 1000)
+                    frame_start = time.perf_counter()
+                    if done:
+                        break
+            finally:
+                frames.close()
+            show_preview_stats(preview)
+            if attempt.liveness is not None:
+                show_liveness_stats(attempt.liveness)
             
-            if not authenticated:
+            result = attempt.finish()
+            if result["outcome"] == "granted":
+                st.session_state.authenticated = True
+                st.session_state.current_user = result["name"]
+                status_placeholder.success(f"Access Granted! Welcome {result['name']}!")
+            elif result["outcome"] == "spoof":
+                status_placeholder.error(f"Access Denied: liveness check failed ({result['reason']})")
+            elif result["outcome"] == "not_live":
+                status_placeholder.error("Access Denied: liveness not confirmed, please blink and try again")
+            else:
                 status_placeholder.error("Access Denied: Face not recognized")
-                log_event("Access", "Face authentication failed")
-                send_alert("Authentication failed", "warning")
+
+def local_recognition(frame_limit, gallery):
+    """Yield (frame, [{"location", "name", "distance", "encoding"}, ...]) from this session's own camera
+
+    Faces rejected by the quality gate have name None and a "quality" assessment instead.
+    """
+    from face_tracking import FaceTracker
+    from face_quality import QualityGate
+    try:
+        video_capture = CameraStream(CAMERA_SOURCE).start()
+        if not video_capture.isOpened():
+            raise Exception("Camera not available")
+    except Exception as e:
+        st.error(f"Camera error: {str(e)}")
+        log_event("System Error", f"Camera access failed: {str(e)}")
+        handle_camera_failure()
+        return
+    
+    tracker = FaceTracker(get_detector(), redetect_interval=REDETECT_INTERVAL)
+    # With liveness on, the gate's pose check fits the 68 landmarks the blink check reuses
+    gate = QualityGate(enabled=QUALITY_GATE, landmark_model="large" if LIVENESS_CHECK else "small")
+    try:
+        for _ in range(frame_limit):
+            with metrics.timer("capture"):
+                ret, frame = video_capture.read()
+            if not ret:
+                st.error("Failed to access camera")
+                log_event("System Error", "Camera frame capture failed")
+                handle_camera_failure()
+                break
+            
+            # Convert to RGB for face recognition
+            with metrics.timer("convert"):
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            
+            yield frame, recognize_frame(rgb_frame, tracker, gate, gallery, tolerance=MATCH_TOLERANCE)
+    finally:
+        video_capture.release()
+        metrics.count("dropped_frames", video_capture.stats()["dropped"])
+        show_capture_stats(tracker, video_capture)
+        show_quality_stats(gate)
+
+@st.cache_resource
+def get_recognition_service():
+    """Process-wide recognition service that owns the cameras"""
+    from recognition_service import RecognitionService
+    return RecognitionService(SERVICE_SOURCES, get_gallery_cache(), workers=SERVICE_WORKERS,
+                              detector=DETECTOR_BACKEND, downscale=DETECTOR_DOWNSCALE,
+                              confidence=DETECTOR_CONFIDENCE, tolerance=MATCH_TOLERANCE,
+                              encoder_batch_size=SERVICE_BATCH_SIZE,
+                              encoder_max_wait_ms=SERVICE_BATCH_WAIT_MS).start()
+
+def service_recognition(frame_limit):
+    """Yield (frame, [{"location", "name", "distance", "encoding"}, ...]) from the recognition service's results stream"""
+    try:
+        service = get_recognition_service()
+        subscription = service.subscribe(SERVICE_CAMERA)
+    except Exception as e:
+        st.error(f"Recognition service error: {str(e)}")
+        log_event("System Error", f"Recognition service unavailable: {str(e)}")
+        return
+    
+    try:
+        for _ in range(frame_limit):
+            try:
+                result = subscription.get(timeout=2.0)
+            except queue.Empty:
+                st.error("Recognition service is not delivering frames")
+                log_event("System Error", f"No results from camera {SERVICE_CAMERA}")
+                handle_camera_failure()
+                break
+            # The frame is shared with other subscribers, draw on a copy
+            yield result["frame"].copy(), result["faces"]
+    finally:
+        service.unsubscribe(SERVICE_CAMERA, subscription)
 
 # Appliance Control Functions
 def control_light(state):
     """Control light - simulation mode or real GPIO"""
-    if st.session_state.system_status["battery_backup"]:
+    if not get_controller().control("Light", state):
         st.warning("Battery mode: Lighting control disabled")
         return False
         
     if st.session_state.simulation_mode:
         st.info(f"SIMULATION: Light would be {'ON' if state else 'OFF'}")
-        log_event("Appliance Control", f"Light turned {'ON' if state else 'OFF'}")
-        return True
     else:
         # Real GPIO control would go here
         st.success(f"Light turned {'ON' if state else 'OFF'}")
-        log_event("Appliance Control", f"Light turned {'ON' if state else 'OFF'}")
-        return True
+    return True
 
 def control_security_system(state):
     """Control security system - simulation mode or real GPIO"""
+    get_controller().control("Security System", state)
     if st.session_state.simulation_mode:
         st.info(f"SIMULATION: Security system would be {'ARMED' if state else 'DISARMED'}")
-        log_event("Appliance Control", f"Security system {'ARMED' if state else 'DISARMED'}")
-        return True
     else:
         # Real GPIO control would go here
         st.success(f"Security system {'ARMED' if state else 'DISARMED'}")
-        log_event("Appliance Control", f"Security system {'ARMED' if state else 'DISARMED'}")
-        return True
+    return True
 
 def control_tv(state):
     """Control TV - simulation mode or real GPIO"""
-    if st.session_state.system_status["battery_backup"]:
+    if not get_controller().control("Smart TV", state):
         st.warning("Battery mode: Non-essential devices disabled")
         return False
         
     if st.session_state.simulation_mode:
         st.info(f"SIMULATION: TV would be {'ON' if state else 'OFF'}")
-        log_event("Appliance Control", f"TV turned {'ON' if state else 'OFF'}")
-        return True
     else:
         # Real GPIO control would go here
         st.success(f"TV turned {'ON' if state else 'OFF'}")
-        log_event("Appliance Control", f"TV turned {'ON' if state else 'OFF'}")
-        return True
+    return True
 
 # Home Control Interface
 def home_control():
@@ -455,6 +727,10 @@ def home_control():
     with status_cols[2]:
         st.metric("System Faults", st.session_state.system_status["faults"])
     
+    # Live pipeline metrics
+    with st.expander("Recognition Pipeline", expanded=True):
+        show_pipeline_metrics()
+    
     # Display mode status
     mode_status = "Simulation Mode" if st.session_state.simulation_mode else "Real Device Mode"
     st.info(f"System Status: {mode_status}")
@@ -538,33 +814,94 @@ def home_control():
     # Access Logs
     st.divider()
     st.markdown("### Access Logs")
-    if st.session_state.access_logs:
-        # Create DataFrame from logs
-        log_data = [log.split(",", 3) for log in st.session_state.access_logs[-10:]]  # Last 10 entries
+    get_log_writer().flush(timeout=0.5)  # Include events queued during this run
+    events = get_event_store()
+    filter_cols = st.columns([2, 1, 2])
+    event_filter = filter_cols[0].multiselect("Event type", events.event_types())
+    user_filter = filter_cols[1].text_input("User")
+    date_filter = filter_cols[2].date_input("Date range", value=())
+    filters = {
+        "event_type": event_filter,
+        "user": user_filter.strip() or None,
+        "start": date_filter[0] if len(date_filter) > 0 else None,
+        "end": date_filter[-1] if len(date_filter) > 0 else None,
+    }
+    start_time = time.perf_counter()
+    total = events.count(**filters)
+    if total:
+        pages = (total - 1) // EVENTS_PAGE_SIZE + 1
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1) if pages > 1 else 1
+        log_data = events.query(limit=EVENTS_PAGE_SIZE, offset=(page - 1) * EVENTS_PAGE_SIZE, **filters)
+        query_ms = (time.perf_counter() - start_time) * 1000
+        pd = timed_import("pandas")
         log_df = pd.DataFrame(log_data, columns=["Timestamp", "Event", "User", "Details"])
         st.dataframe(log_df)
+        st.caption(f"{total} events ({query_ms:.1f} ms)")
     else:
         st.info("No access events recorded")
     
     # Active Alerts
     st.divider()
     st.markdown("### Active Alerts")
-    unacknowledged = [alert for alert in st.session_state.alerts if not alert["acknowledged"]]
+    unacknowledged = st.session_state.alerts.active()
     
     if unacknowledged:
-        for i, alert in enumerate(unacknowledged):
+        for alert in unacknowledged[:ALERTS_SHOWN]:
             cols = st.columns([1, 4, 1])
             cols[0].write(alert["time"])
+            message = alert["message"] + (f" (×{alert['count']})" if alert["count"] > 1 else "")
             if alert["level"] == "warning":
-                cols[1].warning(alert["message"])
+                cols[1].warning(message)
             else:
-                cols[1].error(alert["message"])
-            if cols[2].button("Ack", key=f"ack_{i}"):
-                alert["acknowledged"] = True
+                cols[1].error(message)
+            if cols[2].button("Ack", key=f"ack_{alert['id']}"):
+                st.session_state.alerts.acknowledge(alert["id"])
                 st.rerun()
+        if len(unacknowledged) > ALERTS_SHOWN:
+            st.caption(f"...and {len(unacknowledged) - ALERTS_SHOWN} more")
+        if len(unacknowledged) > 1 and st.button("Acknowledge all"):
+            st.session_state.alerts.acknowledge()
+            st.rerun()
+        alert_stats = st.session_state.alerts.stats()
+        if alert_stats["coalesced"] or alert_stats["suppressed"]:
+            st.caption(f"{alert_stats['coalesced']} repeats merged, {alert_stats['suppressed']} alerts rate-limited")
     else:
         st.success("No active alerts")
     
+    # Unknown visitors, one row per incident
+    st.divider()
+    st.markdown("### Unknown Visitors")
+    incidents = get_unknown_faces().incidents()
+    if incidents:
+        for incident in incidents[:ALERTS_SHOWN]:
+            cols = st.columns([1, 3, 2])
+            if incident["thumbnail"] is not None:
+                cols[0].image(incident["thumbnail"], channels="BGR")
+            first_seen = datetime.datetime.fromtimestamp(incident["first_seen"]).strftime("%H:%M:%S")
+            last_seen = datetime.datetime.fromtimestamp(incident["last_seen"]).strftime("%H:%M:%S")
+            cameras = ", ".join(sorted(incident["cameras"])) or "unknown camera"
+            cols[1].write(f"**Incident #{incident['id']}**: seen {incident['count']} times "
+                          f"on {cameras}, {first_seen}–{last_seen}")
+            with cols[2].popover("Add to database"):
+                promote_name = st.text_input("Name", key=f"promote_name_{incident['id']}")
+                promote_pass = st.text_input("Admin Password", type="password",
+                                             key=f"promote_pass_{incident['id']}")
+                if st.button("Register", key=f"promote_{incident['id']}", disabled=not promote_name):
+                    if promote_pass != ADMIN_PASSWORD:
+                        st.error("Incorrect admin password")
+                        log_event("Security Alert", "Admin password verification failed")
+                    elif promote_incident(incident["id"], promote_name):
+                        log_event("Admin Action",
+                                  f"Registered {promote_name} from unknown-face incident #{incident['id']}")
+                        st.rerun()
+            if cols[2].button("Dismiss", key=f"dismiss_{incident['id']}"):
+                get_unknown_faces().remove(incident["id"])
+                st.rerun()
+        if len(incidents) > ALERTS_SHOWN:
+            st.caption(f"...and {len(incidents) - ALERTS_SHOWN} more")
+    else:
+        st.success("No unknown visitors")
+    
     # Logout button
     st.divider()
     if st.button("Logout", type="primary"):
@@ -609,6 +946,39 @@ simulation_mode = st.sidebar.toggle(
 )
 st.session_state.simulation_mode = simulation_mode
 
+# Face detector selection
+st.sidebar.markdown("#### Face Detection")
+with st.sidebar:
+    show_model_status()
+if get_models().ready:
+    from face_detectors import DETECTORS
+    detector_settings = st.session_state.detector_settings
+    detector_settings["backend"] = st.sidebar.selectbox(
+        "Detector",
+        list(DETECTORS.keys()),
+        index=list(DETECTORS.keys()).index(detector_settings["backend"]),
+        key="detector_backend"
+    )
+    detector_settings["downscale"] = st.sidebar.select_slider(
+        "Detection Scale",
+        options=[0.25, 0.5, 0.75, 1.0],
+        value=detector_settings["downscale"],
+        key="detector_downscale"
+    )
+    detector_settings["confidence"] = st.sidebar.slider(
+        "Detection Confidence", 0.1, 0.9,
+        value=detector_settings["confidence"],
+        step=0.05,
+        key="detector_confidence"
+    )
+    detector_stats = get_detector().stats()
+    if detector_settings["backend"] in detector_failures():
+        st.sidebar.caption(f"{detector_settings['backend'].upper()} unavailable "
+                           f"({detector_failures()[detector_settings['backend']]}), using HOG")
+    if detector_stats["calls"]:
+        st.sidebar.caption(f"{detector_stats['detector'].upper()} detector: "
+                           f"{detector_stats['avg_ms']:.1f} ms/frame avg over {detector_stats['calls']} frames")
+
 # System Simulation Controls
 st.sidebar.markdown("#### System Simulation")
 if st.sidebar.button("Simulate Power Outage"):
@@ -616,11 +986,7 @@ if st.sidebar.button("Simulate Power Outage"):
     st.rerun()
 
 if st.sidebar.button("Restore Power"):
-    if st.session_state.system_status["battery_backup"]:
-        st.session_state.system_status["battery_backup"] = False
-        st.session_state.system_status["battery_depletion_time"] = None
-        log_event("System Event", "Power restored")
-        send_alert("Main power restored", "info")
+    if get_controller().restore_power():
         st.rerun()
 
 if st.sidebar.button("Trigger Self-Healing"):
@@ -637,11 +1003,11 @@ if st.session_state.clear_db_mode:
     
     if confirm_col.button("Confirm Clear"):
         if admin_pass == ADMIN_PASSWORD:
-            save_database({})
-            log_event("Admin Action", "Database cleared")
-            st.sidebar.success("Database cleared successfully")
-            st.session_state.clear_db_mode = False
-            st.rerun()
+            if clear_database():
+                log_event("Admin Action", "Database cleared")
+                st.sidebar.success("Database cleared successfully")
+                st.session_state.clear_db_mode = False
+                st.rerun()
         else:
             st.sidebar.error("Incorrect admin password")
             log_event("Security Alert", "Failed database clear attempt")
@@ -650,19 +1016,23 @@ if st.session_state.clear_db_mode:
         st.session_state.clear_db_mode = False
         st.rerun()
 
+def export_logs_csv():
+    """CSV of the whole event history, built only when the download is clicked"""
+    get_log_writer().flush()
+    # Rows stream from the store to disk, the bytes handed to the browser are the only full copy
+    with tempfile.TemporaryFile("w+", newline="", encoding="utf-8") as export_file:
+        get_event_store().export_csv(export_file)
+        export_file.flush()
+        export_file.buffer.seek(0)
+        return export_file.buffer.read()
+
 # Export logs button
-if st.sidebar.button("Export Access Logs"):
-    try:
-        with open(ACCESS_LOG_FILE, "r") as f:
-            log_content = f.read()
-        st.sidebar.download_button(
-            label="Download Logs",
-            data=log_content,
-            file_name="security_logs.csv",
-            mime="text/csv"
-        )
-    except Exception as e:
-        st.sidebar.error(f"Error exporting logs: {e}")
+st.sidebar.download_button(
+    label="Export Access Logs",
+    data=export_logs_csv,
+    file_name="security_logs.csv",
+    mime="text/csv"
+)
 
 # Display current user status
 st.sidebar.divider()
@@ -678,9 +1048,19 @@ st.sidebar.metric("Uptime", get_uptime())
 battery_status = "🟢 Active" if st.session_state.system_status["battery_backup"] else "⚪ Inactive"
 st.sidebar.markdown(f"**Battery Backup:** {battery_status}")
 st.sidebar.metric("System Faults", st.session_state.system_status["faults"])
-
-# Initialize log file
-if not os.path.exists(ACCESS_LOG_FILE):
-    with open(ACCESS_LOG_FILE, "w") as f:
-        f.write("Timestamp,Event,User,Details\n")
-    log_event("System Event", "Log file initialized")
\ No newline at end of file
+gallery_cache = load_database()
+if gallery_cache is not None:
+    cache_stats = gallery_cache.stats()
+    st.sidebar.caption(f"Face gallery: {cache_stats['size']} encodings · "
+                       f"cache {cache_stats['hits']} hits / {cache_stats['misses']} misses · "
+                       f"{cache_stats['store_mb']:.1f} MB on disk, {INDEX_BACKEND} index and identity tables "
+                       f"{cache_stats['index_mb']:.1f} MB in RAM")
+pipeline_stats = metrics.REGISTRY.snapshot()
+detect_p95 = pipeline_stats["stages"].get("detect", {}).get("p95")
+st.sidebar.caption(f"Pipeline: {pipeline_stats['counters'].get('frames', 0)} frames, "
+                   f"{pipeline_stats['counters'].get('faces', 0)} faces"
+                   + (f" · detect p95 {detect_p95:.0f} ms" if detect_p95 is not None else ""))
+log_stats = get_log_writer().stats()
+if log_stats["dropped"] or log_stats["errors"]:
+    st.sidebar.warning(f"Access log: {log_stats['dropped']} events dropped, {log_stats['errors']} write errors"
+                       + (f" ({log_stats['last_error']})" if log_stats["last_error"] else ""))
@@ -0,0 +1,144 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future
+import dlib
+import numpy as np
+import face_recognition.api as face_api
+
+# Batching Configuration
+ENCODER_BATCH_SIZE = 16  # Face chips per ResNet call
+ENCODER_MAX_WAIT_MS = 20  # Longest a chip waits for its batch to fill
+CHIP_SIZE = 150  # dlib ResNet input size
+CHIP_PADDING = 0.25  # Same padding face_recognition.face_encodings uses
+
+
+def align_faces(rgb_frame, face_locations, landmark_model="small"):
+    """Landmark and crop each face into an aligned 150x150 chip (what the encoder consumes)"""
+    if not face_locations:
+        return []
+    predictor = face_api.pose_predictor_5_point if landmark_model == "small" else face_api.pose_predictor_68_point
+    shapes = dlib.full_object_detections()
+    for top, right, bottom, left in face_locations:
+        shapes.append(predictor(rgb_frame, dlib.rectangle(left, top, right, bottom)))
+    return list(dlib.get_face_chips(rgb_frame, shapes, size=CHIP_SIZE, padding=CHIP_PADDING))
+
+
+def encode_chips(chips, num_jitters=1):
+    """One batched ResNet call for many aligned chips, returns float32 (n, 128)"""
+    if not chips:
+        return np.empty((0, 128), dtype=np.float32)
+    descriptors = face_api.face_encoder.compute_face_descriptor(chips, num_jitters)
+    return np.array([np.array(d) for d in descriptors], dtype=np.float32)
+
+
+class BatchEncoder:
+    """Collects face chips from many frames/cameras and encodes them in batches
+
+    A batch is run when batch_size chips are queued or the oldest queued chip
+    has waited max_wait_ms, whichever comes first. Every batch runs on one
+    thread of the calling process, so on a CPU build of dlib it trades the
+    worker pool's parallel encoding for fewer, larger ResNet calls; it pays
+    off with a CUDA build, benchmark before enabling it.
+    """
+
+    def __init__(self, batch_size=ENCODER_BATCH_SIZE, max_wait_ms=ENCODER_MAX_WAIT_MS, num_jitters=1):
+        self.batch_size = batch_size
+        self.max_wait_ms = max_wait_ms
+        self.num_jitters = num_jitters
+        self._pending = deque()  # (enqueue time, chips, future)
+        self._pending_chips = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self.batches = 0
+        self.faces = 0
+        self.timings = deque(maxlen=200)  # (batch size, encode ms, oldest wait ms)
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="batch-encoder", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def submit(self, chips):
+        """Queue one frame's chips, returns a Future resolving to their encodings"""
+        future = Future()
+        if not chips:
+            future.set_result(np.empty((0, 128), dtype=np.float32))
+            return future
+        with self._cond:
+            self._pending.append((time.perf_counter(), list(chips), future))
+            self._pending_chips += len(chips)
+            self._cond.notify_all()
+        return future
+
+    def encode(self, chips, timeout=None):
+        """Blocking helper: submit and wait"""
+        return self.submit(chips).result(timeout)
+
+    def _take_batch(self):
+        """Wait for a full batch or the deadline, then pop whole frames up to batch_size chips"""
+        with self._cond:
+            while self._running:
+                if self._pending:
+                    waited_ms = (time.perf_counter() - self._pending[0][0]) * 1000
+                    if self._pending_chips >= self.batch_size or waited_ms >= self.max_wait_ms:
+                        break
+                    self._cond.wait((self.max_wait_ms - waited_ms) / 1000)
+                else:
+                    self._cond.wait()
+            if not self._pending:
+                return [], 0.0
+            oldest_wait_ms = (time.perf_counter() - self._pending[0][0]) * 1000
+            batch, count = [], 0
+            while self._pending and (not batch or count + len(self._pending[0][1]) <= self.batch_size):
+                item = self._pending.popleft()
+                batch.append(item)
+                count += len(item[1])
+            self._pending_chips -= count
+            return batch, oldest_wait_ms
+
+    def _run(self):
+        while True:
+            batch, oldest_wait_ms = self._take_batch()
+            if not batch:
+                if not self._running:
+                    return
+                continue
+            chips = [chip for _, frame_chips, _ in batch for chip in frame_chips]
+            start = time.perf_counter()
+            try:
+                encodings = encode_chips(chips, self.num_jitters)
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            encode_ms = (time.perf_counter() - start) * 1000
+            self.batches += 1
+            self.faces += len(chips)
+            self.timings.append((len(chips), encode_ms, oldest_wait_ms))
+            offset = 0
+            for _, frame_chips, future in batch:
+                future.set_result(encodings[offset:offset + len(frame_chips)])
+                offset += len(frame_chips)
+
+    def stats(self):
+        timings = list(self.timings)
+        return {
+            "batches": self.batches,
+            "faces": self.faces,
+            "avg_batch_size": self.faces / self.batches if self.batches else 0.0,
+            "avg_batch_ms": float(np.mean([t[1] for t in timings])) if timings else 0.0,
+            "avg_face_ms": sum(t[1] for t in timings) / sum(t[0] for t in timings) if timings else 0.0,
+            "avg_wait_ms": float(np.mean([t[2] for t in timings])) if timings else 0.0,
+        }
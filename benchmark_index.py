@@ -0,0 +1,93 @@
+"""Recall@1, latency and memory footprint of the face index backends on synthetic galleries
+
+"f32 MB" is the float32 gallery (the on-disk store, memory-mapped at runtime);
+"index MB" is what the backend, norms and identity tables keep in RAM on top of it. Quantized backends
+(fp16, sq8, pq) only read float32 rows for the candidates they re-rank.
+
+Usage: python benchmark_index.py --sizes 1000 10000 100000 --backends brute ivf sq8 pq
+"""
+import argparse
+import time
+import numpy as np
+from face_gallery import FaceGallery
+from face_index import INDEX_BACKENDS, make_index
+
+
+def synthetic_gallery(size, dim=128, seed=0):
+    """Random unit-scale encodings resembling dlib descriptors (pairwise distance ~0.6-1.0)"""
+    rng = np.random.default_rng(seed)
+    return (rng.normal(0, 0.06, (size, dim))).astype(np.float32)
+
+
+def noisy_queries(gallery, count, noise=0.02, seed=1):
+    """Re-captures of enrolled faces: returns (queries, true row ids)"""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(gallery), count, replace=False)
+    queries = gallery[rows] + rng.normal(0, noise, (count, gallery.shape[1])).astype(np.float32)
+    return queries, rows
+
+
+def run(size, backend, queries_count, nprobe, target_recall):
+    embeddings = synthetic_gallery(size)
+    queries, truth = noisy_queries(embeddings, min(queries_count, size))
+    params = {"nprobe": nprobe} if backend == "ivf" else {}
+    index = make_index(backend, **params)
+
+    start = time.perf_counter()
+    gallery = FaceGallery(capacity=size, index=index)
+    gallery.add_many([str(i) for i in range(size)], embeddings)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    if backend == "ivf" and target_recall is not None:
+        index.calibrate(gallery.embeddings, gallery._sq_norms[:len(gallery)], target_recall)
+
+    exact = FaceGallery(capacity=size)
+    exact.add_many(gallery.names, embeddings)
+    exact_idx, _ = exact.search(queries, 1)
+
+    # Per-face latency, matching one face per call like the capture loop
+    latencies = []
+    found = []
+    for query in queries:
+        start = time.perf_counter()
+        idx, _ = gallery.search(query, 1)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found.append(idx[0, 0] if idx.shape[1] else -1)
+    found = np.array(found)
+
+    return {
+        "size": size,
+        "backend": backend,
+        "build_ms": build_ms,
+        "recall@1": float(np.mean(found == exact_idx[:, 0])),
+        "identity_acc": float(np.mean(found == truth)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "nprobe": getattr(index, "nprobe", None),
+        "f32_mb": embeddings.nbytes / 1024 / 1024,
+        "index_mb": gallery.memory_bytes() / 1024 / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--backends", nargs="+", default=["brute", "ivf"], choices=list(INDEX_BACKENDS))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--target-recall", type=float, default=None,
+                        help="Calibrate IVF nprobe to reach this recall@1 against exact search")
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'backend':>7} {'build ms':>9} {'recall@1':>8} {'p50 ms':>7} {'p95 ms':>7} {'nprobe':>6} "
+          f"{'f32 MB':>7} {'index MB':>8} {'B/row':>6}")
+    for size in args.sizes:
+        for backend in args.backends:
+            r = run(size, backend, args.queries, args.nprobe, args.target_recall)
+            print(f"{r['size']:>8} {r['backend']:>7} {r['build_ms']:>9.1f} {r['recall@1']:>8.3f} "
+                  f"{r['p50_ms']:>7.3f} {r['p95_ms']:>7.3f} {str(r['nprobe']):>6} "
+                  f"{r['f32_mb']:>7.1f} {r['index_mb']:>8.1f} {r['index_mb'] * 1024 * 1024 / size:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""End-to-end benchmark of the detect -> encode -> match -> log pipeline
+
+Frames come from recorded fixtures (video files or image folders), so runs
+are reproducible. Detection and encoding are timed once per fixture frame.
+Matching and logging are timed against synthetic galleries of each size.
+Results are written as JSON, and --baseline prints the change against an
+earlier run.
+
+Usage: python benchmark_pipeline.py --fixture fixtures/door.mp4 --fixture fixtures/faces/ \
+           --sizes 10 1000 100000 1000000 --output bench.json [--baseline previous.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import platform
+import tempfile
+import subprocess
+import cv2
+import numpy as np
+import face_recognition
+from access_log import AsyncLogWriter
+from benchmark_index import synthetic_gallery, noisy_queries
+from camera_stream import open_capture
+from event_store import EventStore
+from face_detectors import DETECTORS, make_detector
+from face_gallery import FaceGallery, UNKNOWN_NAME
+from face_index import INDEX_BACKENDS, make_index
+from metrics import latency_summary
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_SIZES = [10, 1000, 100000, 1000000]
+MAX_FRAMES = 200  # Frames read per fixture
+RECALL_QUERIES = 500
+MATCH_TOLERANCE = 0.5
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, None where unsupported"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_frames(fixtures, detector, max_frames):
+    """Decode, detect and encode every fixture frame; returns (per-stage ms lists, encodings per frame)"""
+    stages = {"decode": [], "detect": [], "encode": []}
+    frame_encodings = []
+    for fixture in fixtures:
+        capture = open_capture(fixture)
+        try:
+            for _ in range(max_frames):
+                start = time.perf_counter()
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                stages["decode"].append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                locations = detector.detect(rgb_frame)
+                stages["detect"].append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                encodings = face_recognition.face_encodings(rgb_frame, locations) if locations else []
+                stages["encode"].append((time.perf_counter() - start) * 1000)
+                frame_encodings.append(np.array(encodings, dtype=np.float32).reshape(-1, 128))
+        finally:
+            capture.release()
+    return stages, frame_encodings
+
+
+def run_gallery(size, backend, stages, frame_encodings, recall_queries):
+    """Match every frame's encodings against a synthetic gallery and log the outcome"""
+    embeddings = synthetic_gallery(size)
+    start = time.perf_counter()
+    gallery = FaceGallery(capacity=size, index=make_index(backend))
+    gallery.add_many([str(i) for i in range(size)], embeddings)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    # Frames without faces still pay for the (empty) match call, as in the capture loop
+    match_ms, log_ms = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = AsyncLogWriter(EventStore(os.path.join(tmp, "events.db")))
+        for encodings in frame_encodings:
+            start = time.perf_counter()
+            frame_matches = gallery.match(encodings, tolerance=MATCH_TOLERANCE) if len(encodings) else []
+            match_ms.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            for name, _ in frame_matches:
+                if name == UNKNOWN_NAME:
+                    writer.write((timestamp, "Security Alert", "System", "Unauthorized face detected"))
+                else:
+                    writer.write((timestamp, "Access", name, "Face recognized"))
+            log_ms.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        writer.flush()
+        flush_ms = (time.perf_counter() - start) * 1000
+        writer.close()
+        logged = writer.written
+
+    # Recall: noisy re-captures of enrolled rows must come back as the right identity
+    queries, truth = noisy_queries(embeddings, min(recall_queries, size))
+    found = gallery.match(queries, tolerance=MATCH_TOLERANCE)
+    recall = float(np.mean([name == str(row) for (name, _), row in zip(found, truth)]))
+
+    per_frame_ms = (np.array(stages["decode"]) + np.array(stages["detect"]) + np.array(stages["encode"])
+                    + np.array(match_ms) + np.array(log_ms))
+
+    return {
+        "size": size,
+        "backend": backend,
+        "build_ms": build_ms,
+        "gallery_mb": embeddings.nbytes / 1024 / 1024,
+        "index_mb": gallery.memory_bytes() / 1024 / 1024,
+        "match": latency_summary(match_ms),
+        "log": latency_summary(log_ms),
+        "log_flush_ms": flush_ms,
+        "events_logged": logged,
+        "pipeline": latency_summary(per_frame_ms),
+        "fps": float(1000 / per_frame_ms.mean()),
+        "recall": recall,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare(results, baseline):
+    """Print p95 / fps / recall changes against an earlier results file"""
+    previous = {(r["size"], r["backend"]): r for r in baseline["galleries"]}
+    print(f"\nChange vs baseline {baseline.get('revision') or baseline['timestamp']}:")
+    for stage in ("decode", "detect", "encode"):
+        old, new = baseline["stages"][stage].get("p95"), results["stages"][stage].get("p95")
+        if old and new:
+            print(f"  {stage:>7} p95 {old:8.2f} -> {new:8.2f} ms ({(new - old) / old:+.0%})")
+    for r in results["galleries"]:
+        old = previous.get((r["size"], r["backend"]))
+        if old is None:
+            continue
+        for key in ("match", "pipeline"):
+            if old[key].get("p95") and r[key].get("p95"):
+                print(f"  {r['size']:>8} {key:>8} p95 {old[key]['p95']:8.2f} -> {r[key]['p95']:8.2f} ms "
+                      f"({(r[key]['p95'] - old[key]['p95']) / old[key]['p95']:+.0%})")
+        print(f"  {r['size']:>8}      fps {old['fps']:8.1f} -> {r['fps']:8.1f}, "
+              f"recall {old['recall']:.3f} -> {r['recall']:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the detect -> encode -> match -> log pipeline")
+    parser.add_argument("--fixture", action="append", required=True,
+                        help="Video file or image folder (repeatable)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--backend", default="brute", choices=list(INDEX_BACKENDS))
+    parser.add_argument("--detector", default="hog", choices=list(DETECTORS))
+    parser.add_argument("--downscale", type=float, default=0.5)
+    parser.add_argument("--max-frames", type=int, default=MAX_FRAMES)
+    parser.add_argument("--recall-queries", type=int, default=RECALL_QUERIES)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    detector = make_detector(args.detector, downscale=args.downscale)
+    stages, frame_encodings = run_frames(args.fixture, detector, args.max_frames)
+    if not frame_encodings:
+        print("No frames could be read from the fixtures")
+        return 1
+    faces = sum(len(e) for e in frame_encodings)
+    print(f"{len(frame_encodings)} frames, {faces} faces")
+
+    results = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "args": vars(args),
+        "frames": len(frame_encodings),
+        "faces": faces,
+        "stages": {stage: latency_summary(samples) for stage, samples in stages.items()},
+        "galleries": [],
+    }
+    for stage, summary in results["stages"].items():
+        print(f"  {stage:>7} p50 {summary['p50']:8.2f}  p95 {summary['p95']:8.2f}  p99 {summary['p99']:8.2f} ms")
+
+    print(f"{'size':>8} {'match p95':>10} {'log p95':>8} {'frame p95':>10} {'fps':>6} {'recall':>7} {'rss MB':>7}")
+    for size in args.sizes:
+        result = run_gallery(size, args.backend, stages, frame_encodings, args.recall_queries)
+        results["galleries"].append(result)
+        print(f"{size:>8} {result['match']['p95']:>10.3f} {result['log']['p95']:>8.3f} "
+              f"{result['pipeline']['p95']:>10.2f} {result['fps']:>6.1f} {result['recall']:>7.3f} "
+              f"{result['peak_rss_mb'] or 0:>7.0f}")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
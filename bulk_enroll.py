@@ -0,0 +1,188 @@
+"""Offline bulk enrollment from a person_name/*.jpg directory tree
+
+Images are detected and encoded in a process pool. Every successful encoding
+is recorded in a progress file, so an interrupted run resumes where it stopped
+and retries only the images that failed or were never reached. When all images
+are done, the encodings are written to the face store as one new generation,
+tagged with the run's batch id, and the progress file is marked committed. A
+run interrupted after the store switch sees its batch id in the store and only
+marks the progress file.
+
+Usage: python bulk_enroll.py path/to/people [--workers 8] [--max-per-person 5] [--replace]
+"""
+import os
+import sys
+import json
+import uuid
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import face_recognition
+from face_detectors import make_detector
+from face_quality import assess_face
+from face_gallery import select_diverse
+from face_store import FaceStore
+from config import FACE_STORE_DIR
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+MAX_PER_PERSON = 5  # Encodings kept per identity
+
+_worker_detector = None
+
+
+def find_images(base_path):
+    """Return [(image_path, label)] like create_dataframe in model-comparison.ipynb"""
+    data = []
+    for label in sorted(os.listdir(base_path)):
+        label_path = os.path.join(base_path, label)
+        if os.path.isdir(label_path):
+            for img_file in sorted(os.listdir(label_path)):
+                if img_file.lower().endswith(IMAGE_EXTENSIONS):
+                    data.append((os.path.join(label_path, img_file), label))
+    return data
+
+
+def _init_worker(detector, downscale):
+    global _worker_detector
+    _worker_detector = make_detector(detector, downscale=downscale)
+
+
+def encode_image(image_path):
+    """Worker task: (encoding, quality 0-1, rejection reason, error) for the largest face in one image
+
+    The encoding is None if no face was found or the face failed the quality gate.
+    """
+    try:
+        image = face_recognition.load_image_file(image_path)
+        locations = _worker_detector.detect(image)
+        if not locations:
+            return None, 0.0, None, None
+        # Enrollment photos show one person: keep the largest face
+        location = max(locations, key=lambda l: (l[2] - l[0]) * (l[1] - l[3]))
+        # Blurry, badly lit or side-on photos make poor references, skip them before encoding
+        assessment = assess_face(image, location)
+        if not assessment["passed"]:
+            return None, 0.0, assessment["reason"], None
+        encoding = face_recognition.face_encodings(image, [location])[0]
+        return [float(v) for v in encoding], assessment["score"], None, None
+    except Exception as e:
+        return None, 0.0, None, str(e)
+
+
+def load_progress(progress_path):
+    """Return (batch id, {image_path: record}) encoded by a previous run, starting a new batch if none"""
+    batch, done = None, {}
+    if os.path.exists(progress_path):
+        with open(progress_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line from an interrupted run
+                if "batch" in record:
+                    batch = record["batch"]
+                else:
+                    done[record["path"]] = record
+    if batch is None:
+        batch = uuid.uuid4().hex
+        with open(progress_path, "w") as f:
+            f.write(json.dumps({"batch": batch}) + "\n")
+    return batch, done
+
+
+def select_encodings(records, max_per_person):
+    """Group successful records per person, keeping a diverse, good-quality subset"""
+    people = {}
+    for record in records:
+        if record.get("encoding") is not None:
+            people.setdefault(record["label"], []).append(record)
+    for label, person_records in people.items():
+        selected = select_diverse([r["encoding"] for r in person_records],
+                                  [r["quality"] for r in person_records], max_per_person)
+        people[label] = [person_records[i] for i in selected]
+    return people
+
+
+def committed(store, batch):
+    """Rows a previous run of this batch already wrote to the store"""
+    return sum(1 for m in store.metadata if m.get("batch") == batch)
+
+
+def commit(store, people, batch, replace=False):
+    """Write every selected encoding to the store in one atomic generation switch"""
+    names, encodings, metadata = [], [], []
+    for label, records in people.items():
+        for record in records:
+            names.append(label)
+            encodings.append(record["encoding"])
+            metadata.append({"source": os.path.basename(record["path"]), "batch": batch})
+    store.enroll_batch(names, np.array(encodings, dtype=np.float32).reshape(-1, store.dim), metadata,
+                       replace=list(people) if replace else ())
+    return len(names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-enroll faces from person_name/*.jpg folders")
+    parser.add_argument("base_path")
+    parser.add_argument("--store", default=FACE_STORE_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--detector", default="hog")
+    parser.add_argument("--downscale", type=float, default=1.0)
+    parser.add_argument("--max-per-person", type=int, default=MAX_PER_PERSON)
+    parser.add_argument("--replace", action="store_true", help="Replace existing enrollments for each person")
+    parser.add_argument("--progress", default=None, help="Progress file (default: <base_path>/.enroll_progress.jsonl)")
+    args = parser.parse_args()
+
+    progress_path = args.progress or os.path.join(args.base_path, ".enroll_progress.jsonl")
+    images = find_images(args.base_path)
+    batch, done = load_progress(progress_path)
+    todo = [(path, label) for path, label in images if path not in done]
+    print(f"{len(images)} images, {len(done)} already encoded, {len(todo)} to go")
+    results = dict(done)
+
+    with open(progress_path, "a") as progress, \
+            ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                initargs=(args.detector, args.downscale)) as pool:
+        futures = {pool.submit(encode_image, path): (path, label) for path, label in todo}
+        for i, future in enumerate(as_completed(futures), 1):
+            path, label = futures[future]
+            encoding, quality, rejected, error = future.result()
+            record = {"path": path, "label": label, "encoding": encoding, "quality": quality,
+                      "rejected": rejected, "error": error}
+            if encoding is not None:
+                # Only successes are final, no-face, rejected and failed images are retried on resume
+                progress.write(json.dumps(record) + "\n")
+                progress.flush()
+            results[path] = record
+            if i % 50 == 0 or i == len(todo):
+                print(f"  {i}/{len(todo)} encoded")
+
+    records = [results[path] for path, _ in images if path in results]
+    people = select_encodings(records, args.max_per_person)
+    store = FaceStore(args.store)
+    count = committed(store, batch)
+    if not count:
+        count = commit(store, people, batch, replace=args.replace)
+    os.replace(progress_path, progress_path + ".committed")
+
+    no_face = [r["path"] for r in records if r["encoding"] is None and not r["error"] and not r.get("rejected")]
+    rejected = [(r["path"], r["rejected"]) for r in records if r.get("rejected")]
+    failed = [(r["path"], r["error"]) for r in records if r["error"]]
+    print(f"Enrolled {count} encodings for {len(people)} people into {args.store}")
+    if no_face:
+        print(f"{len(no_face)} images with no detected face:")
+        for path in no_face:
+            print(f"  {path}")
+    if rejected:
+        print(f"{len(rejected)} images failed the quality check:")
+        for path, reason in rejected:
+            print(f"  {path}: {reason}")
+    if failed:
+        print(f"{len(failed)} images could not be read:")
+        for path, error in failed:
+            print(f"  {path}: {error}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
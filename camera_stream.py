@@ -0,0 +1,154 @@
+import os
+import time
+import threading
+from collections import deque
+import cv2
+
+# Stream Configuration
+FRAME_BUFFER_SIZE = 1  # Frames kept for the consumer, oldest dropped first (1 = latest frame only)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+class ImageFolderCapture:
+    """cv2.VideoCapture look-alike over a directory of still images"""
+
+    def __init__(self, directory):
+        self.paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                            if name.lower().endswith(IMAGE_EXTENSIONS))
+        self.position = 0
+
+    def isOpened(self):
+        return bool(self.paths)
+
+    def read(self):
+        while self.position < len(self.paths):
+            frame = cv2.imread(self.paths[self.position])
+            self.position += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def get(self, prop):
+        return 0.0
+
+    def release(self):
+        self.position = len(self.paths)
+
+
+def open_capture(source):
+    """Open a camera index, video file or image directory"""
+    if isinstance(source, str) and os.path.isdir(source):
+        return ImageFolderCapture(source)
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    return cv2.VideoCapture(source)
+
+
+class CameraStream:
+    """Reads frames on a background thread into a bounded, drop-oldest buffer
+
+    Live cameras are read as fast as they deliver. File and folder sources are
+    paced to `fps` (the file's own rate by default) when realtime=True, or read
+    without dropping anything when realtime=False, which suits tests.
+    """
+
+    def __init__(self, source=0, buffer_size=FRAME_BUFFER_SIZE, realtime=True, fps=None, loop=False):
+        self.source = source
+        self.is_file = not isinstance(source, int) and not str(source).isdigit()
+        self.realtime = realtime
+        self.loop = loop
+        self.capture = open_capture(source)
+        self.fps = fps or (self.capture.get(cv2.CAP_PROP_FPS) if self.is_file else 0) or 30.0
+        self._buffer = deque(maxlen=buffer_size)
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self.ended = False
+        self.frames_read = 0
+        self.frames_delivered = 0
+        self.frames_dropped = 0
+
+    def start(self):
+        if self.isOpened() and self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._reader, name=f"camera-{self.source}", daemon=True)
+            self._thread.start()
+        return self
+
+    def isOpened(self):
+        return self.capture is not None and self.capture.isOpened()
+
+    def _reader(self):
+        try:
+            self._read_loop()
+        finally:
+            with self._cond:
+                self.ended = True
+                self._cond.notify_all()
+            # The reader owns the capture: releasing it from another thread mid-read() can crash
+            self.capture.release()
+
+    def _read_loop(self):
+        interval = 1.0 / self.fps if self.is_file and self.realtime else 0.0
+        next_due = time.perf_counter()
+        while self._running:
+            ok, frame = self.capture.read()
+            if not ok:
+                if self.is_file and self.loop:
+                    self.capture.release()
+                    self.capture = open_capture(self.source)
+                    continue
+                break
+            timestamp = time.time()
+            with self._cond:
+                if self.is_file and not self.realtime:
+                    # Lossless mode: wait for the consumer instead of dropping
+                    while self._running and len(self._buffer) == self._buffer.maxlen:
+                        self._cond.wait(0.1)
+                if len(self._buffer) == self._buffer.maxlen:
+                    self.frames_dropped += 1
+                self.frames_read += 1
+                self._buffer.append((self.frames_read, timestamp, frame))
+                self._cond.notify_all()
+            if interval:
+                next_due += interval
+                time.sleep(max(0.0, next_due - time.perf_counter()))
+
+    def read_frame(self, timeout=2.0):
+        """Return (ok, frame, timestamp) for the oldest buffered frame newer than the last one read"""
+        deadline = time.time() + timeout
+        with self._cond:
+            while not self._buffer:
+                remaining = deadline - time.time()
+                if self.ended or remaining <= 0 or self._thread is None:
+                    return False, None, None
+                self._cond.wait(remaining)
+            _, timestamp, frame = self._buffer.popleft()
+            self.frames_delivered += 1
+            self._cond.notify_all()
+            return True, frame, timestamp
+
+    def read(self):
+        """cv2.VideoCapture-compatible (ok, frame)"""
+        ok, frame, _ = self.read_frame()
+        return ok, frame
+
+    def release(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            if self._thread.is_alive():
+                return  # Still blocked in read(): the reader releases the capture when it returns
+            self._thread = None
+        elif self.capture is not None:
+            self.capture.release()
+
+    def stats(self):
+        return {
+            "source": str(self.source),
+            "read": self.frames_read,
+            "delivered": self.frames_delivered,
+            "dropped": self.frames_dropped,
+        }
@@ -0,0 +1,10 @@
+"""Storage locations shared by the app, the recognition service, the HTTP API and the CLIs"""
+import os
+
+# Storage Configuration
+DATABASE_FILE = "face_database.pkl"  # Legacy pickle database, migrated on first start
+FACE_STORE_DIR = "face_store"  # Memory-mapped embeddings + name sidecar
+INDEX_FILE = os.path.join(FACE_STORE_DIR, "face_index.npz")  # Search index persisted next to the database
+INDEX_BACKEND = "brute"  # brute (exact), ivf (partitioned), hnsw (needs hnswlib), fp16 / sq8 / pq (quantized)
+EVENT_DB_FILE = "events.db"  # SQLite event store (access logs, alerts, system events)
+ACCESS_LOG_FILE = "access_log.csv"  # Legacy CSV log, imported into the event store on first start
@@ -0,0 +1,91 @@
+import time
+from face_gallery import UNKNOWN_NAME
+
+# Decision Configuration
+MATCH_TOLERANCE = 0.5  # A frame votes for an identity only within this distance
+ACCEPT_VOTES = 3  # Frames that must agree on the same identity
+ACCEPT_MARGIN = 0.05  # ...with a mean distance at least this far inside the tolerance
+REJECT_DISTANCE = 0.6  # Faces farther than this from everyone vote "stranger"
+REJECT_VOTES = 5  # Stranger votes (with no identity votes) that end the attempt early
+MAX_FRAMES = 30
+TIME_BUDGET = 6.0  # Seconds before the attempt is given up
+
+
+class SequentialDecision:
+    """Accumulates per-identity distance evidence across frames until a decision is clear
+
+    update() is called once per processed frame with that frame's matches and
+    returns None while undecided, or a decision dict whose "outcome" is
+    "accept" (with "name"), "reject" (consistently a stranger) or "timeout"
+    (frame limit or time budget used up without a clear answer).
+    """
+
+    def __init__(self, tolerance=MATCH_TOLERANCE, accept_votes=ACCEPT_VOTES, accept_margin=ACCEPT_MARGIN,
+                 reject_distance=REJECT_DISTANCE, reject_votes=REJECT_VOTES, max_frames=MAX_FRAMES,
+                 time_budget=TIME_BUDGET, clock=time.monotonic):
+        self.tolerance = tolerance
+        self.accept_votes = accept_votes
+        self.accept_margin = accept_margin
+        self.reject_distance = max(reject_distance, tolerance)
+        self.reject_votes = reject_votes
+        self.max_frames = max_frames
+        self.time_budget = time_budget
+        self.clock = clock
+        self.started = clock()
+        self.frames = 0
+        self.evidence = {}  # name -> [distance per voting frame]
+        self.stranger_votes = 0
+        self.decision = None
+
+    def is_stranger(self, name, distance):
+        return name == UNKNOWN_NAME and distance >= self.reject_distance
+
+    def _leader(self):
+        """(name, votes, mean distance) of the identity with the most votes"""
+        if not self.evidence:
+            return None, 0, None
+        name, distances = max(self.evidence.items(), key=lambda item: (len(item[1]), -min(item[1])))
+        return name, len(distances), sum(distances) / len(distances)
+
+    def _decide(self, outcome, name=None):
+        leader, votes, mean_distance = self._leader()
+        self.decision = {
+            "outcome": outcome,
+            "name": name,
+            "frames": self.frames,
+            "elapsed": self.clock() - self.started,
+            "votes": votes if name else 0,
+            "mean_distance": mean_distance if name else None,
+            "stranger_votes": self.stranger_votes,
+        }
+        return self.decision
+
+    def update(self, matches):
+        """Feed one frame's [(name, distance), ...]; returns the decision once there is one"""
+        if self.decision is not None:
+            return self.decision
+        self.frames += 1
+        # Votes count frames, not faces: a crowd of strangers in one frame is still one stranger vote,
+        # and an identity seen twice in a frame votes once with its closer distance
+        best = {}
+        stranger = False
+        for name, distance in matches:
+            if name != UNKNOWN_NAME and distance <= self.tolerance:
+                best[name] = min(distance, best.get(name, distance))
+            elif self.is_stranger(name, distance):
+                stranger = True
+        for name, distance in best.items():
+            self.evidence.setdefault(name, []).append(distance)
+        if stranger:
+            self.stranger_votes += 1
+
+        leader, votes, mean_distance = self._leader()
+        runner_up = max((len(d) for n, d in self.evidence.items() if n != leader), default=0)
+        if (votes >= self.accept_votes and mean_distance <= self.tolerance - self.accept_margin
+                and votes > 2 * runner_up):
+            return self._decide("accept", leader)
+        if self.stranger_votes >= self.reject_votes and votes == 0:
+            return self._decide("reject")
+        if self.frames >= self.max_frames or self.clock() - self.started >= self.time_budget:
+            return self._decide("timeout")
+        return None
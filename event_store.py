@@ -0,0 +1,183 @@
+"""SQLite event store for access logs, alerts and system events
+
+Events live in one WAL-mode table with indexes on timestamp, event type and
+user, so the dashboard can filter and page through a year of history without
+loading it. Writes normally arrive in batches from access_log.AsyncLogWriter.
+
+Usage: python event_store.py import access_log.csv events.db
+       python event_store.py export events.db out.csv [--event "Security Alert"] [--user alice]
+"""
+import os
+import csv
+import sys
+import sqlite3
+import argparse
+import datetime
+import threading
+
+# Event Store Configuration
+EXPORT_CHUNK_SIZE = 5000  # Rows fetched per step while exporting
+EVENT_COLUMNS = ["Timestamp", "Event", "User", "Details"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    event TEXT NOT NULL,
+    user TEXT NOT NULL,
+    details TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_timestamp ON events (timestamp);
+CREATE INDEX IF NOT EXISTS events_event ON events (event, timestamp);
+CREATE INDEX IF NOT EXISTS events_user ON events (user, timestamp);
+CREATE INDEX IF NOT EXISTS events_user_event ON events (user, event, timestamp);
+"""
+
+
+class EventStore:
+    """Indexed event history; one connection per thread, safe to share between sessions"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connect()  # Create the schema up front
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def write_batch(self, events):
+        """Insert (timestamp, event, user, details) rows in one transaction"""
+        conn = self._connect()
+        with conn:
+            conn.executemany("INSERT INTO events (timestamp, event, user, details) VALUES (?, ?, ?, ?)",
+                             [tuple(str(v) for v in event) for event in events])
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @staticmethod
+    def _where(event_type=None, user=None, start=None, end=None, search=None):
+        """SQL filter for the given criteria; start/end are dates or 'YYYY-MM-DD[ HH:MM:SS]' strings"""
+        clauses, params = [], []
+        if event_type:
+            types = [event_type] if isinstance(event_type, str) else list(event_type)
+            clauses.append(f"event IN ({','.join('?' * len(types))})")
+            params.extend(types)
+        if user:
+            clauses.append("user = ?")
+            params.append(user)
+        if start:
+            clauses.append("timestamp >= ?")
+            params.append(str(start))
+        if end:
+            if isinstance(end, datetime.date) and not isinstance(end, datetime.datetime):
+                clauses.append("timestamp < ?")  # Whole end day included
+                params.append(str(end + datetime.timedelta(days=1)))
+            else:
+                clauses.append("timestamp <= ?")
+                params.append(str(end))
+        if search:
+            clauses.append("details LIKE ?")
+            params.append(f"%{search}%")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, limit=50, offset=0, **filters):
+        """Newest-first page of events as [(timestamp, event, user, details)]"""
+        where, params = self._where(**filters)
+        return self._connect().execute(
+            f"SELECT timestamp, event, user, details FROM events{where} "
+            f"ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?", params + [limit, offset]).fetchall()
+
+    def count(self, **filters):
+        where, params = self._where(**filters)
+        return self._connect().execute(f"SELECT COUNT(*) FROM events{where}", params).fetchone()[0]
+
+    def event_types(self):
+        # Skip-scan the event index instead of a DISTINCT over every row
+        return [row[0] for row in self._connect().execute(
+            "WITH RECURSIVE types(event) AS (SELECT MIN(event) FROM events UNION ALL "
+            "SELECT (SELECT MIN(event) FROM events WHERE event > types.event) FROM types "
+            "WHERE types.event IS NOT NULL) SELECT event FROM types WHERE event IS NOT NULL")]
+
+    def iter_rows(self, chunk_size=EXPORT_CHUNK_SIZE, **filters):
+        """Oldest-first events, fetched chunk by chunk so exports never hold the whole table"""
+        where, params = self._where(**filters)
+        cursor = self._connect().execute(
+            f"SELECT timestamp, event, user, details FROM events{where} ORDER BY timestamp, id", params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield from rows
+
+    def export_csv(self, f, **filters):
+        """Stream matching events into an open text file as CSV, returns the row count"""
+        writer = csv.writer(f)
+        writer.writerow(EVENT_COLUMNS)
+        count = 0
+        for row in self.iter_rows(**filters):
+            writer.writerow(row)
+            count += 1
+        return count
+
+    def import_csv(self, csv_path):
+        """Load a CSV access log (old unquoted lines included) into the store, returns the row count"""
+        batch, count = [], 0
+        with open(csv_path, newline="") as f:
+            for row in csv.reader(f):
+                if not row or row == EVENT_COLUMNS:
+                    continue
+                if len(row) > 4:  # Details with commas written before fields were quoted
+                    row = row[:3] + [",".join(row[3:])]
+                batch.append((row + [""] * 4)[:4])
+                if len(batch) >= EXPORT_CHUNK_SIZE:
+                    self.write_batch(batch)
+                    count += len(batch)
+                    batch = []
+        if batch:
+            self.write_batch(batch)
+            count += len(batch)
+        return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import or export the event store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="Load a CSV access log into the store")
+    importer.add_argument("csv_path")
+    importer.add_argument("db_path")
+    exporter = commands.add_parser("export", help="Write stored events to CSV")
+    exporter.add_argument("db_path")
+    exporter.add_argument("csv_path")
+    exporter.add_argument("--event", action="append")
+    exporter.add_argument("--user")
+    exporter.add_argument("--start")
+    exporter.add_argument("--end")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        count = EventStore(args.db_path).import_csv(args.csv_path)
+        print(f"Imported {count} events from {args.csv_path} into {args.db_path}")
+    else:
+        if not os.path.exists(args.db_path):
+            print(f"{args.db_path} not found")
+            return 1
+        with open(args.csv_path, "w", newline="") as f:
+            count = EventStore(args.db_path).export_csv(f, event_type=args.event, user=args.user,
+                                                         start=args.start, end=args.end)
+        print(f"Exported {count} events to {args.csv_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""Face detector backends with a common interface
+
+Every backend returns boxes as (top, right, bottom, left) in full-resolution
+pixel coordinates, the format face_recognition.face_encodings expects.
+
+Usage: python face_detectors.py <image_dir> [--backends hog haar yunet] [--downscale 0.5]
+"""
+import os
+import time
+import argparse
+import threading
+import cv2
+import numpy as np
+import face_recognition
+
+try:
+    from ultralytics import YOLO
+except ImportError:
+    YOLO = None
+
+# Model files (download separately, see README)
+YOLO_WEIGHTS = "yolov8n-face.pt"
+DNN_PROTOTXT = "deploy.prototxt"
+DNN_CAFFEMODEL = "res10_300x300_ssd_iter_140000.caffemodel"
+YUNET_MODEL = "face_detection_yunet_2023mar.onnx"
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+class FaceDetector:
+    """Base detector: optional downscale, confidence threshold and latency stats"""
+
+    kind = None
+    stateful = False  # True if _detect mutates the model (input size, input blob), so calls are serialized
+
+    def __init__(self, downscale=1.0, confidence=0.5):
+        if not 0 < downscale <= 1:
+            raise ValueError("downscale must be in (0, 1]")
+        self.downscale = downscale
+        self.confidence = confidence
+        self.calls = 0
+        self.total_ms = 0.0
+        self.last_ms = 0.0
+        self._lock = threading.Lock()
+
+    def _detect(self, rgb_image):
+        """Return [(top, right, bottom, left), ...] in rgb_image coordinates"""
+        raise NotImplementedError
+
+    def detect(self, rgb_frame):
+        """Detect faces in an RGB frame, boxes in full-resolution coordinates"""
+        start = time.perf_counter()
+        image = rgb_frame
+        if self.downscale < 1:
+            image = cv2.resize(rgb_frame, (0, 0), fx=self.downscale, fy=self.downscale,
+                               interpolation=cv2.INTER_AREA)
+        if self.stateful:
+            # One instance is shared by every session: another thread's setInput/forward
+            # or setInputSize must not land between ours
+            with self._lock:
+                boxes = self._detect(image)
+        else:
+            boxes = self._detect(image)
+        height, width = rgb_frame.shape[:2]
+        scale = 1.0 / self.downscale
+        locations = []
+        for top, right, bottom, left in boxes:
+            top = max(0, int(round(top * scale)))
+            left = max(0, int(round(left * scale)))
+            bottom = min(height, int(round(bottom * scale)))
+            right = min(width, int(round(right * scale)))
+            if bottom > top and right > left:
+                locations.append((top, right, bottom, left))
+        self.last_ms = (time.perf_counter() - start) * 1000
+        self.total_ms += self.last_ms
+        self.calls += 1
+        return locations
+
+    @property
+    def avg_ms(self):
+        return self.total_ms / self.calls if self.calls else 0.0
+
+    def stats(self):
+        return {"detector": self.kind, "calls": self.calls,
+                "avg_ms": self.avg_ms, "last_ms": self.last_ms}
+
+
+class HOGDetector(FaceDetector):
+    """dlib HOG + linear SVM (face_recognition default)"""
+
+    kind = "hog"
+
+    def __init__(self, upsample=1, **params):
+        super().__init__(**params)
+        self.upsample = upsample
+
+    def _detect(self, rgb_image):
+        return face_recognition.face_locations(rgb_image, self.upsample, model="hog")
+
+
+class CNNDetector(HOGDetector):
+    """dlib MMOD CNN: most accurate dlib detector, slow without CUDA"""
+
+    kind = "cnn"
+
+    def _detect(self, rgb_image):
+        return face_recognition.face_locations(rgb_image, self.upsample, model="cnn")
+
+
+class HaarDetector(FaceDetector):
+    """OpenCV Haar cascade: fastest, least accurate"""
+
+    kind = "haar"
+
+    def __init__(self, scale_factor=1.1, min_neighbors=5, **params):
+        super().__init__(**params)
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+
+    def _detect(self, rgb_image):
+        gray = cv2.cvtColor(rgb_image, cv2.COLOR_RGB2GRAY)
+        boxes = self.cascade.detectMultiScale(gray, scaleFactor=self.scale_factor,
+                                              minNeighbors=self.min_neighbors, minSize=(30, 30),
+                                              flags=cv2.CASCADE_SCALE_IMAGE)
+        return [(y, x + w, y + h, x) for (x, y, w, h) in boxes]
+
+
+class YOLODetector(FaceDetector):
+    """YOLOv8-face through ultralytics"""
+
+    kind = "yolo"
+    stateful = True
+
+    def __init__(self, weights=YOLO_WEIGHTS, device="cpu", **params):
+        super().__init__(**params)
+        if YOLO is None:
+            raise ImportError("YOLO detector requires ultralytics (pip install ultralytics)")
+        self.model = YOLO(weights).to(device)
+
+    def _detect(self, rgb_image):
+        results = self.model(rgb_image, conf=self.confidence, verbose=False)
+        boxes = results[0].boxes.xyxy.cpu().numpy()
+        return [(y1, x2, y2, x1) for x1, y1, x2, y2 in boxes[:, :4]]
+
+
+class DNNDetector(FaceDetector):
+    """OpenCV DNN ResNet-10 SSD (Caffe), CPU inference at 300x300"""
+
+    kind = "dnn"
+    stateful = True
+
+    def __init__(self, prototxt=DNN_PROTOTXT, model=DNN_CAFFEMODEL, input_size=300, **params):
+        super().__init__(**params)
+        self.net = cv2.dnn.readNetFromCaffe(prototxt, model)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.input_size = input_size
+
+    def _detect(self, rgb_image):
+        height, width = rgb_image.shape[:2]
+        # The SSD was trained on BGR input with these channel means
+        blob = cv2.dnn.blobFromImage(cv2.cvtColor(rgb_image, cv2.COLOR_RGB2BGR), 1.0,
+                                     (self.input_size, self.input_size), (104.0, 177.0, 123.0))
+        self.net.setInput(blob)
+        detections = self.net.forward()[0, 0]
+        detections = detections[detections[:, 2] >= self.confidence]
+        scale = np.array([width, height, width, height])
+        return [(y1, x2, y2, x1) for x1, y1, x2, y2 in detections[:, 3:7] * scale]
+
+
+class YuNetDetector(FaceDetector):
+    """OpenCV YuNet ONNX model via cv2.FaceDetectorYN, fast on CPU"""
+
+    kind = "yunet"
+    stateful = True
+
+    def __init__(self, model=YUNET_MODEL, nms_threshold=0.3, **params):
+        super().__init__(**params)
+        self.model = cv2.FaceDetectorYN.create(model, "", (320, 320), self.confidence, nms_threshold)
+
+    def _detect(self, rgb_image):
+        height, width = rgb_image.shape[:2]
+        self.model.setInputSize((width, height))
+        _, faces = self.model.detect(cv2.cvtColor(rgb_image, cv2.COLOR_RGB2BGR))
+        if faces is None:
+            return []
+        return [(y, x + w, y + h, x) for x, y, w, h in faces[:, :4]]
+
+
+DETECTORS = {cls.kind: cls for cls in
+             (HOGDetector, CNNDetector, HaarDetector, YOLODetector, DNNDetector, YuNetDetector)}
+
+
+def make_detector(kind="hog", **params):
+    """Create a detector backend by name"""
+    if kind not in DETECTORS:
+        raise ValueError(f"Unknown face detector: {kind}")
+    return DETECTORS[kind](**params)
+
+
+def benchmark_detectors(images, kinds, **params):
+    """Run each backend over RGB images, returns one stats row per detector"""
+    report = []
+    for kind in kinds:
+        try:
+            detector = make_detector(kind, **params)
+        except Exception as e:
+            report.append({"detector": kind, "error": str(e)})
+            continue
+        found = sum(1 for image in images if detector.detect(image))
+        row = detector.stats()
+        row["detection_rate"] = found / len(images) if images else 0.0
+        report.append(row)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare face detector latency on a folder of images")
+    parser.add_argument("image_dir")
+    parser.add_argument("--backends", nargs="+", default=["haar", "hog", "yunet", "dnn", "yolo"],
+                        choices=list(DETECTORS))
+    parser.add_argument("--downscale", type=float, default=1.0)
+    parser.add_argument("--confidence", type=float, default=0.5)
+    args = parser.parse_args()
+
+    images = []
+    for root, _, files in os.walk(args.image_dir):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                images.append(face_recognition.load_image_file(os.path.join(root, name)))
+
+    print(f"{len(images)} images, downscale {args.downscale}")
+    for row in benchmark_detectors(images, args.backends, downscale=args.downscale,
+                                   confidence=args.confidence):
+        if "error" in row:
+            print(f"{row['detector']:>6}: unavailable ({row['error']})")
+        else:
+            print(f"{row['detector']:>6}: {row['avg_ms']:8.1f} ms/frame, "
+                  f"detection rate {row['detection_rate']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+import sys
+import numpy as np
+from face_index import BruteForceIndex, pairwise_distances, smallest_k
+
+# Gallery Configuration
+EMBEDDING_DIM = 128  # face_recognition / dlib ResNet encoding size
+UNKNOWN_NAME = "Unknown"
+CENTROID_CANDIDATES = 8  # Identities whose individual encodings are checked after centroid prefiltering
+
+
+def select_diverse(encodings, scores, count, min_score_ratio=0.5):
+    """Pick up to count enrollment encodings that are both good quality and spread out
+
+    Encodings scoring below min_score_ratio of the best are ignored. The best one
+    is taken first, then greedily the one farthest from those already chosen,
+    weighted by its quality. Returns indices into encodings.
+    """
+    encodings = np.asarray(encodings, dtype=np.float32).reshape(len(scores), -1)
+    scores = np.asarray(scores, dtype=np.float64)
+    if not len(scores) or scores.max() <= 0:
+        return []
+    eligible = np.flatnonzero(scores >= min_score_ratio * scores.max())
+    weights = scores[eligible] / scores.max()
+    chosen = [int(eligible[np.argmax(weights)])]
+    while len(chosen) < min(count, len(eligible)):
+        spread = pairwise_distances(encodings[eligible], encodings[chosen]).min(axis=1)
+        gain = spread * weights
+        best = int(np.argmax(gain))
+        if gain[best] <= 0:
+            break  # Only near-duplicates left
+        chosen.append(int(eligible[best]))
+    return chosen
+
+
+class FaceGallery:
+    """Enrolled face encodings held in one contiguous float32 matrix"""
+
+    def __init__(self, dim=EMBEDDING_DIM, capacity=64, index=None):
+        self.dim = dim
+        self.index = index if index is not None else BruteForceIndex()
+        self.names = []
+        self._matrix = np.empty((capacity, dim), dtype=np.float32)
+        self._sq_norms = np.empty(capacity, dtype=np.float32)
+        self._count = 0
+        self._reset_identities()
+
+    @classmethod
+    def from_database(cls, database, index=None):
+        """Build a gallery from a {name: encoding} dictionary"""
+        gallery = cls(capacity=max(len(database), 64), index=index)
+        if database:
+            gallery.add_many(list(database.keys()), list(database.values()))
+        return gallery
+
+    @classmethod
+    def from_store(cls, store, index=None):
+        """Build a gallery over a FaceStore, sharing its memory-mapped rows"""
+        gallery = cls(dim=store.dim, capacity=0, index=index)
+        embeddings = store.embeddings
+        gallery._matrix = embeddings  # Copied on the first add, never written in place
+        gallery._sq_norms = np.einsum("ij,ij->i", embeddings, embeddings).astype(np.float32)
+        gallery.names = store.names
+        gallery._count = len(embeddings)
+        gallery.index.reset(gallery.embeddings)
+        gallery._index_identities(gallery.names, 0)
+        return gallery
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, name):
+        return name in self._identity_ids
+
+    @property
+    def identity_names(self):
+        """Names with at least one enrolled encoding"""
+        return list(self._identity_ids)
+
+    @property
+    def multi_embedding(self):
+        """True once any identity has more than one enrolled encoding"""
+        return len(self._identity_ids) < self._count
+
+    def _reset_identities(self):
+        self._identity_ids = {}  # name -> identity slot
+        self._identity_slots = []  # Name per slot, None once removed
+        self._free_slots = []
+        self._row_identity = np.empty(0, dtype=np.int32)  # Identity slot of every row
+        self._identity_counts = np.zeros(0, dtype=np.int64)
+        self._centroid_sums = None  # Only built once centroid scoring is used
+        self._centroids = None
+        self._identity_order = None
+
+    def _index_identities(self, names, start):
+        """Assign rows start.. to identity slots and update the centroid sums if built"""
+        ids = np.empty(len(names), dtype=np.int32)
+        for offset, name in enumerate(names):
+            identity = self._identity_ids.get(name)
+            if identity is None:
+                if self._free_slots:
+                    identity = self._free_slots.pop()
+                    self._identity_slots[identity] = name
+                else:
+                    identity = len(self._identity_slots)
+                    self._identity_slots.append(name)
+                self._identity_ids[name] = identity
+            ids[offset] = identity
+        end = start + len(names)
+        if end > len(self._row_identity):
+            row_identity = np.empty(max(end, 2 * len(self._row_identity), 64), dtype=np.int32)
+            row_identity[:start] = self._row_identity[:start]
+            self._row_identity = row_identity
+        self._row_identity[start:end] = ids
+        slots = len(self._identity_slots)
+        counts = np.bincount(ids, minlength=slots)
+        counts[:len(self._identity_counts)] += self._identity_counts
+        self._identity_counts = counts
+        if self._centroid_sums is not None:
+            if slots > len(self._centroid_sums):
+                sums = np.zeros((max(slots, 2 * len(self._centroid_sums)), self.dim), dtype=np.float32)
+                sums[:len(self._centroid_sums)] = self._centroid_sums
+                self._centroid_sums = sums
+            np.add.at(self._centroid_sums, ids, self._matrix[start:end])
+        self._centroids = self._identity_order = None
+
+    def _identity_rows(self):
+        """Rows grouped by identity: slot i owns order[offsets[i]:offsets[i + 1]]"""
+        if self._identity_order is None:
+            order = np.argsort(self._row_identity[:self._count], kind="stable").astype(np.int32)
+            offsets = np.concatenate([[0], np.cumsum(self._identity_counts)])
+            self._identity_order = order, offsets
+        return self._identity_order
+
+    def _centroid_matrix(self):
+        """Live identity slots, their mean encodings and squared norms, recomputed after changes"""
+        live = np.flatnonzero(self._identity_counts)
+        if self._centroid_sums is None:
+            # Sum the j-th row of every identity at once: few steps, as identities hold few rows
+            order, offsets = self._identity_rows()
+            counts = self._identity_counts
+            sums = np.zeros((len(counts), self.dim), dtype=np.float32)
+            small = counts <= 32
+            for step in range(int(counts[small].max(initial=0))):
+                ids = np.flatnonzero(small & (counts > step))
+                sums[ids] += self._matrix[order[offsets[ids] + step]]
+            for identity in np.flatnonzero(~small):
+                sums[identity] = self._matrix[order[offsets[identity]:offsets[identity + 1]]].sum(axis=0)
+            self._centroid_sums = sums
+        if self._centroids is None:
+            centroids = self._centroid_sums[live] / self._identity_counts[live, None].astype(np.float32)
+            self._centroids = live, centroids, np.einsum("ij,ij->i", centroids, centroids)
+        return self._centroids
+
+    def memory_bytes(self):
+        """RAM held beside the encoding rows: index, norms, identity tables and centroids"""
+        arrays = [self._sq_norms, self._row_identity, self._identity_counts, self._centroid_sums]
+        arrays += list(self._centroids or ()) + list(self._identity_order or ())
+        # List and dict slots only, the name strings are shared with the store
+        containers = sys.getsizeof(self.names) + sys.getsizeof(self._identity_ids) + sys.getsizeof(self._identity_slots)
+        return self.index.memory_bytes() + sum(a.nbytes for a in arrays if a is not None) + containers
+
+    @property
+    def embeddings(self):
+        """View of the enrolled encodings, one row per name in self.names"""
+        return self._matrix[:self._count]
+
+    def _reserve(self, extra):
+        needed = self._count + extra
+        # A gallery built from a store shares its read-only memmap: copy before the first write
+        if needed <= len(self._matrix) and self._matrix.flags.writeable:
+            return
+        capacity = max(needed, 2 * len(self._matrix), 64)
+        matrix = np.empty((capacity, self.dim), dtype=np.float32)
+        sq_norms = np.empty(capacity, dtype=np.float32)
+        matrix[:self._count] = self._matrix[:self._count]
+        sq_norms[:self._count] = self._sq_norms[:self._count]
+        self._matrix, self._sq_norms = matrix, sq_norms
+
+    def add(self, name, encoding):
+        """Append a single encoding for name"""
+        self.add_many([name], [encoding])
+
+    def add_many(self, names, encodings):
+        """Append several encodings in one copy"""
+        rows = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        if len(rows) != len(names):
+            raise ValueError("names and encodings must have the same length")
+        self._reserve(len(rows))
+        end = self._count + len(rows)
+        self._matrix[self._count:end] = rows
+        self._sq_norms[self._count:end] = np.einsum("ij,ij->i", rows, rows)
+        self.names.extend(names)
+        start, self._count = self._count, end
+        self.index.add(self.embeddings, start)
+        self._index_identities(names, start)
+
+    def remove(self, name):
+        """Drop every encoding enrolled under name, returns rows removed"""
+        identity = self._identity_ids.get(name)
+        if identity is None:
+            return 0
+        keep = self._row_identity[:self._count] != identity
+        removed = int(self._count - keep.sum())
+        if removed:
+            kept = self._count - removed
+            rows = self._matrix[:self._count][keep]
+            if self._matrix.flags.writeable:
+                self._matrix[:kept] = rows
+            else:
+                self._matrix = rows
+            self._sq_norms[:kept] = self._sq_norms[:self._count][keep]
+            self.names = [n for n in self.names if n != name]
+            self._row_identity[:kept] = self._row_identity[:self._count][keep]
+            self._count = kept
+            # Compact the index rows in place, no retraining of centroids or codebooks
+            if kept:
+                self.index.remove(keep)
+            else:
+                self.index.reset(self.embeddings)
+        del self._identity_ids[name]
+        self._identity_slots[identity] = None
+        self._free_slots.append(identity)
+        self._identity_counts[identity] = 0
+        if self._centroid_sums is not None:
+            # Every row of the identity is gone, so subtracting them leaves a zero sum
+            self._centroid_sums[identity] = 0
+        self._centroids = self._identity_order = None
+        return removed
+
+    def clear(self):
+        """Forget all enrolled encodings"""
+        self.names = []
+        self._count = 0
+        # Drop any shared store memmap too, the next add writes into this buffer
+        self._matrix = np.empty((64, self.dim), dtype=np.float32)
+        self._sq_norms = np.empty(64, dtype=np.float32)
+        self.index.reset(self.embeddings)
+        self._reset_identities()
+
+    def set_index(self, index, rebuild=True):
+        """Swap the search backend, e.g. after loading a persisted index"""
+        self.index = index
+        if rebuild:
+            index.reset(self.embeddings)
+
+    def distances(self, encodings):
+        """Euclidean distance from each query encoding to every enrolled encoding"""
+        queries = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        if self._count == 0:
+            return np.empty((len(queries), 0), dtype=np.float32)
+        return pairwise_distances(queries, self.embeddings, self._sq_norms[:self._count])
+
+    def search(self, encodings, k=1):
+        """Return (indices, distances) of the k nearest enrolled rows per query"""
+        queries = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        return self.index.search(self.embeddings, self._sq_norms[:self._count], queries, k)
+
+    def top_k(self, encodings, k=3):
+        """Return a list of [(name, distance), ...] candidates per query"""
+        indices, dists = self.search(encodings, k)
+        return [[(self.names[i], float(d)) for i, d in zip(row_idx, row_dist) if i >= 0]
+                for row_idx, row_dist in zip(indices, dists)]
+
+    def nearest_identities(self, encodings, candidates=CENTROID_CANDIDATES):
+        """Nearest (name, distance) per query: shortlist the closest `candidates` identities,
+        then refine on their individual encodings only
+
+        The exact brute-force backend shortlists by identity centroid, fewer rows to
+        scan than every encoding. Other backends shortlist the identities of their
+        `candidates` nearest rows, so their partitions or compact codes are used.
+        """
+        queries = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        if isinstance(self.index, BruteForceIndex):
+            live, centroids, centroid_sq = self._centroid_matrix()
+            nearest, _ = smallest_k(pairwise_distances(queries, centroids, centroid_sq), candidates)
+            shortlist = [live[row[row >= 0]] for row in nearest]
+        else:
+            found, _ = self.search(queries, candidates)
+            shortlist = [list(dict.fromkeys(self._row_identity[rows[rows >= 0]].tolist())) for rows in found]
+        order, offsets = self._identity_rows()
+        results = []
+        for query, identities in zip(queries, shortlist):
+            if not len(identities):
+                results.append(None)
+                continue
+            rows = np.concatenate([order[offsets[i]:offsets[i + 1]] for i in identities]).astype(np.int64)
+            dists = pairwise_distances(query[None], self._matrix[rows], self._sq_norms[rows])[0]
+            best = int(np.argmin(dists))
+            results.append((self.names[rows[best]], float(dists[best])))
+        return results
+
+    def match(self, encodings, tolerance=0.5, candidates=CENTROID_CANDIDATES):
+        """Return the nearest (name, distance) per query, UNKNOWN_NAME beyond tolerance"""
+        if self.multi_embedding and len(self._identity_ids) > candidates:
+            nearest = self.nearest_identities(encodings, candidates)
+        else:
+            nearest = [found[0] if found else None for found in self.top_k(encodings, k=1)]
+        results = []
+        for found in nearest:
+            if found and found[1] <= tolerance:
+                results.append(found)
+            else:
+                results.append((UNKNOWN_NAME, found[1] if found else float("inf")))
+        return results
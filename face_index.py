@@ -0,0 +1,601 @@
+import os
+import numpy as np
+
+try:
+    import hnswlib  # Optional: pip install hnswlib
+except ImportError:
+    hnswlib = None
+
+# Index Configuration
+IVF_MIN_TRAIN_SIZE = 1024  # Below this, IVF searches exhaustively
+IVF_KMEANS_ITERATIONS = 20
+IVF_RETRAIN_GROWTH = 4  # Retrain centroids once the gallery grows this many times
+IVF_TRAIN_POINTS_PER_LIST = 64  # k-means runs on a sample, every row is still assigned
+
+# Quantization Configuration
+QUANTIZED_RERANK = 32  # Candidates from the compact scan re-ranked on the exact float32 rows
+QUANTIZED_RETRAIN_GROWTH = 4  # Refit int8 ranges / PQ codebooks once the gallery grows this many times
+SCAN_BLOCK_ROWS = 2048  # Codes decoded per block, small enough to stay in cache
+PQ_SUBSPACES = 16  # Bytes per row: 128 dims split into 16 sub-vectors of 8
+PQ_CENTROIDS = 256  # One uint8 code per sub-vector
+PQ_MIN_TRAIN_SIZE = 1024  # Below this, PQ searches exhaustively
+PQ_TRAIN_POINTS = 32 * PQ_CENTROIDS  # Codebooks are fitted on a sample of this many rows
+PQ_KMEANS_ITERATIONS = 15
+PQ_SCAN_BLOCK_ROWS = 65536  # Rows summed per block of table lookups
+
+
+def pairwise_distances(queries, rows, row_sq_norms=None):
+    """Euclidean distances between every query and every row"""
+    queries = np.asarray(queries, dtype=np.float32)
+    if row_sq_norms is None:
+        row_sq_norms = np.einsum("ij,ij->i", rows, rows)
+    sq = (np.einsum("ij,ij->i", queries, queries)[:, None]
+          + row_sq_norms[None, :]
+          - 2.0 * queries @ rows.T)
+    np.maximum(sq, 0.0, out=sq)
+    return np.sqrt(sq)
+
+
+def kmeans(points, count, iterations):
+    """Lloyd's k-means on randomly ordered points, seeded from the first count; returns centroids"""
+    centroids = points[:count].copy()
+    for _ in range(iterations):
+        labels = np.argmin(pairwise_distances(points, centroids), axis=1)
+        counts = np.bincount(labels, minlength=count)
+        order = np.argsort(labels, kind="stable")
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts[filled])[:-1]])
+        sums = np.add.reduceat(points[order], starts, axis=0)
+        centroids[filled] = sums / counts[filled, None]
+    return centroids
+
+
+def smallest_k(dists, k):
+    """Return (columns, values) of the k smallest entries per row, sorted"""
+    k = min(k, dists.shape[1])
+    if k == 0:
+        return (np.empty((len(dists), 0), dtype=np.int64),
+                np.empty((len(dists), 0), dtype=np.float32))
+    if k < dists.shape[1]:
+        idx = np.argpartition(dists, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(dists.shape[1]), dists.shape).copy()
+    part = np.take_along_axis(dists, idx, axis=1)
+    order = np.argsort(part, axis=1)
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(part, order, axis=1)
+
+
+def rerank(matrix, queries, candidates, k):
+    """Exact distances to each query's candidate rows; returns the k nearest (indices, distances)"""
+    rows = matrix[candidates.ravel()].reshape(candidates.shape + (matrix.shape[1],))
+    diffs = rows - queries[:, None, :]
+    cols, vals = smallest_k(np.sqrt(np.einsum("qcd,qcd->qc", diffs, diffs)), k)
+    return np.take_along_axis(candidates, cols, axis=1), vals
+
+
+class BruteForceIndex:
+    """Exact search over every enrolled row"""
+
+    kind = "brute"
+
+    def reset(self, matrix):
+        pass
+
+    def add(self, matrix, start):
+        pass
+
+    def remove(self, keep):
+        """Drop the rows where keep is False, renumbering the rest, without retraining"""
+        pass
+
+    def search(self, matrix, sq_norms, queries, k):
+        return smallest_k(pairwise_distances(queries, matrix, sq_norms), k)
+
+    def memory_bytes(self):
+        """Bytes held by the index on top of the float32 rows"""
+        return 0
+
+    def save(self, path, **extra):
+        np.savez(path, kind=self.kind, **extra)
+
+    def load_state(self, data, matrix, path):
+        return True
+
+
+class IVFIndex:
+    """Inverted-file index: k-means partitions, search probes the nearest nprobe lists"""
+
+    kind = "ivf"
+
+    def __init__(self, nlist=None, nprobe=8, seed=0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.seed = seed
+        self.centroids = None
+        self.assignments = np.empty(0, dtype=np.int32)
+        self._lists = []
+        self._trained_size = 0
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    def _train(self, matrix):
+        """Lloyd's k-means on the current gallery"""
+        rng = np.random.default_rng(self.seed)
+        nlist = self.nlist or max(1, int(np.sqrt(len(matrix))))
+        nlist = min(nlist, len(matrix))
+        sample_size = min(len(matrix), IVF_TRAIN_POINTS_PER_LIST * nlist)
+        sample = matrix[rng.choice(len(matrix), sample_size, replace=False)]
+        self.centroids = kmeans(sample, nlist, IVF_KMEANS_ITERATIONS)
+        self._trained_size = len(matrix)
+        self._assign(matrix, 0)
+
+    def _assign(self, matrix, start):
+        """Assign rows start.. to their nearest centroid"""
+        if start == 0:
+            self.assignments = np.empty(0, dtype=np.int32)
+            self._lists = [np.empty(0, dtype=np.int64) for _ in range(len(self.centroids))]
+        new_rows = matrix[start:]
+        if not len(new_rows):
+            return
+        labels = np.argmin(pairwise_distances(new_rows, self.centroids), axis=1).astype(np.int32)
+        self.assignments = np.concatenate([self.assignments, labels])
+        row_ids = np.arange(start, len(matrix))
+        for label in np.unique(labels):
+            self._lists[label] = np.concatenate([self._lists[label], row_ids[labels == label]])
+
+    def _build_lists(self):
+        """Inverted lists from the assignments, in one sort instead of a scan per list"""
+        order = np.argsort(self.assignments, kind="stable")
+        counts = np.bincount(self.assignments, minlength=len(self.centroids))
+        self._lists = np.split(order, np.cumsum(counts)[:-1])
+
+    def reset(self, matrix):
+        self.centroids = None
+        self.assignments = np.empty(0, dtype=np.int32)
+        self._lists = []
+        self._trained_size = 0
+        if len(matrix) >= IVF_MIN_TRAIN_SIZE:
+            self._train(matrix)
+
+    def add(self, matrix, start):
+        if not self.trained:
+            if len(matrix) >= IVF_MIN_TRAIN_SIZE:
+                self._train(matrix)
+        elif len(matrix) >= IVF_RETRAIN_GROWTH * self._trained_size:
+            self._train(matrix)
+        else:
+            self._assign(matrix, start)
+
+    def remove(self, keep):
+        """Drop the rows where keep is False; centroids are kept, lists are renumbered"""
+        if self.trained:
+            self.assignments = self.assignments[keep]
+            self._build_lists()
+
+    def search(self, matrix, sq_norms, queries, k):
+        queries = np.asarray(queries, dtype=np.float32)
+        if not self.trained:
+            return smallest_k(pairwise_distances(queries, matrix, sq_norms), k)
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes, _ = smallest_k(pairwise_distances(queries, self.centroids), nprobe)
+        indices = np.full((len(queries), k), -1, dtype=np.int64)
+        dists = np.full((len(queries), k), np.inf, dtype=np.float32)
+        for q, lists in enumerate(probes):
+            rows = np.concatenate([self._lists[label] for label in lists])
+            if not len(rows):
+                continue
+            cols, vals = smallest_k(pairwise_distances(queries[q:q + 1], matrix[rows], sq_norms[rows]), k)
+            indices[q, :cols.shape[1]] = rows[cols[0]]
+            dists[q, :vals.shape[1]] = vals[0]
+        found = min(k, len(matrix))
+        return indices[:, :found], dists[:, :found]
+
+    def calibrate(self, matrix, sq_norms, target_recall=0.95, sample=200, noise=0.05):
+        """Pick the smallest nprobe whose recall@1 against exact search reaches target_recall"""
+        if not self.trained:
+            return self.nprobe
+        rng = np.random.default_rng(self.seed)
+        picks = rng.choice(len(matrix), min(sample, len(matrix)), replace=False)
+        queries = matrix[picks] + rng.normal(0, noise, (len(picks), matrix.shape[1])).astype(np.float32)
+        exact, _ = smallest_k(pairwise_distances(queries, matrix, sq_norms), 1)
+        for nprobe in range(1, len(self.centroids) + 1):
+            self.nprobe = nprobe
+            approx, _ = self.search(matrix, sq_norms, queries, 1)
+            if np.mean(approx[:, 0] == exact[:, 0]) >= target_recall:
+                break
+        return self.nprobe
+
+    def memory_bytes(self):
+        centroids = self.centroids.nbytes if self.trained else 0
+        return centroids + self.assignments.nbytes + sum(rows.nbytes for rows in self._lists)
+
+    def save(self, path, **extra):
+        np.savez(path, kind=self.kind, nprobe=self.nprobe, trained_size=self._trained_size,
+                 centroids=self.centroids if self.trained else np.empty((0, 0), dtype=np.float32),
+                 assignments=self.assignments, **extra)
+
+    def load_state(self, data, matrix, path):
+        if len(data["assignments"]) != len(matrix):
+            return False
+        self.nprobe = int(data["nprobe"])
+        if not data["centroids"].size:
+            return True
+        self.centroids = data["centroids"]
+        self._trained_size = int(data["trained_size"])
+        self.assignments = data["assignments"].astype(np.int32)
+        self._build_lists()
+        return True
+
+
+class HNSWIndex:
+    """Hierarchical navigable small world graph backed by hnswlib"""
+
+    kind = "hnsw"
+
+    def __init__(self, ef_search=64, ef_construction=200, m=16, dim=128):
+        if hnswlib is None:
+            raise ImportError("HNSW index requires hnswlib (pip install hnswlib)")
+        self.ef_search = ef_search
+        self.ef_construction = ef_construction
+        self.m = m
+        self.dim = dim
+        self._graph = None
+        self._label_rows = np.empty(0, dtype=np.int64)  # Row of each graph label, -1 once removed
+
+    def _new_graph(self, capacity):
+        graph = hnswlib.Index(space="l2", dim=self.dim)
+        graph.init_index(max_elements=max(capacity, 16), ef_construction=self.ef_construction, M=self.m)
+        graph.set_ef(self.ef_search)
+        return graph
+
+    def reset(self, matrix):
+        self._graph = self._new_graph(len(matrix))
+        self._label_rows = np.arange(len(matrix), dtype=np.int64)
+        if len(matrix):
+            self._graph.add_items(matrix, self._label_rows)
+
+    def add(self, matrix, start):
+        if self._graph is None:
+            self.reset(matrix)
+            return
+        # Removed rows keep their labels (marked deleted), so new rows get fresh labels
+        labels = np.arange(len(self._label_rows), len(self._label_rows) + len(matrix) - start)
+        if len(labels) and labels[-1] >= self._graph.get_max_elements():
+            self._graph.resize_index(2 * (labels[-1] + 1))
+        self._graph.add_items(matrix[start:], labels)
+        self._label_rows = np.concatenate([self._label_rows, np.arange(start, len(matrix))])
+
+    def remove(self, keep):
+        """Mark the rows where keep is False deleted in the graph and renumber the rest"""
+        if self._graph is None:
+            return
+        live = np.flatnonzero(self._label_rows >= 0)
+        rows = self._label_rows[live]
+        for label in live[~keep[rows]]:
+            self._graph.mark_deleted(int(label))
+        new_rows = np.cumsum(keep) - 1
+        self._label_rows[live] = np.where(keep[rows], new_rows[rows], -1)
+
+    def search(self, matrix, sq_norms, queries, k):
+        k = min(k, len(matrix))
+        if self._graph is None or k == 0:
+            return smallest_k(pairwise_distances(queries, matrix, sq_norms), k)
+        self._graph.set_ef(max(self.ef_search, k))
+        labels, sq_dists = self._graph.knn_query(np.asarray(queries, dtype=np.float32), k=k)
+        return self._label_rows[labels.astype(np.int64)], np.sqrt(np.maximum(sq_dists, 0.0))
+
+    def memory_bytes(self):
+        """Estimate: hnswlib keeps its own float32 copy of each row plus ~2*m links"""
+        if self._graph is None:
+            return 0
+        return self._graph.get_current_count() * (self.dim * 4 + 2 * self.m * 4) + self._label_rows.nbytes
+
+    def save(self, path, **extra):
+        graph_path = os.path.splitext(path)[0] + ".hnsw"
+        if self._graph is not None:
+            self._graph.save_index(graph_path)
+        np.savez(path, kind=self.kind, ef_search=self.ef_search, m=self.m,
+                 ef_construction=self.ef_construction, label_rows=self._label_rows,
+                 count=int((self._label_rows >= 0).sum()), **extra)
+
+    def load_state(self, data, matrix, path):
+        graph_path = os.path.splitext(path)[0] + ".hnsw"
+        if int(data["count"]) != len(matrix) or not os.path.exists(graph_path):
+            return False
+        self.ef_search = int(data["ef_search"])
+        self._label_rows = (data["label_rows"] if "label_rows" in data.files
+                            else np.arange(len(matrix), dtype=np.int64))
+        self._graph = hnswlib.Index(space="l2", dim=self.dim)
+        self._graph.load_index(graph_path, max_elements=max(len(self._label_rows), 16))
+        self._graph.set_ef(self.ef_search)
+        return True
+
+
+class ScalarQuantizedIndex:
+    """int8 codes scanned in blocks, then the best candidates re-ranked on the exact float32 rows
+
+    Each dimension's range in the gallery is mapped onto 0-255, so codes are 4x
+    smaller than float32. The range is refitted as the gallery grows and rows
+    outside it are clipped. The float32 rows are only read for the re-ranked
+    candidates, so with a memory-mapped store they mostly stay on disk. Only the
+    ranges are persisted; codes are rebuilt on load.
+    """
+
+    kind = "sq8"
+    code_dtype = np.uint8
+    refit_on_growth = True
+
+    def __init__(self, rerank=QUANTIZED_RERANK, dim=128):
+        self.rerank = rerank
+        self.dim = dim
+        self.offset = None
+        self.scale = None
+        self.codes = np.empty((0, dim), dtype=self.code_dtype)
+        self._code_sq = np.empty(0, dtype=np.float32)
+        self._trained_size = 0
+
+    @property
+    def trained(self):
+        return self.offset is not None
+
+    def _fit(self, matrix):
+        low, high = matrix.min(axis=0), matrix.max(axis=0)
+        self.offset = low.astype(np.float32)
+        self.scale = np.maximum((high - low) / 255.0, 1e-12).astype(np.float32)
+
+    def _encode(self, rows):
+        return np.clip(np.rint((rows - self.offset) / self.scale), 0, 255).astype(self.code_dtype)
+
+    def _append(self, rows):
+        """Encode rows block by block, keeping ||scale * code||^2 per row for the scan"""
+        codes = np.empty((len(rows), self.dim), dtype=self.code_dtype)
+        code_sq = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), SCAN_BLOCK_ROWS):
+            end = min(start + SCAN_BLOCK_ROWS, len(rows))
+            codes[start:end] = self._encode(np.asarray(rows[start:end], dtype=np.float32))
+            decoded = codes[start:end].astype(np.float32) * self.scale
+            code_sq[start:end] = np.einsum("ij,ij->i", decoded, decoded)
+        self.codes = np.concatenate([self.codes, codes])
+        self._code_sq = np.concatenate([self._code_sq, code_sq])
+
+    def reset(self, matrix):
+        self.offset = self.scale = None
+        self.codes = np.empty((0, self.dim), dtype=self.code_dtype)
+        self._code_sq = np.empty(0, dtype=np.float32)
+        self._trained_size = 0
+        if len(matrix):
+            self._fit(matrix)
+            self._trained_size = len(matrix)
+            self._append(matrix)
+
+    def add(self, matrix, start):
+        if not self.trained or (self.refit_on_growth
+                                and len(matrix) >= QUANTIZED_RETRAIN_GROWTH * self._trained_size):
+            self.reset(matrix)
+        else:
+            self._append(matrix[start:])
+
+    def remove(self, keep):
+        """Drop the codes of the rows where keep is False, ranges are kept"""
+        self.codes = self.codes[keep] if self.trained else self.codes
+        self._code_sq = self._code_sq[keep] if self.trained else self._code_sq
+
+    def _scan(self, queries):
+        """Approximate squared distances from every query to every coded row"""
+        shifted = queries - self.offset
+        weights = np.ascontiguousarray((shifted * self.scale).T)
+        dots = np.empty((len(self.codes), len(queries)), dtype=np.float32)
+        block = np.empty((SCAN_BLOCK_ROWS, self.dim), dtype=np.float32)
+        for start in range(0, len(self.codes), SCAN_BLOCK_ROWS):
+            codes = self.codes[start:start + SCAN_BLOCK_ROWS]
+            decoded = block[:len(codes)]
+            np.copyto(decoded, codes)
+            np.dot(decoded, weights, out=dots[start:start + len(codes)])
+        return np.einsum("ij,ij->i", shifted, shifted)[:, None] + self._code_sq[None, :] - 2.0 * dots.T
+
+    def search(self, matrix, sq_norms, queries, k):
+        queries = np.asarray(queries, dtype=np.float32)
+        if not self.trained or len(matrix) <= self.rerank:
+            return smallest_k(pairwise_distances(queries, matrix, sq_norms), k)
+        candidates, _ = smallest_k(self._scan(queries), max(k, self.rerank))
+        return rerank(matrix, queries, candidates, k)
+
+    def memory_bytes(self):
+        ranges = self.offset.nbytes + self.scale.nbytes if self.trained else 0
+        return self.codes.nbytes + self._code_sq.nbytes + ranges
+
+    def save(self, path, **extra):
+        empty = np.empty(0, dtype=np.float32)
+        np.savez(path, kind=self.kind, rerank=self.rerank, count=len(self.codes),
+                 trained_size=self._trained_size,
+                 offset=self.offset if self.trained else empty,
+                 scale=self.scale if self.trained else empty, **extra)
+
+    def load_state(self, data, matrix, path):
+        if int(data["count"]) != len(matrix):
+            return False
+        self.rerank = int(data["rerank"])
+        if data["offset"].size:
+            self.offset, self.scale = data["offset"], data["scale"]
+            self._trained_size = int(data["trained_size"])
+            self._append(matrix)
+        return True
+
+
+class HalfPrecisionIndex(ScalarQuantizedIndex):
+    """float16 copies of the rows (2x smaller than float32), re-ranked exactly like sq8
+
+    NumPy has no fast float16 arithmetic, so blocks are converted before the
+    scan: this saves memory, not time.
+    """
+
+    kind = "fp16"
+    code_dtype = np.float16
+    refit_on_growth = False
+
+    def _fit(self, matrix):
+        self.offset = np.zeros(self.dim, dtype=np.float32)
+        self.scale = np.ones(self.dim, dtype=np.float32)
+
+    def _encode(self, rows):
+        return rows.astype(self.code_dtype)
+
+
+class ProductQuantizedIndex:
+    """Product quantization: 16 one-byte codes per row (32x smaller than float32)
+
+    The 128 dims are split into sub-vectors, each replaced by the nearest of 256
+    centroids learned on the gallery. Queries are compared through per-subspace
+    lookup tables, then the best candidates are re-ranked on the exact rows.
+    Below PQ_MIN_TRAIN_SIZE rows it searches exhaustively.
+    """
+
+    kind = "pq"
+
+    def __init__(self, subspaces=PQ_SUBSPACES, rerank=QUANTIZED_RERANK, dim=128, seed=0):
+        if dim % subspaces:
+            raise ValueError(f"{dim} dims cannot be split into {subspaces} subspaces")
+        self.subspaces = subspaces
+        self.rerank = rerank
+        self.dim = dim
+        self.seed = seed
+        self.codebooks = None  # subspaces x PQ_CENTROIDS x (dim / subspaces)
+        self.codes = np.empty((subspaces, 0), dtype=np.uint8)  # One contiguous code row per subspace
+        self._count = 0
+        self._trained_size = 0
+
+    @property
+    def trained(self):
+        return self.codebooks is not None
+
+    def _split(self, rows):
+        return np.asarray(rows, dtype=np.float32).reshape(len(rows), self.subspaces, -1)
+
+    def _train(self, matrix):
+        rng = np.random.default_rng(self.seed)
+        sample = self._split(matrix[rng.choice(len(matrix), min(len(matrix), PQ_TRAIN_POINTS), replace=False)])
+        self.codebooks = np.stack([kmeans(np.ascontiguousarray(sample[:, m]), PQ_CENTROIDS, PQ_KMEANS_ITERATIONS)
+                                   for m in range(self.subspaces)])
+        self._trained_size = len(matrix)
+        self.codes = np.empty((self.subspaces, 0), dtype=np.uint8)
+        self._append(matrix)
+
+    def _append(self, rows):
+        codes = np.empty((self.subspaces, len(rows)), dtype=np.uint8)
+        for start in range(0, len(rows), SCAN_BLOCK_ROWS):
+            block = self._split(rows[start:start + SCAN_BLOCK_ROWS])
+            for m in range(self.subspaces):
+                codes[m, start:start + len(block)] = np.argmin(
+                    pairwise_distances(block[:, m], self.codebooks[m]), axis=1)
+        self.codes = np.concatenate([self.codes, codes], axis=1)
+
+    def reset(self, matrix):
+        self.codebooks = None
+        self.codes = np.empty((self.subspaces, 0), dtype=np.uint8)
+        self._count = len(matrix)
+        self._trained_size = 0
+        if len(matrix) >= PQ_MIN_TRAIN_SIZE:
+            self._train(matrix)
+
+    def add(self, matrix, start):
+        self._count = len(matrix)
+        if not self.trained:
+            if len(matrix) >= PQ_MIN_TRAIN_SIZE:
+                self._train(matrix)
+        elif len(matrix) >= QUANTIZED_RETRAIN_GROWTH * self._trained_size:
+            self._train(matrix)
+        else:
+            self._append(matrix[start:])
+
+    def remove(self, keep):
+        """Drop the codes of the rows where keep is False, codebooks are kept"""
+        self._count = int(keep.sum())
+        if self.trained:
+            self.codes = np.ascontiguousarray(self.codes[:, keep])
+
+    def _scan(self, queries):
+        """Approximate squared distances through one lookup table per query"""
+        sub_queries = self._split(queries)
+        tables = np.stack([pairwise_distances(sub_queries[:, m], self.codebooks[m]) ** 2
+                           for m in range(self.subspaces)], axis=1)
+        dists = np.empty((len(queries), self.codes.shape[1]), dtype=np.float32)
+        for q, table in enumerate(tables):
+            for start in range(0, self.codes.shape[1], PQ_SCAN_BLOCK_ROWS):
+                end = min(start + PQ_SCAN_BLOCK_ROWS, self.codes.shape[1])
+                block = dists[q, start:end]
+                table[0].take(self.codes[0, start:end], out=block)
+                for m in range(1, self.subspaces):
+                    block += table[m].take(self.codes[m, start:end])
+        return dists
+
+    def search(self, matrix, sq_norms, queries, k):
+        queries = np.asarray(queries, dtype=np.float32)
+        if not self.trained:
+            return smallest_k(pairwise_distances(queries, matrix, sq_norms), k)
+        candidates, _ = smallest_k(self._scan(queries), max(k, self.rerank))
+        return rerank(matrix, queries, candidates, k)
+
+    def memory_bytes(self):
+        return self.codes.nbytes + (self.codebooks.nbytes if self.trained else 0)
+
+    def save(self, path, **extra):
+        np.savez(path, kind=self.kind, rerank=self.rerank, count=self._count, trained_size=self._trained_size,
+                 codebooks=self.codebooks if self.trained else np.empty((0, 0, 0), dtype=np.float32),
+                 codes=self.codes, **extra)
+
+    def load_state(self, data, matrix, path):
+        if int(data["count"]) != len(matrix) or len(data["codes"]) != self.subspaces:
+            return False
+        self.rerank = int(data["rerank"])
+        if data["codebooks"].size:
+            self.codebooks = data["codebooks"]
+            self._trained_size = int(data["trained_size"])
+            self.codes = data["codes"]
+        return True
+
+
+INDEX_BACKENDS = {
+    BruteForceIndex.kind: BruteForceIndex,
+    IVFIndex.kind: IVFIndex,
+    HNSWIndex.kind: HNSWIndex,
+    HalfPrecisionIndex.kind: HalfPrecisionIndex,
+    ScalarQuantizedIndex.kind: ScalarQuantizedIndex,
+    ProductQuantizedIndex.kind: ProductQuantizedIndex,
+}
+
+
+def make_index(kind="brute", **params):
+    """Create an empty index backend by name"""
+    if kind not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown index backend: {kind}")
+    return INDEX_BACKENDS[kind](**params)
+
+
+def save_index(index, path, version=None):
+    """Persist an index next to the face database, tagged with the store version it was built from"""
+    if version is None:
+        index.save(path)
+    else:
+        index.save(path, store_version=np.asarray(version, dtype=np.int64))
+
+
+def load_index(path, matrix, kind="brute", version=None, **params):
+    """Load a persisted index, rebuilding it if missing or stale for this gallery
+
+    With a version, the index must have been saved for exactly that store version: a
+    remove and re-enroll keeps the row count but changes the rows.
+    """
+    index = make_index(kind, **params)
+    try:
+        if os.path.exists(path):
+            with np.load(path) as data:
+                fresh = version is None or ("store_version" in data.files and
+                                            data["store_version"].tolist() == list(version))
+                if fresh and str(data["kind"]) == kind and index.load_state(data, matrix, path):
+                    return index
+    except (OSError, KeyError, ValueError):
+        pass
+    index.reset(matrix)
+    return index
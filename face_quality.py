@@ -0,0 +1,130 @@
+import time
+import cv2
+import numpy as np
+import face_recognition
+import metrics
+
+# Quality Gate Configuration
+MIN_FACE_SIZE = 60  # Pixels, shorter side of the face box
+MIN_SHARPNESS = 40.0  # Laplacian variance of the face crop at QUALITY_CROP_SIZE
+GOOD_SHARPNESS = 200.0  # Sharpness scoring 1.0
+MIN_BRIGHTNESS = 50  # Mean gray level of the face crop
+MAX_BRIGHTNESS = 205
+MAX_YAW = 0.3  # Nose offset from the eye midpoint, in inter-eye distances (~25 degrees)
+QUALITY_CROP_SIZE = 100  # Crops are resized to this before measuring, so scores compare across distances
+
+
+def _crop_gray(rgb_frame, location):
+    top, right, bottom, left = location
+    height, width = rgb_frame.shape[:2]
+    crop = rgb_frame[max(0, top):min(height, bottom), max(0, left):min(width, right)]
+    if crop.size == 0:
+        return None
+    gray = cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY)
+    return cv2.resize(gray, (QUALITY_CROP_SIZE, QUALITY_CROP_SIZE), interpolation=cv2.INTER_AREA)
+
+
+def face_landmarks(rgb_frame, location, model="small"):
+    """Landmarks of one face: model "small" (5 points) or "large" (68 points, needed for blinks)"""
+    landmarks = face_recognition.face_landmarks(rgb_frame, [location], model=model)
+    return landmarks[0] if landmarks else None
+
+
+def estimate_yaw(points):
+    """Horizontal nose offset from the eye midpoint, 0 for a frontal face (5- or 68-point landmarks)"""
+    left_eye = np.mean(points["left_eye"], axis=0)
+    right_eye = np.mean(points["right_eye"], axis=0)
+    eye_distance = np.linalg.norm(right_eye - left_eye)
+    if eye_distance < 1:
+        return None
+    nose = np.mean(points["nose_tip"], axis=0)
+    return float((nose[0] - (left_eye[0] + right_eye[0]) / 2) / eye_distance)
+
+
+def assess_face(rgb_frame, location, check_pose=True, landmark_model="small"):
+    """Score one face before encoding: returns {"score" 0-1, "passed", "reason", and the raw measures}
+
+    Cheap checks run first (size, exposure, sharpness); landmarks are only
+    fitted for faces that pass them, and kept under "landmarks" for later stages.
+    """
+    top, right, bottom, left = location
+    size = min(bottom - top, right - left)
+    result = {"size": size, "brightness": None, "sharpness": None, "yaw": None, "landmarks": None,
+              "score": 0.0, "passed": False, "reason": None}
+    if size < MIN_FACE_SIZE:
+        result["reason"] = "too small"
+        return result
+    gray = _crop_gray(rgb_frame, location)
+    if gray is None:
+        result["reason"] = "outside frame"
+        return result
+
+    result["brightness"] = brightness = float(gray.mean())
+    if not MIN_BRIGHTNESS <= brightness <= MAX_BRIGHTNESS:
+        result["reason"] = "too dark" if brightness < MIN_BRIGHTNESS else "overexposed"
+        return result
+    result["sharpness"] = sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    if sharpness < MIN_SHARPNESS:
+        result["reason"] = "blurry"
+        return result
+
+    pose_score = 1.0
+    if check_pose:
+        result["landmarks"] = points = face_landmarks(rgb_frame, location, landmark_model)
+        result["yaw"] = yaw = estimate_yaw(points) if points else None
+        if yaw is None or abs(yaw) > MAX_YAW:
+            result["reason"] = "turned away"
+            return result
+        pose_score = 1.0 - abs(yaw) / MAX_YAW * 0.5
+
+    size_score = min(1.0, size / (2 * MIN_FACE_SIZE))
+    sharpness_score = min(1.0, sharpness / GOOD_SHARPNESS)
+    exposure_score = 1.0 - abs(brightness - 128) / 128
+    result["score"] = size_score * sharpness_score * exposure_score * pose_score
+    result["passed"] = True
+    return result
+
+
+class QualityGate:
+    """Drops faces that would fail recognition before the ResNet encoder runs
+
+    Counts skipped faces per reason; `saved_ms` estimates the encoder time they
+    would have cost from the encode stage's mean latency (about one face per call).
+    """
+
+    def __init__(self, check_pose=True, enabled=True, landmark_model="small"):
+        self.check_pose = check_pose
+        self.enabled = enabled
+        self.landmark_model = landmark_model
+        self.checked = 0
+        self.skipped = {}
+        self.gate_ms = 0.0
+
+    def filter(self, rgb_frame, face_locations):
+        """Return (kept locations, assessment per input location)"""
+        if not self.enabled:
+            return list(face_locations), [None] * len(face_locations)
+        start = time.perf_counter()
+        kept, assessments = [], []
+        for location in face_locations:
+            assessment = assess_face(rgb_frame, location, self.check_pose, self.landmark_model)
+            assessments.append(assessment)
+            if assessment["passed"]:
+                kept.append(location)
+            else:
+                self.skipped[assessment["reason"]] = self.skipped.get(assessment["reason"], 0) + 1
+        self.checked += len(face_locations)
+        self.gate_ms += (time.perf_counter() - start) * 1000
+        metrics.count("quality_skipped", len(face_locations) - len(kept))
+        return kept, assessments
+
+    def stats(self):
+        skipped = sum(self.skipped.values())
+        encode = metrics.REGISTRY.snapshot()["stages"].get("encode", {})
+        return {
+            "checked": self.checked,
+            "skipped": skipped,
+            "reasons": dict(self.skipped),
+            "gate_ms": self.gate_ms / self.checked if self.checked else 0.0,
+            "saved_ms": skipped * encode.get("mean", 0.0),
+        }
@@ -0,0 +1,277 @@
+"""Append-only, memory-mapped face embedding store
+
+Layout of a store directory:
+    CURRENT                  generation number of the live files
+    embeddings-<gen>.f32     fixed-width float32 rows, opened with np.memmap
+    names-<gen>.jsonl        one JSON record per row (name, enrollment time)
+                             plus {"remove": name} tombstones
+
+Enrollment appends a row to the embedding file (fsync) and then its record to
+the sidecar (fsync). Rows without a complete sidecar record are truncated on
+open, so a crash mid-write never corrupts the store. Clear, compaction and
+batch enrollment write a new generation and switch CURRENT with an atomic
+rename, so they take effect completely or not at all.
+
+Usage: python face_store.py migrate face_database.pkl face_store
+"""
+import os
+import sys
+import json
+import pickle
+import datetime
+import numpy as np
+
+EMBEDDING_DIM = 128
+CURRENT_FILE = "CURRENT"
+
+
+def _fsync_write(path, data, mode="ab"):
+    with open(path, mode) as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _atomic_write_text(path, text):
+    tmp_path = path + ".tmp"
+    _fsync_write(tmp_path, text.encode("utf-8"), "wb")
+    os.replace(tmp_path, path)
+
+
+def store_version(directory):
+    """Cheap change signature: (generation, sidecar size, sidecar mtime)"""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as f:
+            generation = int(f.read().strip())
+        stat = os.stat(os.path.join(directory, f"names-{generation:06d}.jsonl"))
+        return generation, stat.st_size, stat.st_mtime_ns
+    except (OSError, ValueError):
+        return None
+
+
+class FaceStore:
+    """Face embeddings on disk, one float32 row per enrolled sample"""
+
+    def __init__(self, directory, dim=EMBEDDING_DIM):
+        self.directory = directory
+        self.dim = dim
+        self.row_bytes = dim * np.dtype(np.float32).itemsize
+        os.makedirs(directory, exist_ok=True)
+        self.refresh()
+
+    # -- file layout ---------------------------------------------------------
+    def _embeddings_path(self, generation):
+        return os.path.join(self.directory, f"embeddings-{generation:06d}.f32")
+
+    def _names_path(self, generation):
+        return os.path.join(self.directory, f"names-{generation:06d}.jsonl")
+
+    @property
+    def version(self):
+        return store_version(self.directory)
+
+    def _read_generation(self):
+        try:
+            with open(os.path.join(self.directory, CURRENT_FILE)) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def refresh(self):
+        """(Re)open the live generation, repairing any torn tail"""
+        generation = self._read_generation()
+        if generation is None:
+            generation = 0
+            _fsync_write(self._embeddings_path(generation), b"", "wb")
+            _fsync_write(self._names_path(generation), b"", "wb")
+            _atomic_write_text(os.path.join(self.directory, CURRENT_FILE), str(generation))
+        self.generation = generation
+
+        records, valid_bytes = self._read_sidecar()
+        self.row_names = []
+        self.metadata = []
+        self._removed = {}
+        for record in records:
+            if "remove" in record:
+                # Tombstone applies to every row enrolled under that name so far
+                self._removed[record["remove"]] = len(self.row_names)
+            else:
+                self.row_names.append(record["name"])
+                self.metadata.append(record)
+
+        emb_path = self._embeddings_path(generation)
+        rows_on_disk = os.path.getsize(emb_path) // self.row_bytes
+        rows = len(self.row_names)
+        if rows_on_disk < rows:
+            # Sidecar ahead of data can only mean a damaged file: drop the unbacked records
+            rows = rows_on_disk
+            self.row_names = self.row_names[:rows]
+            self.metadata = self.metadata[:rows]
+        if os.path.getsize(emb_path) != rows * self.row_bytes:
+            with open(emb_path, "r+b") as f:
+                f.truncate(rows * self.row_bytes)
+        names_path = self._names_path(generation)
+        if os.path.getsize(names_path) != valid_bytes:
+            with open(names_path, "r+b") as f:
+                f.truncate(valid_bytes)
+        self._map(rows)
+        self._live = None
+
+    def _read_sidecar(self):
+        records = []
+        valid_bytes = 0
+        with open(self._names_path(self.generation), "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Torn final record
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+                valid_bytes += len(line)
+        return records, valid_bytes
+
+    def _map(self, rows):
+        if rows:
+            self._matrix = np.memmap(self._embeddings_path(self.generation), dtype=np.float32,
+                                     mode="r", shape=(rows, self.dim))
+        else:
+            self._matrix = np.empty((0, self.dim), dtype=np.float32)
+
+    # -- reads ---------------------------------------------------------------
+    def _live_mask(self):
+        if self._live is None:
+            self._live = np.array([self._removed.get(name, -1) <= row
+                                   for row, name in enumerate(self.row_names)], dtype=bool)
+        return self._live
+
+    def __len__(self):
+        return int(self._live_mask().sum())
+
+    @property
+    def has_tombstones(self):
+        return not self._live_mask().all()
+
+    @property
+    def names(self):
+        """Name of each live row, aligned with embeddings"""
+        mask = self._live_mask()
+        return [name for name, live in zip(self.row_names, mask) if live]
+
+    @property
+    def embeddings(self):
+        """Live rows; a zero-copy memmap view unless rows have been removed"""
+        if not self.has_tombstones:
+            return self._matrix
+        return np.asarray(self._matrix[self._live_mask()])
+
+    def identities(self):
+        """Distinct enrolled names"""
+        return list(dict.fromkeys(self.names))
+
+    def to_dict(self):
+        """{name: latest encoding}, the legacy pickle database shape"""
+        return {name: np.array(row) for name, row in zip(self.names, self.embeddings)}
+
+    # -- writes --------------------------------------------------------------
+    def append(self, name, encoding, **metadata):
+        """Enroll one encoding under name"""
+        self.append_many([name], [encoding], [metadata])
+
+    def append_many(self, names, encodings, metadata=None):
+        """Enroll several encodings with one data fsync and one sidecar fsync"""
+        rows = np.ascontiguousarray(np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim))
+        if len(rows) != len(names):
+            raise ValueError("names and encodings must have the same length")
+        if not len(rows):
+            return
+        metadata = metadata or [{} for _ in names]
+        enrolled = datetime.datetime.now().isoformat(timespec="seconds")
+        records = [dict(meta, name=name, enrolled=meta.get("enrolled", enrolled))
+                   for name, meta in zip(names, metadata)]
+        _fsync_write(self._embeddings_path(self.generation), rows.tobytes())
+        _fsync_write(self._names_path(self.generation),
+                     "".join(json.dumps(r) + "\n" for r in records).encode("utf-8"))
+        self.row_names.extend(names)
+        self.metadata.extend(records)
+        self._map(len(self.row_names))
+        self._live = None
+
+    def remove(self, name):
+        """Tombstone every row enrolled under name, returns rows removed"""
+        removed = sum(1 for n, live in zip(self.row_names, self._live_mask()) if live and n == name)
+        if removed:
+            _fsync_write(self._names_path(self.generation),
+                         (json.dumps({"remove": name}) + "\n").encode("utf-8"))
+            self._removed[name] = len(self.row_names)
+            self._live = None
+        return removed
+
+    def enroll_batch(self, names, encodings, metadata=None, replace=()):
+        """Enroll several encodings and drop every row of the names in replace in one atomic switch
+
+        Unlike remove() followed by append_many(), a crash leaves either the old or the new
+        enrollment, never the people removed but not yet re-added.
+        """
+        rows = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        if len(rows) != len(names):
+            raise ValueError("names and encodings must have the same length")
+        metadata = metadata or [{} for _ in names]
+        enrolled = datetime.datetime.now().isoformat(timespec="seconds")
+        replace = set(replace)
+        keep = self._live_mask() & np.array([name not in replace for name in self.row_names], dtype=bool)
+        kept_names = [name for name, live in zip(self.row_names, keep) if live]
+        kept_metadata = [m for m, live in zip(self.metadata, keep) if live]
+        self._write_generation(kept_names + list(names),
+                               np.concatenate([np.asarray(self._matrix[keep]), rows]),
+                               kept_metadata + [dict(meta, enrolled=meta.get("enrolled", enrolled))
+                                                for meta in metadata])
+
+    def _write_generation(self, names, rows, metadata):
+        generation = self.generation + 1
+        _fsync_write(self._embeddings_path(generation),
+                     np.ascontiguousarray(rows, dtype=np.float32).tobytes(), "wb")
+        _fsync_write(self._names_path(generation),
+                     "".join(json.dumps(dict(m, name=n)) + "\n" for n, m in zip(names, metadata)).encode("utf-8"),
+                     "wb")
+        old_generation = self.generation
+        _atomic_write_text(os.path.join(self.directory, CURRENT_FILE), str(generation))
+        self._matrix = None
+        for path in (self._embeddings_path(old_generation), self._names_path(old_generation)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # Still mapped elsewhere (Windows); removed on next switch
+        self.refresh()
+
+    def clear(self):
+        """Drop every enrollment by switching to an empty generation"""
+        self._write_generation([], np.empty((0, self.dim), dtype=np.float32), [])
+
+    def compact(self):
+        """Rewrite the live rows into a new generation without tombstones"""
+        mask = self._live_mask()
+        metadata = [m for m, live in zip(self.metadata, mask) if live]
+        self._write_generation(self.names, np.asarray(self.embeddings), metadata)
+
+
+def migrate_pickle(pickle_path, directory, remove_source=False):
+    """One-shot import of a legacy {name: encoding} pickle into a FaceStore"""
+    with open(pickle_path, "rb") as f:
+        database = pickle.load(f)
+    store = FaceStore(directory)
+    if len(store):
+        raise ValueError(f"Refusing to migrate into non-empty store: {directory}")
+    store.append_many(list(database.keys()), list(database.values()),
+                      [{"source": os.path.basename(pickle_path)} for _ in database])
+    if remove_source:
+        os.replace(pickle_path, pickle_path + ".migrated")
+    return store
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "migrate":
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+    migrated = migrate_pickle(sys.argv[2], sys.argv[3])
+    print(f"Migrated {len(migrated)} encodings into {sys.argv[3]}")
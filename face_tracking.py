@@ -0,0 +1,163 @@
+import time
+import itertools
+import cv2
+
+# Tracking Configuration
+REDETECT_INTERVAL = 5  # Full detection every N frames
+MIN_TRACK_CONFIDENCE = 0.6  # Template match score below which we re-detect
+TRACK_SCALE = 0.5  # Tracking runs on a resized grayscale copy
+SEARCH_MARGIN = 0.5  # Search window grows the last box by this fraction per side
+
+
+def _make_cv_tracker(method):
+    """KCF / CSRT live in opencv-contrib, under cv2 or cv2.legacy depending on version"""
+    name = {"kcf": "TrackerKCF_create", "csrt": "TrackerCSRT_create"}[method]
+    for module in (cv2, getattr(cv2, "legacy", None)):
+        if module is not None and hasattr(module, name):
+            return getattr(module, name)()
+    raise ImportError(f"{method.upper()} tracker requires opencv-contrib-python")
+
+
+def box_iou(a, b):
+    """Intersection over union of two (top, right, bottom, left) boxes"""
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, bottom - top) * max(0, right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+
+class Track:
+    """One face followed between detections"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, box):
+        self.id = next(Track._ids)
+        self.box = box  # (top, right, bottom, left) in tracking-scale pixels
+        self.template = None
+        self.cv_tracker = None
+        self.confidence = 1.0
+        self.age = 0
+
+
+class FaceTracker:
+    """Run the detector every few frames and follow faces in between"""
+
+    def __init__(self, detector, redetect_interval=REDETECT_INTERVAL, min_confidence=MIN_TRACK_CONFIDENCE,
+                 method="template", track_scale=TRACK_SCALE, search_margin=SEARCH_MARGIN):
+        self.detector = detector
+        self.redetect_interval = redetect_interval
+        self.min_confidence = min_confidence
+        self.method = method
+        self.track_scale = track_scale
+        self.search_margin = search_margin
+        self.tracks = []
+        self.frames = 0
+        self.detections = 0
+        self.tracked_frames = 0
+        self.track_ms = 0.0
+        self._since_detect = 0
+
+    def reset(self):
+        self.tracks = []
+        self._since_detect = 0
+
+    def _small(self, rgb_frame):
+        gray = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2GRAY)
+        if self.track_scale < 1:
+            gray = cv2.resize(gray, (0, 0), fx=self.track_scale, fy=self.track_scale,
+                              interpolation=cv2.INTER_AREA)
+        return gray
+
+    def _to_small(self, location):
+        return tuple(int(round(v * self.track_scale)) for v in location)
+
+    def _to_full(self, box, shape):
+        height, width = shape[:2]
+        top, right, bottom, left = (int(round(v / self.track_scale)) for v in box)
+        return max(0, top), min(width, right), min(height, bottom), max(0, left)
+
+    def _start_tracks(self, rgb_frame, gray, locations):
+        previous = self.tracks
+        self.tracks = []
+        for location in locations:
+            track = Track(self._to_small(location))
+            # Keep the id of the overlapping previous track so a face stays one track across re-detections
+            overlaps = [(box_iou(track.box, old.box), old) for old in previous]
+            if overlaps:
+                iou, old = max(overlaps, key=lambda pair: pair[0])
+                if iou >= 0.3:
+                    track.id = old.id
+                    previous.remove(old)
+            top, right, bottom, left = track.box
+            if self.method == "template":
+                track.template = gray[top:bottom, left:right].copy()
+            else:
+                track.cv_tracker = _make_cv_tracker(self.method)
+                track.cv_tracker.init(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR),
+                                      (left, top, right - left, bottom - top))
+            self.tracks.append(track)
+
+    def _follow(self, track, gray):
+        top, right, bottom, left = track.box
+        if track.cv_tracker is not None:
+            ok, (x, y, w, h) = track.cv_tracker.update(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR))
+            track.confidence = 1.0 if ok else 0.0
+            if ok:
+                track.box = (int(y), int(x + w), int(y + h), int(x))
+            return
+        h, w = bottom - top, right - left
+        if h < 4 or w < 4:
+            track.confidence = 0.0
+            return
+        my, mx = int(h * self.search_margin), int(w * self.search_margin)
+        y0, x0 = max(0, top - my), max(0, left - mx)
+        y1, x1 = min(gray.shape[0], bottom + my), min(gray.shape[1], right + mx)
+        window = gray[y0:y1, x0:x1]
+        if window.shape[0] < h or window.shape[1] < w:
+            track.confidence = 0.0
+            return
+        scores = cv2.matchTemplate(window, track.template, cv2.TM_CCOEFF_NORMED)
+        _, best, _, (bx, by) = cv2.minMaxLoc(scores)
+        track.confidence = float(best)
+        track.box = (y0 + by, x0 + bx + w, y0 + by + h, x0 + bx)
+        # Refresh the template so slow appearance changes don't drift the match
+        track.template = gray[track.box[0]:track.box[2], track.box[3]:track.box[1]].copy()
+
+    def update(self, rgb_frame):
+        """Return face locations for this frame in full-resolution coordinates"""
+        self.frames += 1
+        gray = self._small(rgb_frame)
+        if self.tracks and self._since_detect < self.redetect_interval:
+            start = time.perf_counter()
+            for track in self.tracks:
+                self._follow(track, gray)
+                track.age += 1
+            self.track_ms += (time.perf_counter() - start) * 1000
+            if all(track.confidence >= self.min_confidence for track in self.tracks):
+                self._since_detect += 1
+                self.tracked_frames += 1
+                return [self._to_full(track.box, rgb_frame.shape) for track in self.tracks]
+
+        locations = self.detector.detect(rgb_frame)
+        self.detections += 1
+        self._since_detect = 1
+        self._start_tracks(rgb_frame, gray, locations)
+        return locations
+
+    @property
+    def track_ids(self):
+        """Track id of each location returned by the last update()"""
+        return [track.id for track in self.tracks]
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "detections": self.detections,
+            "tracked_frames": self.tracked_frames,
+            "detect_ms": self.detector.avg_ms,
+            "track_ms": self.track_ms / self.tracked_frames if self.tracked_frames else 0.0,
+        }
@@ -0,0 +1,92 @@
+import threading
+import numpy as np
+from face_gallery import FaceGallery, EMBEDDING_DIM
+from face_index import load_index, save_index
+from face_store import FaceStore, store_version
+
+
+class GalleryCache:
+    """One shared FaceStore + FaceGallery per process, reloaded only when the store changes on disk"""
+
+    def __init__(self, directory, index_file, index_backend="brute"):
+        self.directory = directory
+        self.index_file = index_file
+        self.index_backend = index_backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._store = None
+        self._gallery = None
+        self._version = None
+
+    def _reload(self):
+        if self._store is None:
+            self._store = FaceStore(self.directory)
+        else:
+            self._store.refresh()
+        version = self._store.version
+        gallery = FaceGallery.from_store(self._store)
+        gallery.set_index(load_index(self.index_file, gallery.embeddings, self.index_backend, version=version),
+                          rebuild=False)
+        self._gallery = gallery
+        self._version = version
+
+    def _current(self):
+        if self._gallery is not None and store_version(self.directory) == self._version:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._reload()
+
+    def get(self):
+        """Return (store, gallery), reloading first if another writer changed the store"""
+        with self._lock:
+            self._current()
+            return self._store, self._gallery
+
+    @property
+    def gallery(self):
+        return self.get()[1]
+
+    def match(self, encodings, tolerance=0.5):
+        """FaceGallery.match under the cache lock, safe against concurrent enrollment"""
+        with self._lock:
+            self._current()
+            return self._gallery.match(encodings, tolerance=tolerance)
+
+    def enroll(self, name, encodings, replace=True):
+        """Write one or more encodings for name through to disk and update the shared gallery in place"""
+        rows = np.asarray(encodings, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+        with self._lock:
+            self._current()
+            if replace:
+                self._store.remove(name)
+                self._gallery.remove(name)
+            self._store.append_many([name] * len(rows), rows)
+            self._gallery.add_many([name] * len(rows), rows)
+            self._saved()
+
+    def clear(self):
+        """Drop every enrollment on disk and in memory"""
+        with self._lock:
+            self._current()
+            self._store.clear()
+            self._gallery.clear()
+            self._saved()
+
+    def _saved(self):
+        # Our own writes are already applied in memory: adopt the new version without reloading
+        self._version = self._store.version
+        save_index(self._gallery.index, self.index_file, version=self._version)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "generation": self._version[0] if self._version else None,
+                "size": len(self._gallery) if self._gallery is not None else 0,
+                # Live rows only, without self._store.embeddings: with tombstones that copies every row
+                "store_mb": len(self._store) * self._store.row_bytes / 1024 / 1024 if self._store is not None else 0.0,
+                "index_mb": self._gallery.memory_bytes() / 1024 / 1024 if self._gallery is not None else 0.0,
+            }
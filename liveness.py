@@ -0,0 +1,199 @@
+import time
+import cv2
+import numpy as np
+import metrics
+from face_tracking import box_iou
+
+# Liveness Configuration
+LIVENESS_MIN_FRAMES = 5  # Frames of the same face before a "live" verdict
+LIVENESS_MAX_FRAMES = 20  # Frames without a blink or depth motion before a "spoof" verdict
+BLINK_RATIO = 0.7  # Eye aspect ratio below this fraction of the open-eye level counts as closed...
+CLOSED_EAR = 0.2  # ...and below this absolute level
+BLINK_CLOSED_FRAMES = 2  # Frames the eyes stay closed before reopening counts as a blink
+OPEN_EYE_WINDOW = 10  # Recent open-eye frames the open-eye level is the median of
+MIN_DEPTH_MOTION = 0.02  # Landmark motion a flat picture cannot produce, in inter-eye distances...
+DEPTH_NOISE_FACTOR = 3.0  # ...and above this multiple of the frame's landmark noise floor
+DEPTH_MOTION_FRAMES = 3  # Consecutive frames of such motion that count as a live cue
+MOIRE_PEAK_RATIO = 25.0  # High-frequency spectrum peak / median above this looks like a screen or print
+MOIRE_FRAME_SHARE = 0.5  # Share of texture checks showing moire that marks a spoof
+TEXTURE_INTERVAL = 3  # Texture analysis runs on every Nth frame of the candidate
+TEXTURE_SIZE = 128  # Face crops are resized to this before the FFT
+TEXTURE_INSET = 0.15  # Share of the box trimmed on each side, keeping hair, background and overlays out
+SAME_FACE_IOU = 0.3  # A candidate box overlapping the last one less than this starts over
+
+
+def eye_aspect_ratio(eye):
+    """Eyelid opening over eye width from the 6 eye landmarks, ~0.3 open and ~0.1 closed"""
+    p = np.asarray(eye, dtype=np.float64)
+    width = np.linalg.norm(p[0] - p[3])
+    return float((np.linalg.norm(p[1] - p[5]) + np.linalg.norm(p[2] - p[4])) / (2 * width)) if width else 0.0
+
+
+def moire_ratio(bgr_frame, location):
+    """Strongest high-frequency peak over the median of that band in the face crop's spectrum
+
+    Natural skin has a smoothly decaying spectrum; screens and halftone prints add
+    sharp periodic peaks.
+    """
+    top, right, bottom, left = location
+    inset_y, inset_x = int((bottom - top) * TEXTURE_INSET), int((right - left) * TEXTURE_INSET)
+    height, width = bgr_frame.shape[:2]
+    crop = bgr_frame[max(0, top + inset_y):min(height, bottom - inset_y),
+                     max(0, left + inset_x):min(width, right - inset_x)]
+    if crop.size == 0:
+        return 0.0
+    gray = cv2.resize(cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY), (TEXTURE_SIZE, TEXTURE_SIZE),
+                      interpolation=cv2.INTER_AREA).astype(np.float32)
+    gray -= gray.mean()
+    gray *= np.outer(np.hanning(TEXTURE_SIZE), np.hanning(TEXTURE_SIZE))
+    spectrum = np.abs(np.fft.fftshift(np.fft.fft2(gray)))
+    half = TEXTURE_SIZE // 2
+    yy, xx = np.mgrid[-half:half, -half:half]
+    radius = np.hypot(yy, xx)
+    band = spectrum[(radius >= TEXTURE_SIZE / 8) & (radius < half - 4)]
+    return float(band.max() / (np.median(band) + 1e-6))
+
+
+PLANE_FEATURES = ("left_eye", "right_eye", "left_eyebrow", "right_eyebrow", "top_lip", "bottom_lip")
+DEPTH_FEATURES = ("nose_bridge", "nose_tip")
+
+
+def crop_landmarks(bgr_frame, location):
+    """68-point landmarks fitted on an RGB copy of the face region only, in frame coordinates"""
+    # Imported here so the liveness rules can be used without loading the face models
+    from face_quality import face_landmarks
+    top, right, bottom, left = location
+    margin = (bottom - top) // 4
+    y0, x0 = max(0, top - margin), max(0, left - margin)
+    crop = cv2.cvtColor(bgr_frame[y0:bottom + margin, x0:right + margin], cv2.COLOR_BGR2RGB)
+    points = face_landmarks(crop, (top - y0, right - x0, bottom - y0, left - x0), model="large")
+    if not points:
+        return None
+    return {feature: [(x + x0, y + y0) for x, y in feature_points] for feature, feature_points in points.items()}
+
+
+def _points(landmarks, features):
+    return np.array([p for feature in features for p in landmarks.get(feature, [])], dtype=np.float32)
+
+
+class LivenessCheck:
+    """Blink, depth-motion and moire evidence for the candidate face across an authentication attempt
+
+    Call update() once per frame with the BGR capture frame (before overlays are
+    drawn) and the one face being authenticated. It reuses 68-point landmarks
+    from the quality gate when given, so the only extra work
+    per frame is a homography fit and, every TEXTURE_INTERVAL frames, one FFT.
+    A blink (eyes shut for BLINK_CLOSED_FRAMES, then open) or nose motion that no
+    flat picture could produce, well above the landmark jitter for
+    DEPTH_MOTION_FRAMES frames running, means "live";
+    a moire pattern, or neither cue within LIVENESS_MAX_FRAMES, means "spoof".
+    """
+
+    def __init__(self, min_frames=LIVENESS_MIN_FRAMES, max_frames=LIVENESS_MAX_FRAMES, blink_ratio=BLINK_RATIO,
+                 min_depth_motion=MIN_DEPTH_MOTION, moire_peak_ratio=MOIRE_PEAK_RATIO):
+        self.min_frames = min_frames
+        self.max_frames = max_frames
+        self.blink_ratio = blink_ratio
+        self.min_depth_motion = min_depth_motion
+        self.moire_peak_ratio = moire_peak_ratio
+        self.checked = 0
+        self.total_ms = 0.0
+        self.reset()
+
+    def reset(self):
+        """Forget the current candidate, e.g. when a different face steps in"""
+        self.box = None
+        self.seen = 0
+        self.frames = 0
+        self.open_ears = []
+        self.closed_frames = 0
+        self.blinks = 0
+        self.reference = None
+        self.depth_motion = 0.0
+        self.depth_run = 0
+        self.depth_frames = 0
+        self.textured = 0
+        self.moire_frames = 0
+
+    def _update_landmarks(self, landmarks):
+        left_eye, right_eye = landmarks.get("left_eye", []), landmarks.get("right_eye", [])
+        if len(left_eye) != 6 or len(right_eye) != 6:
+            return  # 5-point landmarks carry no eyelids
+        self.frames += 1
+        ear = (eye_aspect_ratio(left_eye) + eye_aspect_ratio(right_eye)) / 2
+        # One noisy frame is not a blink: the eyes must stay clearly shut for a few frames, then open
+        open_level = float(np.median(self.open_ears[-OPEN_EYE_WINDOW:])) if self.open_ears else ear
+        if ear < CLOSED_EAR and ear < self.blink_ratio * open_level:
+            self.closed_frames += 1
+        else:
+            if self.closed_frames >= BLINK_CLOSED_FRAMES:
+                self.blinks += 1
+            self.closed_frames = 0
+            self.open_ears.append(ear)
+
+        # Eyes, brows and lips lie roughly on one plane and the nose stands out of it. Any
+        # movement of a photo maps the whole face by one homography; a real head turning
+        # moves the nose off the plane's prediction (parallax). The plane points' own fit
+        # residual measures the landmark jitter, which the nose must clearly exceed, frame
+        # after frame.
+        plane, depth = _points(landmarks, PLANE_FEATURES), _points(landmarks, DEPTH_FEATURES)
+        eye_distance = float(np.linalg.norm(np.mean(left_eye, axis=0) - np.mean(right_eye, axis=0)))
+        if self.reference is None or len(plane) != len(self.reference[0]) or len(depth) != len(self.reference[1]):
+            self.reference = plane, depth
+            return
+        homography, _ = cv2.findHomography(self.reference[0], plane, 0)
+        if homography is None or not eye_distance or not len(depth):
+            return
+        plane_residual = plane - cv2.perspectiveTransform(self.reference[0][None], homography)[0]
+        noise_floor = float(np.sqrt(np.mean(np.sum(plane_residual ** 2, axis=1)) / len(depth)))
+        projected = cv2.perspectiveTransform(self.reference[1][None], homography)[0]
+        parallax = float(np.linalg.norm(np.mean(depth - projected, axis=0)))
+        self.depth_motion = max(self.depth_motion, parallax / eye_distance)
+        if parallax >= max(self.min_depth_motion * eye_distance, DEPTH_NOISE_FACTOR * noise_floor):
+            self.depth_run += 1
+            self.depth_frames = max(self.depth_frames, self.depth_run)
+        else:
+            self.depth_run = 0
+
+    def update(self, bgr_frame, location, landmarks=None):
+        """Add one frame of the candidate face; returns verdict()"""
+        start = time.perf_counter()
+        if self.box is not None and box_iou(self.box, location) < SAME_FACE_IOU:
+            self.reset()
+        self.box = location
+        self.seen += 1
+        if landmarks is None or len(landmarks.get("left_eye", [])) != 6:
+            landmarks = crop_landmarks(bgr_frame, location)
+        if landmarks:
+            self._update_landmarks(landmarks)
+        if self.seen % TEXTURE_INTERVAL == 1:
+            self.textured += 1
+            if moire_ratio(bgr_frame, location) > self.moire_peak_ratio:
+                self.moire_frames += 1
+        elapsed = (time.perf_counter() - start) * 1000
+        metrics.observe("liveness", elapsed)
+        self.checked += 1
+        self.total_ms += elapsed
+        return self.verdict()
+
+    def verdict(self):
+        """(state, reason): state is "live", "spoof" or "pending" """
+        if self.textured >= 2 and self.moire_frames >= MOIRE_FRAME_SHARE * self.textured:
+            return "spoof", "screen or print pattern"
+        if self.frames >= self.min_frames:
+            if self.blinks:
+                return "live", "blink"
+            if self.depth_frames >= DEPTH_MOTION_FRAMES:
+                return "live", "depth motion"
+        if self.frames >= self.max_frames:
+            return "spoof", "no blink or depth motion"
+        return "pending", None
+
+    def stats(self):
+        return {
+            "checked": self.checked,
+            "avg_ms": self.total_ms / self.checked if self.checked else 0.0,
+            "blinks": self.blinks,
+            "depth_motion": self.depth_motion,
+            "moire_frames": self.moire_frames,
+        }
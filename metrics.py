@@ -0,0 +1,195 @@
+import os
+import time
+import threading
+from collections import deque
+import numpy as np
+
+# Metrics Configuration
+METRICS_ENABLED = os.environ.get("FACE_METRICS", "1") != "0"
+HISTOGRAM_WINDOW = 1000  # Most recent samples kept per stage for percentiles
+METRIC_PREFIX = "face_"
+
+STAGES = {
+    "capture": "Reading a frame from the camera",
+    "convert": "BGR to RGB conversion",
+    "detect": "Face detection / tracking",
+    "quality": "Pre-encoding face quality gate",
+    "encode": "Face encoding",
+    "detect_encode": "Detection + encoding in the service worker pool",
+    "match": "Gallery matching",
+    "liveness": "Liveness check on the candidate face",
+    "log": "Queueing events and alerts",
+    "render": "Drawing and sending the frame to the browser",
+    "frame": "Whole frame, capture to render",
+    "api_request": "HTTP API request",
+}
+COUNTERS = {
+    "frames": "Frames processed",
+    "faces": "Faces found",
+    "matches": "Faces matched to an enrolled user",
+    "unknown_faces": "Faces not matched",
+    "dropped_frames": "Stale camera frames dropped",
+    "quality_skipped": "Faces skipped by the quality gate before encoding",
+}
+
+
+def latency_summary(samples_ms):
+    """Count, mean and percentiles of a list of latencies (ms)"""
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    if not len(samples):
+        return {"count": 0}
+    return {
+        "count": int(len(samples)),
+        "mean": float(samples.mean()),
+        "p50": float(np.percentile(samples, 50)),
+        "p95": float(np.percentile(samples, 95)),
+        "p99": float(np.percentile(samples, 99)),
+    }
+
+
+class RollingHistogram:
+    """Latency samples (ms) over the last `window` observations plus all-time count and sum
+
+    observe() and snapshot() run on different threads (camera loops vs. the dashboard or
+    /metrics), so both hold the lock: copying a deque while it is appended to raises.
+    """
+
+    def __init__(self, window=HISTOGRAM_WINDOW, lock=None):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = lock or threading.Lock()
+
+    def observe(self, ms):
+        with self._lock:
+            self.samples.append(ms)
+            self.count += 1
+            self.sum += ms
+
+    def snapshot(self):
+        with self._lock:
+            samples = np.array(self.samples)
+            count, total = self.count, self.sum
+        if not len(samples):
+            return {"count": count, "sum": total}
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        return {"count": count, "sum": total, "mean": float(samples.mean()),
+                "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe((time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopTimer()
+
+
+class MetricsRegistry:
+    """Named stage histograms and counters for one process"""
+
+    def __init__(self, enabled=METRICS_ENABLED, window=HISTOGRAM_WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self.started = time.time()
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.get(stage)
+                if histogram is None:
+                    # Histograms share the registry lock, updates are a few appends
+                    histogram = self._histograms[stage] = RollingHistogram(self.window, self._lock)
+        return histogram
+
+    def counter(self, name):
+        counter = self._counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(name, Counter())
+        return counter
+
+    def timer(self, stage):
+        """`with REGISTRY.timer("detect"):` records the block's duration; free when disabled"""
+        if not self.enabled:
+            return _NOOP
+        return _Timer(self.histogram(stage))
+
+    def observe(self, stage, ms):
+        if self.enabled:
+            self.histogram(stage).observe(ms)
+
+    def count(self, name, amount=1):
+        if self.enabled and amount:
+            self.counter(name).inc(amount)
+
+    def snapshot(self):
+        return {
+            "uptime_s": time.time() - self.started,
+            "stages": {stage: h.snapshot() for stage, h in list(self._histograms.items())},
+            "counters": {name: c.value for name, c in list(self._counters.items())},
+        }
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self.started = time.time()
+
+    def prometheus_text(self):
+        """Prometheus text exposition: one summary over stages, one counter per event"""
+        snapshot = self.snapshot()
+        name = f"{METRIC_PREFIX}stage_milliseconds"
+        lines = [f"# HELP {name} Pipeline stage latency over the last {self.window} samples",
+                 f"# TYPE {name} summary"]
+        for stage, stats in sorted(snapshot["stages"].items()):
+            for key, quantile in (("p50", "0.5"), ("p95", "0.95"), ("p99", "0.99")):
+                if key in stats:
+                    lines.append(f'{name}{{stage="{stage}",quantile="{quantile}"}} {stats[key]:.4f}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {stats["sum"]:.4f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {stats["count"]}')
+        for counter, value in sorted(snapshot["counters"].items()):
+            lines.append(f"# HELP {METRIC_PREFIX}{counter}_total {COUNTERS.get(counter, counter)}")
+            lines.append(f"# TYPE {METRIC_PREFIX}{counter}_total counter")
+            lines.append(f"{METRIC_PREFIX}{counter}_total {value}")
+        lines.append(f"# TYPE {METRIC_PREFIX}uptime_seconds gauge")
+        lines.append(f"{METRIC_PREFIX}uptime_seconds {snapshot['uptime_s']:.0f}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+timer = REGISTRY.timer
+observe = REGISTRY.observe
+count = REGISTRY.count
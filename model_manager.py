@@ -0,0 +1,142 @@
+"""Loads the face models once per process, in the background, before anyone needs them
+
+Importing face_recognition loads dlib and reads its model files, and the first
+detection, landmark and encoding calls pay a further one-off setup cost. The
+ModelManager does both on a daemon thread as soon as the process starts, so the
+UI can render straight away and the first authentication is as fast as any
+later one. Code that needs the models imports them as usual: if the background
+import is still running, Python's import lock makes it wait for it.
+
+Usage: python model_manager.py [--detector hog]
+"""
+import sys
+import time
+import argparse
+import importlib
+import threading
+import numpy as np
+
+# Model Manager Configuration
+MODEL_MODULES = ("face_recognition", "face_detectors", "face_tracking", "face_quality", "liveness",
+                 "recognition_service")
+WARMUP_FRAME_SIZE = (480, 640)  # Height, width of the synthetic warm-up frame
+WARMUP_FACE = (140, 400, 380, 240)  # Box the landmark and encoding models are run on
+WARMUP_ROUNDS = 2  # First round is the cold call, the last is the steady state
+
+IMPORT_TIMES = {}  # module -> ms taken by its first import in this process
+
+
+def timed_import(name):
+    """Import a module by name, recording how long its first import took"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    IMPORT_TIMES.setdefault(name, (time.perf_counter() - start) * 1000)
+    return module
+
+
+class ModelManager:
+    """Imports and warms the dlib models on a background thread; state is loading, ready or failed"""
+
+    def __init__(self, detector="hog", detector_params=None, modules=MODEL_MODULES, detector_factory=None):
+        self.detector = detector
+        self.detector_params = detector_params or {}
+        # Returns the detector instance the app will use, so that is the one warmed up
+        self.detector_factory = detector_factory
+        self.modules = modules
+        self.state = "idle"
+        self.error = None
+        self.started = None
+        self.load_ms = None
+        self.first_inference_ms = {}
+        self.steady_ms = {}
+        self._done = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self.state = "loading"
+            self.started = time.perf_counter()
+            self._thread = threading.Thread(target=self._load, name="model-loader", daemon=True)
+            self._thread.start()
+        return self
+
+    def _load(self):
+        try:
+            for name in self.modules:
+                timed_import(name)
+            self._warm_up()
+            self.state = "ready"
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+        finally:
+            self.load_ms = (time.perf_counter() - self.started) * 1000
+            self._done.set()
+
+    def _warm_up(self):
+        """Run detection, landmarks and encoding on a synthetic frame until they reach steady state"""
+        face_recognition = sys.modules["face_recognition"]
+        if self.detector_factory is not None:
+            detector = self.detector_factory()
+        else:
+            detector = timed_import("face_detectors").make_detector(self.detector, **self.detector_params)
+        rng = np.random.default_rng(0)
+        frame = rng.integers(0, 256, WARMUP_FRAME_SIZE + (3,), dtype=np.uint8)
+        steps = {
+            "detect": lambda: detector.detect(frame),
+            "landmarks": lambda: face_recognition.face_landmarks(frame, [WARMUP_FACE], model="small"),
+            "encode": lambda: face_recognition.face_encodings(frame, [WARMUP_FACE]),
+        }
+        for round_number in range(WARMUP_ROUNDS):
+            timings = self.first_inference_ms if round_number == 0 else self.steady_ms
+            for step, call in steps.items():
+                start = time.perf_counter()
+                call()
+                timings[step] = (time.perf_counter() - start) * 1000
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def wait(self, timeout=None):
+        """Block until loading finishes; True if the models are ready"""
+        self._done.wait(timeout)
+        return self.ready
+
+    def status(self):
+        elapsed = self.load_ms
+        if elapsed is None and self.started is not None:
+            elapsed = (time.perf_counter() - self.started) * 1000
+        return {
+            "state": self.state,
+            "error": self.error,
+            "elapsed_ms": elapsed,
+            "import_ms": dict(IMPORT_TIMES),
+            "first_inference_ms": dict(self.first_inference_ms),
+            "steady_ms": dict(self.steady_ms),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time model import and first inference")
+    parser.add_argument("--detector", default="hog")
+    args = parser.parse_args()
+
+    manager = ModelManager(args.detector).start()
+    if not manager.wait():
+        print(f"Model loading failed: {manager.error}")
+        return 1
+    status = manager.status()
+    print(f"Models ready in {status['elapsed_ms']:.0f} ms")
+    for name, ms in status["import_ms"].items():
+        print(f"  import {name:<20} {ms:8.1f} ms")
+    for step, ms in status["first_inference_ms"].items():
+        print(f"  {step:<9} first {ms:8.1f} ms, then {status['steady_ms'][step]:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
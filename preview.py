@@ -0,0 +1,62 @@
+import time
+import cv2
+
+# Preview Configuration
+PREVIEW_MAX_FPS = 10  # Frames per second sent to the browser at most
+PREVIEW_WIDTH = 640  # Frames are downscaled to this width before encoding
+PREVIEW_JPEG_QUALITY = 70  # 0-100, lower is smaller and blurrier
+
+
+class PreviewRenderer:
+    """Sends camera frames to a Streamlit placeholder as small JPEGs at a capped rate
+
+    Frames arriving faster than max_fps are skipped rather than queued. If
+    sending a frame takes longer than the frame budget (slow link, busy
+    browser), the next frames are skipped for as long as the send took, so
+    the recognition loop never waits on the display.
+    """
+
+    def __init__(self, placeholder, max_fps=PREVIEW_MAX_FPS, width=PREVIEW_WIDTH, quality=PREVIEW_JPEG_QUALITY):
+        self.placeholder = placeholder
+        self.interval = 1.0 / max_fps if max_fps else 0.0
+        self.width = width
+        self.quality = quality
+        self._next_time = 0.0
+        self.rendered = 0
+        self.skipped = 0
+        self.bytes_sent = 0
+        self.render_ms = 0.0
+
+    def encode(self, frame):
+        """Downscale to the preview width and JPEG-encode once"""
+        height, width = frame.shape[:2]
+        if self.width and width > self.width:
+            frame = cv2.resize(frame, (self.width, int(height * self.width / width)), interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return jpeg.tobytes() if ok else None
+
+    def show(self, frame, force=False):
+        """Render a BGR frame unless it is too soon; returns True if it was sent"""
+        now = time.monotonic()
+        if not force and now < self._next_time:
+            self.skipped += 1
+            return False
+        start = time.perf_counter()
+        jpeg = self.encode(frame)
+        if jpeg is None:
+            return False
+        self.placeholder.image(jpeg, use_container_width=True)
+        elapsed = time.perf_counter() - start
+        self._next_time = now + max(self.interval, elapsed)
+        self.rendered += 1
+        self.bytes_sent += len(jpeg)
+        self.render_ms += elapsed * 1000
+        return True
+
+    def stats(self):
+        return {
+            "rendered": self.rendered,
+            "skipped": self.skipped,
+            "avg_kb": self.bytes_sent / self.rendered / 1024 if self.rendered else 0.0,
+            "avg_ms": self.render_ms / self.rendered if self.rendered else 0.0,
+        }
@@ -0,0 +1,320 @@
+"""Headless multi-camera face recognition service
+
+Each camera is read by its own CameraStream. Detection and encoding run in a
+shared process pool so dlib uses every core despite the GIL, and matching runs
+against the shared GalleryCache in the parent process. Every camera publishes
+its results on its own stream for loggers, alert handlers and the Streamlit UI.
+
+Usage: python recognition_service.py --source front=0 --source lobby=lobby.mp4 --workers 4
+"""
+import os
+import time
+import queue
+import argparse
+import datetime
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+import face_recognition
+from access_log import open_log
+from alert_engine import AlertEngine
+from camera_stream import CameraStream
+from config import FACE_STORE_DIR, INDEX_FILE, EVENT_DB_FILE
+from batch_encoder import BatchEncoder, align_faces
+from face_detectors import make_detector
+from face_gallery import UNKNOWN_NAME
+from gallery_cache import GalleryCache
+import metrics
+
+# Service Configuration
+RESULT_BUFFER_SIZE = 100  # Results kept per subscriber, oldest dropped first
+
+_worker_detector = None
+_log_alerts = AlertEngine()
+
+
+def _init_worker(detector, downscale, confidence):
+    """Load the detector once per worker process"""
+    global _worker_detector
+    _worker_detector = make_detector(detector, downscale=downscale, confidence=confidence)
+
+
+def detect_and_encode(rgb_frame):
+    """Worker task: return (face_locations, encodings) for one RGB frame"""
+    locations = _worker_detector.detect(rgb_frame)
+    encodings = face_recognition.face_encodings(rgb_frame, locations) if locations else []
+    return locations, [np.asarray(e, dtype=np.float32) for e in encodings]
+
+
+def detect_and_align(rgb_frame):
+    """Worker task: return (face_locations, aligned chips) for the shared batch encoder"""
+    locations = _worker_detector.detect(rgb_frame)
+    return locations, align_faces(rgb_frame, locations)
+
+
+class ServiceFrames:
+    """CameraStream-compatible reader over one camera's results, for callers that need raw frames"""
+
+    def __init__(self, service, camera, timeout=2.0):
+        self.service = service
+        self.camera = camera
+        self.timeout = timeout
+        self.frames_read = 0
+        self._subscription = service.subscribe(camera)
+
+    def isOpened(self):
+        return self._subscription is not None
+
+    def read(self):
+        """cv2.VideoCapture-compatible (ok, frame), a private copy of the shared frame"""
+        if self._subscription is None:
+            return False, None
+        try:
+            result = self._subscription.get(timeout=self.timeout)
+        except queue.Empty:
+            return False, None
+        self.frames_read += 1
+        return True, result["frame"].copy()
+
+    def release(self):
+        if self._subscription is not None:
+            self.service.unsubscribe(self.camera, self._subscription)
+            self._subscription = None
+
+    def stats(self):
+        # Frames the camera thread dropped are counted by the service, not this reader
+        return {"source": f"service:{self.camera}", "read": self.frames_read,
+                "delivered": self.frames_read, "dropped": 0}
+
+
+class RecognitionService:
+    """Consumes N camera/video sources and publishes per-camera recognition results"""
+
+    def __init__(self, sources, gallery_cache, workers=None, detector="hog", downscale=0.5,
+                 confidence=0.5, tolerance=0.5, realtime=True, encoder_batch_size=1, encoder_max_wait_ms=20):
+        self.sources = dict(sources)
+        self.gallery_cache = gallery_cache
+        self.workers = workers or os.cpu_count() or 1
+        self.detector = detector
+        self.downscale = downscale
+        self.confidence = confidence
+        self.tolerance = tolerance
+        self.realtime = realtime
+        # batch size 1 encodes inside the workers; larger batches share one encoder across cameras
+        self.encoder = (BatchEncoder(encoder_batch_size, encoder_max_wait_ms)
+                        if encoder_batch_size > 1 else None)
+        self._pool = None
+        self._threads = []
+        self._streams = {}
+        self._subscribers = {camera: [] for camera in self.sources}
+        self._listeners = []
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._running = False
+        self.counters = {camera: {"frames": 0, "faces": 0, "matches": 0, "errors": 0}
+                         for camera in self.sources}
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                         initargs=(self.detector, self.downscale, self.confidence))
+        if self.encoder is not None:
+            self.encoder.start()
+        for camera, source in self.sources.items():
+            stream = CameraStream(source, realtime=self.realtime).start()
+            self._streams[camera] = stream
+            thread = threading.Thread(target=self._run_camera, args=(camera, stream),
+                                      name=f"recognition-{camera}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._running = False
+        for stream in self._streams.values():
+            stream.release()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        if self.encoder is not None:
+            self.encoder.stop()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._threads = []
+        self._streams = {}
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def subscribe(self, camera, maxsize=RESULT_BUFFER_SIZE):
+        """Return a new queue receiving every result from one camera"""
+        subscription = queue.Queue(maxsize=maxsize)
+        with self._lock:
+            self._subscribers[camera].append(subscription)
+        return subscription
+
+    def open_frames(self, camera):
+        """CameraStream-like reader of one camera's frames, so the service stays the camera's only owner"""
+        return ServiceFrames(self, camera)
+
+    def unsubscribe(self, camera, subscription):
+        with self._lock:
+            if subscription in self._subscribers[camera]:
+                self._subscribers[camera].remove(subscription)
+
+    def add_listener(self, callback):
+        """callback(result) runs on the camera thread for every result, e.g. logging or alerts"""
+        self._listeners.append(callback)
+
+    def latest(self, camera):
+        return self._latest.get(camera)
+
+    def _publish(self, camera, result):
+        self._latest[camera] = result
+        with self._lock:
+            subscribers = list(self._subscribers[camera])
+        for subscription in subscribers:
+            while True:
+                try:
+                    subscription.put_nowait(result)
+                    break
+                except queue.Full:
+                    try:
+                        subscription.get_nowait()  # Drop the oldest result for slow consumers
+                    except queue.Empty:
+                        pass
+        with metrics.timer("log"):
+            for callback in self._listeners:
+                try:
+                    callback(result)
+                except Exception:
+                    self.counters[camera]["errors"] += 1
+
+    def _run_camera(self, camera, stream):
+        counters = self.counters[camera]
+        while self._running:
+            with metrics.timer("capture"):
+                ok, frame, timestamp = stream.read_frame(timeout=1.0)
+            if not ok:
+                if stream.ended:
+                    break
+                continue
+            with metrics.timer("convert"):
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            try:
+                if self.encoder is not None:
+                    with metrics.timer("detect"):
+                        locations, chips = self._pool.submit(detect_and_align, rgb_frame).result()
+                    with metrics.timer("encode"):
+                        encodings = list(self.encoder.encode(chips))
+                else:
+                    with metrics.timer("detect_encode"):
+                        locations, encodings = self._pool.submit(detect_and_encode, rgb_frame).result()
+                with metrics.timer("match"):
+                    matches = self.gallery_cache.match(encodings, tolerance=self.tolerance) if encodings else []
+            except Exception:
+                counters["errors"] += 1
+                if not self._running:
+                    break
+                time.sleep(0.1)  # Don't spin if the worker pool is broken
+                continue
+            counters["frames"] += 1
+            counters["faces"] += len(locations)
+            matched = sum(1 for name, _ in matches if name != UNKNOWN_NAME)
+            counters["matches"] += matched
+            metrics.count("frames")
+            metrics.count("faces", len(locations))
+            metrics.count("matches", matched)
+            metrics.count("unknown_faces", len(matches) - matched)
+            self._publish(camera, {
+                "camera": camera,
+                "timestamp": timestamp,
+                "latency_ms": (time.time() - timestamp) * 1000,
+                "frame": frame,
+                "faces": [{"location": location, "name": name, "distance": distance,
+                           "encoding": encoding}
+                          for location, (name, distance), encoding in zip(locations, matches, encodings)],
+            })
+        stream.release()
+        metrics.count("dropped_frames", stream.stats()["dropped"])
+
+    def stats(self):
+        stats = {camera: dict(counters, **self._streams[camera].stats()) if camera in self._streams
+                 else dict(counters) for camera, counters in self.counters.items()}
+        if self.encoder is not None:
+            stats["encoder"] = self.encoder.stats()
+        return stats
+
+
+def log_result(result):
+    """Queue recognized / unknown faces for the event store, as the app logs them
+
+    Unknown faces are logged once per intruder alert rather than once per frame.
+    """
+    timestamp = datetime.datetime.fromtimestamp(result["timestamp"]).strftime("%Y-%m-%d %H:%M:%S")
+    writer = open_log(EVENT_DB_FILE)
+    for face in result["faces"]:
+        if face["name"] == UNKNOWN_NAME:
+            _, is_new = _log_alerts.raise_alert("intruder", "Unknown face detected", "critical",
+                                                camera=result["camera"])
+            if is_new:
+                writer.write((timestamp, "Security Alert", "System",
+                              f"Unauthorized face detected ({result['camera']})"))
+        else:
+            writer.write((timestamp, "Access", face["name"], f"Face recognized ({result['camera']})"))
+
+
+def print_result(result):
+    if result["faces"]:
+        print(f"[{result['camera']}] " + ", ".join(
+            f"{face['name']} ({face['distance']:.2f})" for face in result["faces"]))
+
+
+def parse_sources(values):
+    sources = {}
+    for i, value in enumerate(values):
+        name, _, source = value.rpartition("=")
+        sources[name or f"camera{i}"] = int(source) if source.isdigit() else source
+    return sources
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless multi-camera face recognition service")
+    parser.add_argument("--source", action="append", default=[],
+                        help="name=camera index, video file or image folder (repeatable)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--detector", default="hog")
+    parser.add_argument("--downscale", type=float, default=0.5)
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Encode faces from all cameras in batches of this size (1 = per frame)")
+    parser.add_argument("--max-wait-ms", type=float, default=20,
+                        help="Longest a face waits for its encoding batch to fill")
+    parser.add_argument("--no-log", action="store_true", help="Don't write results to the event store")
+    args = parser.parse_args()
+
+    service = RecognitionService(parse_sources(args.source or ["camera0=0"]),
+                                 GalleryCache(FACE_STORE_DIR, INDEX_FILE),
+                                 workers=args.workers, detector=args.detector,
+                                 downscale=args.downscale, tolerance=args.tolerance,
+                                 encoder_batch_size=args.batch_size, encoder_max_wait_ms=args.max_wait_ms)
+    if not args.no_log:
+        service.add_listener(log_result)
+    service.add_listener(print_result)
+    service.start()
+    try:
+        while service.running:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        for camera, stats in service.stats().items():
+            print(camera, stats)
+
+
+if __name__ == "__main__":
+    main()
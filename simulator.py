@@ -0,0 +1,479 @@
+"""Replays an event script through the access-control flow, headless and on a virtual clock
+
+A script is a timeline of door arrivals, intruders, PIN and RFID attempts,
+power outages and camera faults. Each event runs through the same
+AccessController the Streamlit app uses: sequential face decisions, liveness,
+intruder incidents, alert coalescing and rate limits, battery depletion, and
+the background writer into an event store. Arrivals with a "video" replay a
+recorded clip or image folder through detection, the quality gate, encoding and
+matching. Arrivals without one feed synthetic encodings of an enrolled user, so
+hours of traffic need no camera and no face models.
+
+The clock only advances as the simulation does: a frame costs its frame interval,
+or its processing time if that is longer, and the gaps between events are
+skipped. A day of traffic replays in seconds, and the report gives throughput,
+decision latency, queueing at the door and alert counts for capacity planning.
+
+Script format: JSON lines, or a JSON array, of {"at": seconds, "type": ..., ...}
+    {"at": 0, "type": "arrival", "user": "alice"}
+    {"at": 12, "type": "arrival", "video": "fixtures/alice.mp4", "user": "alice"}
+    {"at": 30, "type": "intruder", "person": 1}
+    {"at": 45, "type": "pin", "pin": "000000"}
+    {"at": 50, "type": "rfid", "card": "card1"}
+    {"at": 60, "type": "power_outage"}
+    {"at": 600, "type": "restore_power"}
+
+Usage: python simulator.py --script site.jsonl [--store face_store] [--output report.json]
+       python simulator.py --generate --hours 24 --arrivals-per-hour 60 --intruders-per-hour 2 --outages 1
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from collections import Counter
+import cv2
+import numpy as np
+import metrics
+from access_control import AccessController, FALLBACK_PIN, RFID_DATABASE, recognize_frame
+from access_log import AsyncLogWriter
+from alert_engine import AlertEngine
+from benchmark_index import synthetic_gallery
+from camera_stream import open_capture
+from event_store import EventStore
+from face_gallery import FaceGallery, UNKNOWN_NAME
+from face_index import INDEX_BACKENDS, make_index
+from face_store import FaceStore
+from metrics import latency_summary
+
+# Simulator Configuration
+SIMULATED_FPS = 15.0  # Frame rate of synthetic arrivals, and of videos that don't report one
+SYNTHETIC_NOISE = 0.02  # Per-frame encoding noise of a synthetic face (same person, new capture)
+SYNTHETIC_FRAME = (240, 320)  # Height, width of the blank frame synthetic faces are placed on
+SYNTHETIC_FACE = (60, 220, 180, 100)  # Box of a synthetic face
+DEFAULT_CAMERA = "front_door"
+ALERT_HISTORY = 100000  # Alerts kept, large enough that the report counts every one
+WRONG_PIN = "000000"
+UNKNOWN_CARD = "card0"
+EVENT_TYPES = {
+    "arrival": "Enrolled user at the door: replays \"video\", or synthetic frames of \"user\"",
+    "intruder": "Stranger at the door: replays \"video\", or synthetic frames of stranger \"person\"",
+    "pin": "Fallback PIN attempt with \"pin\"",
+    "rfid": "RFID attempt with \"card\"",
+    "appliance": "Switch appliance \"name\" to \"state\"",
+    "power_outage": "Mains power fails, battery backup takes over",
+    "restore_power": "Mains power returns",
+    "camera_failure": "Camera fault (the third in a row self-heals)",
+    "self_heal": "Manual self-healing",
+}
+
+
+class VirtualClock:
+    """Wall-clock time that only moves when the simulator advances it
+
+    speed > 0 paces the run, sleeping 1/speed real seconds per simulated second
+    (1 = real time); 0 runs as fast as the work allows.
+    """
+
+    def __init__(self, start=None, speed=0.0):
+        self.now = time.time() if start is None else start
+        self.speed = speed
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        if seconds > 0:
+            if self.speed:
+                time.sleep(seconds / self.speed)
+            self.now += seconds
+
+
+def load_script(path):
+    """Events from a JSON array or JSON lines file, sorted by time"""
+    with open(path) as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        events = json.loads(text)
+    else:
+        events = [json.loads(line) for line in text.splitlines() if line.strip()]
+    for event in events:
+        if event.get("type") not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type {event.get('type')!r} (expected one of {', '.join(EVENT_TYPES)})")
+    return sorted(events, key=lambda event: event.get("at", 0))
+
+
+def save_script(events, path):
+    with open(path, "w") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+
+def _poisson_times(rng, per_hour, seconds):
+    """Arrival times of a Poisson process over `seconds`"""
+    if per_hour <= 0:
+        return []
+    times, now = [], 0.0
+    while True:
+        now += rng.exponential(3600 / per_hour)
+        if now >= seconds:
+            return times
+        times.append(round(now, 3))
+
+
+def generate_script(users, hours=1.0, arrivals_per_hour=30, intruders_per_hour=1, pin_per_hour=2,
+                    rfid_per_hour=2, outages=0, outage_minutes=10, camera_failures_per_hour=0,
+                    bad_attempt_share=0.2, strangers=5, arrival_videos=(), intruder_videos=(), seed=0):
+    """Random site traffic: Poisson arrivals and attempts, with outages at random times
+
+    A share of PIN and RFID attempts use a wrong PIN or an unregistered card.
+    Intruders are drawn from `strangers` people, so repeat visits form one incident.
+    Arrivals and intruders take turns over the given videos, if any.
+    """
+    rng = np.random.default_rng(seed)
+    seconds = hours * 3600
+    events = []
+    for i, at in enumerate(_poisson_times(rng, arrivals_per_hour, seconds)):
+        event = {"at": at, "type": "arrival", "user": str(rng.choice(users))}
+        if arrival_videos:
+            event = {"at": at, "type": "arrival", "video": arrival_videos[i % len(arrival_videos)]}
+        events.append(event)
+    for i, at in enumerate(_poisson_times(rng, intruders_per_hour, seconds)):
+        event = {"at": at, "type": "intruder", "person": int(rng.integers(strangers))}
+        if intruder_videos:
+            event = {"at": at, "type": "intruder", "video": intruder_videos[i % len(intruder_videos)]}
+        events.append(event)
+    for at in _poisson_times(rng, pin_per_hour, seconds):
+        pin = WRONG_PIN if rng.random() < bad_attempt_share else FALLBACK_PIN
+        events.append({"at": at, "type": "pin", "pin": pin})
+    for at in _poisson_times(rng, rfid_per_hour, seconds):
+        card = UNKNOWN_CARD if rng.random() < bad_attempt_share else str(rng.choice(list(RFID_DATABASE)))
+        events.append({"at": at, "type": "rfid", "card": card})
+    for at in _poisson_times(rng, camera_failures_per_hour, seconds):
+        events.append({"at": at, "type": "camera_failure"})
+    for at in np.sort(rng.uniform(0, seconds, outages)):
+        events.append({"at": round(float(at), 3), "type": "power_outage"})
+        events.append({"at": round(float(at) + outage_minutes * 60, 3), "type": "restore_power"})
+    return sorted(events, key=lambda event: event["at"])
+
+
+def synthetic_people(count, seed=0):
+    """{name: encoding} for `count` synthetic enrolled users"""
+    return {f"user{i}": row for i, row in enumerate(synthetic_gallery(count, seed=seed))}
+
+
+def store_people(directory):
+    """{name: first enrolled encoding} from a face store"""
+    store = FaceStore(directory)
+    people = {}
+    for name, row in zip(store.names, store.embeddings):
+        people.setdefault(name, np.array(row, dtype=np.float32))
+    return store, people
+
+
+class Simulator:
+    """Runs events through one AccessController on a VirtualClock and collects the report"""
+
+    def __init__(self, gallery, people, writer, clock, camera=DEFAULT_CAMERA, liveness=True,
+                 fps=SIMULATED_FPS, detector="hog", seed=0):
+        self.gallery = gallery
+        self.people = people
+        self.writer = writer
+        self.clock = clock
+        self.camera = camera
+        self.liveness = liveness
+        self.fps = fps
+        self.detector_backend = detector
+        self.rng = np.random.default_rng(seed)
+        self.notified = Counter()
+        self.controller = AccessController(writer, alerts=AlertEngine(history_size=ALERT_HISTORY, clock=clock),
+                                           clock=clock, notify=self._notify)
+        self._detector = None
+        self.events = Counter()
+        self.outcomes = Counter()
+        self.errors = Counter()
+        self.frames = 0
+        self.decision_ms = []  # Simulated time from the first frame to the decision
+        self.wait_ms = []  # Simulated time an arrival waited for the door to be free
+        self.compute_ms = []  # Real processing time per attempt
+        self.depletions = 0
+
+    def _notify(self, message, level):
+        self.notified[level] += 1
+
+    def _advance_to(self, when):
+        """Move the clock to `when`, depleting the battery on the way if it runs out first"""
+        depletion = self.controller.status["battery_depletion_time"]
+        if self.controller.status["battery_backup"] and depletion and depletion <= when:
+            self.clock.advance(depletion - self.clock())
+            self._check_battery()
+        self.clock.advance(when - self.clock())
+
+    def _check_battery(self):
+        if self.controller.check_battery():
+            self.depletions += 1
+
+    def run(self, events):
+        start = self.clock()
+        for event in events:
+            self._advance_to(start + event.get("at", 0))
+            self._check_battery()
+            self.events[event["type"]] += 1
+            scheduled = start + event.get("at", 0)
+            getattr(self, "_" + event["type"])(event, scheduled)
+        self._check_battery()
+
+    # Face arrivals
+    def _arrival(self, event, scheduled):
+        self._authenticate(event, scheduled)
+
+    def _intruder(self, event, scheduled):
+        self._authenticate(event, scheduled)
+
+    def _authenticate(self, event, scheduled):
+        video = event.get("video")
+        frames = self._video_frames(video) if video else self._synthetic_frames(event)
+        self.wait_ms.append((self.clock() - scheduled) * 1000)
+        attempt = self.controller.start_authentication(event.get("camera", self.camera),
+                                                       liveness=self.liveness and video is not None)
+        started, compute = self.clock(), 0.0
+        try:
+            while True:
+                tick = time.perf_counter()
+                item = next(frames, None)
+                if item is None:
+                    break
+                frame, faces, interval = item
+                done = attempt.process(frame, faces)
+                elapsed = time.perf_counter() - tick
+                compute += elapsed
+                self.frames += 1
+                # A camera delivers the next frame once the last one is processed, and no sooner
+                self.clock.advance(max(interval, elapsed))
+                if done:
+                    break
+        finally:
+            frames.close()
+        result = attempt.finish()
+        self.decision_ms.append((self.clock() - started) * 1000)
+        self.compute_ms.append(compute * 1000)
+        self.outcomes[result["outcome"]] += 1
+        if event["type"] == "intruder" and result["outcome"] == "granted":
+            self.errors["intruder_granted"] += 1
+        elif event["type"] == "arrival" and result["outcome"] != "granted":
+            self.errors["user_denied"] += 1
+        elif event.get("user") and result["name"] != event["user"]:
+            self.errors["wrong_user"] += 1
+
+    def _synthetic_frames(self, event):
+        """Noisy re-captures of one face; no pixels, so liveness is not checked"""
+        if event["type"] == "arrival":
+            name = event.get("user") or str(self.rng.choice(list(self.people)))
+            if name not in self.people:
+                raise ValueError(f"Arrival of {name!r}, who is not enrolled")
+            base = self.people[name]
+        else:
+            base = synthetic_gallery(1, seed=1000000 + int(event.get("person", self.rng.integers(1 << 30))))[0]
+        frame = np.zeros(SYNTHETIC_FRAME + (3,), dtype=np.uint8)
+        for _ in range(int(event.get("frames", 1000))):
+            encoding = base + self.rng.normal(0, SYNTHETIC_NOISE, base.shape).astype(np.float32)
+            with metrics.timer("match"):
+                (name, distance), = self.gallery.match([encoding])
+            metrics.count("frames")
+            metrics.count("faces")
+            metrics.count("matches" if name != UNKNOWN_NAME else "unknown_faces")
+            yield frame, [{"location": SYNTHETIC_FACE, "name": name, "distance": distance,
+                           "encoding": encoding, "landmarks": None}], 1 / self.fps
+
+    def _video_frames(self, path):
+        """A recording replayed through tracking, the quality gate, encoding and matching"""
+        # Imported here: only video arrivals need the face models
+        from face_detectors import make_detector
+        from face_tracking import FaceTracker
+        from face_quality import QualityGate
+        if self._detector is None:
+            self._detector = make_detector(self.detector_backend)
+        capture = open_capture(path)
+        if not capture.isOpened():
+            self.controller.log_event("System Error", f"Camera access failed: cannot open {path}")
+            self.controller.camera_failure()
+            return
+        interval = 1 / (capture.get(cv2.CAP_PROP_FPS) or self.fps)
+        tracker = FaceTracker(self._detector)
+        gate = QualityGate(landmark_model="large" if self.liveness else "small")
+        try:
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                yield frame, recognize_frame(rgb_frame, tracker, gate, self.gallery), interval
+        finally:
+            capture.release()
+
+    # Everything else
+    def _pin(self, event, scheduled):
+        self.outcomes["pin_granted" if self.controller.pin_attempt(event.get("pin", "")) else "pin_denied"] += 1
+
+    def _rfid(self, event, scheduled):
+        self.outcomes["rfid_granted" if self.controller.rfid_attempt(event.get("card")) else "rfid_denied"] += 1
+
+    def _appliance(self, event, scheduled):
+        if not self.controller.control(event["name"], event.get("state", True)):
+            self.outcomes["appliance_refused"] += 1
+
+    def _power_outage(self, event, scheduled):
+        self.controller.power_outage()
+
+    def _restore_power(self, event, scheduled):
+        self.controller.restore_power()
+
+    def _camera_failure(self, event, scheduled):
+        self.controller.camera_failure()
+
+    def _self_heal(self, event, scheduled):
+        self.controller.self_heal()
+
+    def report(self, simulated_s, wall_s):
+        alerts = Counter()
+        occurrences = Counter()
+        for alert in self.controller.alerts.history():
+            alerts[alert["type"]] += 1
+            occurrences[alert["type"]] += alert["count"]
+        attempts = len(self.decision_ms)
+        stages = metrics.REGISTRY.snapshot()["stages"]
+        return {
+            "simulated_s": simulated_s,
+            "wall_s": wall_s,
+            "speedup": simulated_s / wall_s if wall_s else None,
+            "events": dict(self.events),
+            "throughput": {
+                "events_per_s": sum(self.events.values()) / wall_s if wall_s else None,
+                "attempts_per_s": attempts / wall_s if wall_s else None,
+                "frames_per_s": self.frames / wall_s if wall_s else None,
+            },
+            "frames": self.frames,
+            "decision_ms": latency_summary(self.decision_ms),
+            "door_wait_ms": latency_summary(self.wait_ms),
+            "compute_ms": latency_summary(self.compute_ms),
+            "outcomes": dict(self.outcomes),
+            "errors": dict(self.errors),
+            "alerts": {
+                "by_type": dict(alerts),
+                "occurrences": dict(occurrences),
+                "suppressed_by_type": dict(self.controller.alerts.suppressed),
+                "notified": dict(self.notified),
+                **self.controller.alerts.stats(),
+            },
+            "incidents": self.controller.unknown_faces.stats(),
+            "battery_depletions": self.depletions,
+            "status": {key: value for key, value in self.controller.status.items()},
+            "log": self.writer.stats(),
+            "stages": {stage: stats for stage, stats in stages.items() if "p50" in stats},
+        }
+
+
+def print_report(report):
+    print(f"Simulated {report['simulated_s'] / 3600:.2f} h in {report['wall_s']:.1f} s "
+          f"({report['speedup']:.0f}x real time)" if report["speedup"] else "Nothing simulated")
+    print("Events: " + ", ".join(f"{kind} {count}" for kind, count in sorted(report["events"].items())))
+    throughput = report["throughput"]
+    if throughput["events_per_s"]:
+        print(f"Throughput: {throughput['events_per_s']:.1f} events/s, {throughput['attempts_per_s']:.1f} "
+              f"face attempts/s, {throughput['frames_per_s']:.1f} frames/s")
+    for label, key in (("Decision latency", "decision_ms"), ("Door wait", "door_wait_ms"),
+                       ("Compute per attempt", "compute_ms")):
+        stats = report[key]
+        if stats["count"]:
+            print(f"{label + ':':<21}p50 {stats['p50']:8.1f} ms  p95 {stats['p95']:8.1f} ms  "
+                  f"p99 {stats['p99']:8.1f} ms")
+    print("Outcomes: " + ", ".join(f"{kind} {count}" for kind, count in sorted(report["outcomes"].items())))
+    if report["errors"]:
+        print("Errors: " + ", ".join(f"{kind} {count}" for kind, count in sorted(report["errors"].items())))
+    alerts = report["alerts"]
+    print(f"Alerts: {alerts['alerts']} raised as new, {alerts['coalesced']} coalesced, "
+          f"{alerts['suppressed']} rate-limited")
+    for alert_type, count in sorted(alerts["by_type"].items(), key=lambda item: -item[1]):
+        print(f"  {count:6d} x {alert_type} ({alerts['occurrences'][alert_type]} occurrences)")
+    print(f"Intruder incidents: {report['incidents']['incidents']}, battery depletions: "
+          f"{report['battery_depletions']}")
+    log = report["log"]
+    print(f"Logged {log['written']} events in {log['batches']} batches, {log['dropped']} dropped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay an event script through the access-control flow")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--script", help="JSON lines or JSON array of events")
+    source.add_argument("--generate", action="store_true", help="Generate random traffic instead")
+    parser.add_argument("--hours", type=float, default=1.0)
+    parser.add_argument("--arrivals-per-hour", type=float, default=30)
+    parser.add_argument("--intruders-per-hour", type=float, default=1)
+    parser.add_argument("--pin-per-hour", type=float, default=2)
+    parser.add_argument("--rfid-per-hour", type=float, default=2)
+    parser.add_argument("--camera-failures-per-hour", type=float, default=0)
+    parser.add_argument("--outages", type=int, default=0)
+    parser.add_argument("--outage-minutes", type=float, default=10)
+    parser.add_argument("--arrival-video", action="append", default=[], help="Clip generated arrivals replay")
+    parser.add_argument("--intruder-video", action="append", default=[], help="Clip generated intruders replay")
+    parser.add_argument("--save-script", help="Write the generated script here")
+    parser.add_argument("--store", help="Face store to match against (default: synthetic users)")
+    parser.add_argument("--users", type=int, default=20, help="Synthetic enrolled users without --store")
+    parser.add_argument("--index-backend", default="brute", choices=sorted(INDEX_BACKENDS))
+    parser.add_argument("--detector", default="hog")
+    parser.add_argument("--fps", type=float, default=SIMULATED_FPS)
+    parser.add_argument("--no-liveness", action="store_true")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="Simulated seconds per real second (0 = as fast as possible)")
+    parser.add_argument("--events", help="Event store to write to (default: a temporary one)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    if args.store:
+        store, people = store_people(args.store)
+        gallery = FaceGallery.from_store(store, index=make_index(args.index_backend))
+    else:
+        people = synthetic_people(args.users, seed=args.seed)
+        gallery = FaceGallery(capacity=len(people), index=make_index(args.index_backend))
+        gallery.add_many(list(people), np.array(list(people.values())))
+    if not people:
+        print("No enrolled users to simulate")
+        return 1
+
+    if args.script:
+        events = load_script(args.script)
+    else:
+        events = generate_script(list(people), args.hours, args.arrivals_per_hour, args.intruders_per_hour,
+                                 args.pin_per_hour, args.rfid_per_hour, args.outages, args.outage_minutes,
+                                 args.camera_failures_per_hour, arrival_videos=args.arrival_video,
+                                 intruder_videos=args.intruder_video, seed=args.seed)
+        if args.save_script:
+            save_script(events, args.save_script)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = AsyncLogWriter(EventStore(args.events or os.path.join(tmp, "events.db")))
+        clock = VirtualClock(speed=args.speed)
+        simulator = Simulator(gallery, people, writer, clock, liveness=not args.no_liveness, fps=args.fps,
+                              detector=args.detector, seed=args.seed)
+        metrics.REGISTRY.reset()
+        started, wall_start = clock(), time.perf_counter()
+        try:
+            simulator.run(events)
+            writer.flush()
+        finally:
+            wall_s = time.perf_counter() - wall_start
+            writer.close()
+        report = simulator.report(clock() - started, wall_s)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import numpy as np
+from access_control import AccessController
+from alert_engine import AlertEngine
+from benchmark_index import synthetic_gallery
+
+ALICE = (40, 140, 140, 40)
+BOB = (20, 300, 220, 100)  # Larger, so the liveness candidate whenever present
+
+
+class ListWriter:
+    def __init__(self):
+        self.events = []
+
+    def write(self, event):
+        self.events.append(event)
+
+
+class LiveAt:
+    """Liveness stand-in that only ever sees a live face at one box"""
+
+    def __init__(self, location):
+        self.location = location
+
+    def reset(self):
+        pass
+
+    def update(self, frame, location, landmarks=None):
+        return ("live", "blink") if location == self.location else ("pending", None)
+
+
+class OneBlink:
+    """Liveness stand-in: the first face it is shown blinks, and the verdict lasts until reset"""
+
+    def __init__(self):
+        self.blinked = False
+        self.live = False
+
+    def reset(self):
+        self.live = False
+
+    def update(self, frame, location, landmarks=None):
+        if not self.blinked:
+            self.blinked = self.live = True
+        return ("live", "blink") if self.live else ("pending", None)
+
+
+def face(name, location, distance=0.3, track=None):
+    return {"location": location, "name": name, "distance": distance, "encoding": np.zeros(128, np.float32),
+            "landmarks": None, "track": track}
+
+
+def attempt_with(liveness, frames):
+    controller = AccessController(ListWriter())
+    attempt = controller.start_authentication("door", max_frames=len(frames))
+    attempt.liveness = liveness
+    for faces in frames:
+        if attempt.process(None, faces):
+            break
+    return attempt.finish(), controller
+
+
+def test_live_face_grants_its_own_identity():
+    result, controller = attempt_with(LiveAt(ALICE), [[face("alice", ALICE)]] * 5)
+    assert result["outcome"] == "granted" and result["name"] == "alice"
+    assert "successful: alice" in controller.writer.events[-1][3]
+
+
+def test_liveness_of_another_face_does_not_grant():
+    # Bob blinks, then a photo of alice is held up in the same place and wins the vote
+    frames = [[face("bob", BOB)]] * 2 + [[face("alice", BOB)]] * 6
+    result, _ = attempt_with(OneBlink(), frames)
+    assert result["outcome"] == "not_live"
+    assert result["name"] == "alice"
+
+
+def test_liveness_restarts_when_the_tracked_face_changes():
+    # A live alice blinks, then a different tracked face recognized as alice takes her place
+    frames = [[face("alice", ALICE, track=1)]] * 2 + [[face("alice", ALICE, track=2)]] * 6
+    result, _ = attempt_with(OneBlink(), frames)
+    assert result["outcome"] == "not_live"
+    result, _ = attempt_with(OneBlink(), [[face("alice", ALICE, track=1)]] * 8)
+    assert result["outcome"] == "granted"
+
+
+def test_every_new_intruder_is_logged_while_alerts_are_throttled():
+    controller = AccessController(ListWriter(), alerts=AlertEngine(rate_limits={"intruder": (1e-6, 1)}))
+    attempt = controller.start_authentication("door", max_frames=10)
+    strangers = synthetic_gallery(3, seed=7)
+    for encoding in [strangers[0], strangers[0], strangers[1], strangers[2]]:
+        attempt.process(None, [dict(face("Unknown", ALICE, distance=0.9), encoding=encoding)])
+    logged = [event[3] for event in controller.writer.events if event[1] == "Security Alert"]
+    assert len(logged) == 3 and len(set(logged)) == 3
+    assert controller.alerts.stats()["alerts"] == 1
+
+
+def test_pin_and_rfid_attempts_are_logged():
+    controller = AccessController(ListWriter())
+    assert controller.pin_attempt("123456")
+    assert not controller.pin_attempt("000000")
+    assert controller.rfid_attempt("card1") == "Admin"
+    assert controller.rfid_attempt("nope") is None
+    assert [event[1] for event in controller.writer.events] == ["Access", "Security Alert", "Access",
+                                                                 "Security Alert"]
+    assert controller.alerts.stats()["alerts"] == 2
@@ -0,0 +1,55 @@
+import os
+import gzip
+import threading
+from access_log import AsyncLogWriter, CsvLogSink
+
+
+def test_rotations_within_one_second_keep_every_file(tmp_path):
+    path = str(tmp_path / "access_log.csv")
+    sink = CsvLogSink(path, max_bytes=1, rotate_daily=False, backups=0)
+    for i in range(5):
+        sink.write_batch([("2026-01-01 00:00:00", "Event", "alice", str(i))])
+    backups = sorted(name for name in os.listdir(str(tmp_path)) if name.endswith(".gz"))
+    assert len(backups) == 4
+    details = [gzip.open(str(tmp_path / name), "rt").read().splitlines()[1].split(",")[-1] for name in backups]
+    assert details == ["0", "1", "2", "3"]
+
+
+def test_pruning_only_removes_rotated_backups(tmp_path):
+    path = str(tmp_path / "access_log.csv")
+    others = ["access_log.csv.bak", "access_log.csv.imported", "access_log.old.csv", "access_log.20260101.csv"]
+    for name in others:
+        (tmp_path / name).write_text("keep")
+    sink = CsvLogSink(path, max_bytes=1, rotate_daily=False, backups=2)
+    for i in range(5):
+        sink.write_batch([("2026-01-01 00:00:00", "Event", "alice", str(i))])
+    names = set(os.listdir(str(tmp_path)))
+    assert set(others) <= names
+    backups = sorted(name for name in names if name.endswith(".gz"))
+    assert len(backups) == 2
+    details = [gzip.open(str(tmp_path / name), "rt").read().splitlines()[1].split(",")[-1] for name in backups]
+    assert details == ["2", "3"]
+
+
+class StuckSink:
+    def __init__(self):
+        self.release = threading.Event()
+        self.closed = False
+
+    def write_batch(self, events):
+        self.release.wait()
+
+    def close(self):
+        self.closed = True
+
+
+def test_close_gives_up_on_a_stuck_full_queue():
+    sink = StuckSink()
+    writer = AsyncLogWriter(sink, queue_size=2, batch_size=1)
+    for i in range(5):
+        writer.write(("ts", "Event", "user", str(i)))
+    done = threading.Event()
+    threading.Thread(target=lambda: (writer.close(timeout=0.2), done.set()), daemon=True).start()
+    assert done.wait(2.0)
+    assert not sink.closed
+    sink.release.set()
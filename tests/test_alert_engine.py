@@ -0,0 +1,56 @@
+from alert_engine import AlertEngine, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_allows_a_burst_then_refills_at_rate():
+    bucket = TokenBucket(rate=0.5, burst=2, now=0.0)
+    assert bucket.take(0.0) and bucket.take(0.0)
+    assert not bucket.take(0.0)
+    assert not bucket.take(1.0)  # Half a token back
+    assert bucket.take(2.0)
+    assert bucket.take(100.0) and bucket.take(100.0)
+    assert not bucket.take(100.0)  # Refill is capped at the burst
+
+
+def test_repeats_within_the_window_coalesce_into_one_alert():
+    clock = FakeClock()
+    engine = AlertEngine(window=60, clock=clock)
+    first, new = engine.raise_alert("intruder", "stranger", camera="front", track=1)
+    assert new
+    clock.now += 30
+    again, new = engine.raise_alert("intruder", "stranger again", camera="front", track=1)
+    assert again is first and not new
+    assert first["count"] == 2 and first["message"] == "stranger again"
+    clock.now += 61
+    _, new = engine.raise_alert("intruder", "stranger", camera="front", track=1)
+    assert new
+    assert engine.stats()["coalesced"] == 1
+
+
+def test_new_alerts_are_rate_limited_per_type():
+    clock = FakeClock()
+    engine = AlertEngine(rate_limits={"door": (1 / 10, 2)}, clock=clock)
+    raised = [engine.raise_alert("door", "forced", track=track)[0] for track in range(4)]
+    assert [alert is not None for alert in raised] == [True, True, False, False]
+    assert engine.suppressed == {"door": 2}
+    # Other types have their own bucket
+    assert engine.raise_alert("camera", "offline")[0] is not None
+    clock.now += 10
+    assert engine.raise_alert("door", "forced", track=9)[0] is not None
+
+
+def test_acknowledged_alerts_are_evicted_first():
+    engine = AlertEngine(history_size=2, default_rate_limit=(1, 10), clock=FakeClock())
+    first, _ = engine.raise_alert("a", "one")
+    second, _ = engine.raise_alert("b", "two")
+    engine.acknowledge(second["id"])
+    engine.raise_alert("c", "three")
+    assert [alert["type"] for alert in engine.history()] == ["a", "c"]
+    assert {alert["type"] for alert in engine.active()} == {"a", "c"}
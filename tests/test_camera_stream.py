@@ -0,0 +1,49 @@
+import threading
+import numpy as np
+import camera_stream
+from camera_stream import CameraStream
+
+
+class BlockingCapture:
+    """Delivers one frame, then blocks in read() until unblocked, like a stalled USB camera"""
+
+    def __init__(self):
+        self.unblock = threading.Event()
+        self.released = threading.Event()
+        self.reads = 0
+
+    def isOpened(self):
+        return not self.released.is_set()
+
+    def read(self):
+        assert not self.released.is_set(), "read() on a released capture"
+        self.reads += 1
+        if self.reads > 1:
+            self.unblock.wait()
+            return False, None
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def get(self, prop):
+        return 0.0
+
+    def release(self):
+        self.released.set()
+
+
+def test_release_leaves_a_blocked_capture_to_the_reader(monkeypatch):
+    capture = BlockingCapture()
+    monkeypatch.setattr(camera_stream, "open_capture", lambda source: capture)
+    stream = CameraStream(0).start()
+    ok, frame = stream.read()
+    assert ok and frame.shape == (4, 4, 3)
+    stream.release()
+    assert not capture.released.is_set()
+    capture.unblock.set()
+    assert capture.released.wait(2.0)
+
+
+def test_release_before_start_releases_the_capture(monkeypatch):
+    capture = BlockingCapture()
+    monkeypatch.setattr(camera_stream, "open_capture", lambda source: capture)
+    CameraStream(0).release()
+    assert capture.released.is_set()
@@ -0,0 +1,55 @@
+from decision import SequentialDecision, ACCEPT_VOTES, REJECT_VOTES
+from face_gallery import UNKNOWN_NAME
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_accepts_after_agreeing_frames():
+    decider = SequentialDecision(clock=FakeClock())
+    for _ in range(ACCEPT_VOTES - 1):
+        assert decider.update([("alice", 0.3)]) is None
+    decision = decider.update([("alice", 0.3)])
+    assert decision["outcome"] == "accept"
+    assert decision["name"] == "alice"
+    assert decision["votes"] == ACCEPT_VOTES
+
+
+def test_crowd_of_strangers_casts_one_vote_per_frame():
+    decider = SequentialDecision(clock=FakeClock())
+    crowd = [(UNKNOWN_NAME, 0.9)] * REJECT_VOTES
+    assert decider.update(crowd) is None
+    assert decider.stranger_votes == 1
+    for _ in range(REJECT_VOTES - 2):
+        assert decider.update(crowd) is None
+    assert decider.update(crowd)["outcome"] == "reject"
+
+
+def test_identity_seen_twice_in_a_frame_votes_once():
+    decider = SequentialDecision(clock=FakeClock())
+    decider.update([("alice", 0.4), ("alice", 0.2)])
+    assert decider.evidence == {"alice": [0.2]}
+
+
+def test_split_votes_are_not_accepted():
+    decider = SequentialDecision(clock=FakeClock(), max_frames=8)
+    decision = None
+    for _ in range(4):
+        decision = decider.update([("alice", 0.3), ("bob", 0.3)])
+    assert decision is None
+    for _ in range(4):
+        decision = decider.update([("alice", 0.3), ("bob", 0.3)])
+    assert decision["outcome"] == "timeout"
+
+
+def test_time_budget_ends_the_attempt():
+    clock = FakeClock()
+    decider = SequentialDecision(clock=clock, time_budget=6.0)
+    assert decider.update([]) is None
+    clock.now = 6.0
+    assert decider.update([])["outcome"] == "timeout"
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+from benchmark_index import synthetic_gallery
+from face_gallery import FaceGallery, UNKNOWN_NAME, select_diverse
+from face_index import make_index
+from face_store import FaceStore
+
+IDENTITIES = 40
+PER_IDENTITY = 5
+
+
+def multi_embedding_gallery(backend):
+    rng = np.random.default_rng(0)
+    centres = synthetic_gallery(IDENTITIES)
+    rows = np.repeat(centres, PER_IDENTITY, axis=0) + rng.normal(0, 0.01, (IDENTITIES * PER_IDENTITY, 128))
+    names = [f"user{i}" for i in range(IDENTITIES) for _ in range(PER_IDENTITY)]
+    gallery = FaceGallery(index=make_index(backend))
+    gallery.add_many(names, rows.astype(np.float32))
+    return gallery, centres
+
+
+@pytest.mark.parametrize("backend", ["brute", "ivf", "sq8", "fp16"])
+def test_multi_embedding_match(backend):
+    gallery, centres = multi_embedding_gallery(backend)
+    queries = centres + np.random.default_rng(1).normal(0, 0.01, centres.shape).astype(np.float32)
+    found = gallery.match(queries, tolerance=0.5)
+    assert [name for name, _ in found] == [f"user{i}" for i in range(IDENTITIES)]
+    stranger = synthetic_gallery(1, seed=99)
+    assert gallery.match(stranger, tolerance=0.5)[0][0] == UNKNOWN_NAME
+
+
+def test_multi_embedding_match_uses_the_configured_index():
+    gallery, centres = multi_embedding_gallery("ivf")
+    calls = []
+    search = gallery.index.search
+    gallery.index.search = lambda *args: calls.append(args[-1]) or search(*args)
+    gallery.match(centres[:3], tolerance=0.5)
+    assert calls
+
+
+@pytest.mark.parametrize("backend", ["brute", "ivf", "sq8", "pq"])
+def test_remove_compacts_the_index_in_place(backend):
+    gallery, centres = multi_embedding_gallery(backend)
+    gallery.index.reset = None
+    assert gallery.remove("user3") == PER_IDENTITY
+    assert len(gallery) == (IDENTITIES - 1) * PER_IDENTITY
+    queries = centres + np.random.default_rng(1).normal(0, 0.01, centres.shape).astype(np.float32)
+    found = [name for name, _ in gallery.match(queries, tolerance=0.5)]
+    assert found[3] == UNKNOWN_NAME
+    assert found[:3] + found[4:] == [f"user{i}" for i in range(IDENTITIES) if i != 3]
+
+
+def test_single_embedding_gallery_never_builds_centroids():
+    centres = synthetic_gallery(IDENTITIES)
+    gallery = FaceGallery()
+    gallery.add_many([f"user{i}" for i in range(IDENTITIES)], centres)
+    assert not gallery.multi_embedding
+    assert gallery.match(centres[:1], tolerance=0.5)[0][0] == "user0"
+    gallery.remove("user0")
+    assert gallery._centroid_sums is None
+
+
+def test_centroid_sums_follow_removes_and_adds_without_a_rebuild():
+    gallery, centres = multi_embedding_gallery("brute")
+    gallery.match(centres[:1], tolerance=0.5)
+    assert gallery._centroid_sums.dtype == np.float32
+    gallery._index_identities = None
+    gallery.remove("user3")
+    del gallery._index_identities
+    gallery.add_many(["user3", "newcomer"], centres[[3, 4]] + 0.01)
+    rebuilt = FaceGallery()
+    rebuilt.add_many(gallery.names, gallery.embeddings)
+    live, centroids, _ = gallery._centroid_matrix()
+    _, expected, _ = rebuilt._centroid_matrix()
+    by_name = dict(zip([gallery._identity_slots[i] for i in live], centroids))
+    for name, centroid in zip(rebuilt._identity_slots, expected):
+        np.testing.assert_allclose(by_name[name], centroid, atol=1e-5)
+    assert gallery.match(centres[3:5] + 0.01, tolerance=0.5)[1][0] == "newcomer"
+
+
+def test_select_diverse_prefers_quality_then_spread():
+    encodings = np.array([[0, 0], [0.01, 0], [1, 0], [0, 1]], dtype=np.float32)
+    chosen = select_diverse(encodings, [1.0, 0.9, 0.8, 0.2], 3)
+    assert chosen[0] == 0
+    assert 2 in chosen
+    assert 3 not in chosen  # Below half the best score
+
+
+def test_gallery_over_a_store_copies_before_writing(tmp_path):
+    store = FaceStore(str(tmp_path))
+    store.append_many(["alice", "bob"], synthetic_gallery(2))
+    gallery = FaceGallery.from_store(store)
+    gallery.add("carol", synthetic_gallery(1, seed=5)[0])
+    assert gallery.names == ["alice", "bob", "carol"]
+    np.testing.assert_array_equal(np.asarray(store.embeddings), synthetic_gallery(2))
+    assert gallery.match(synthetic_gallery(1, seed=5))[0][0] == "carol"
+
+
+def test_clear_then_add_on_a_store_backed_gallery(tmp_path):
+    store = FaceStore(str(tmp_path))
+    store.append_many(["alice"], synthetic_gallery(1))
+    gallery = FaceGallery.from_store(store)
+    gallery.clear()
+    gallery.add("bob", synthetic_gallery(1, seed=5)[0])
+    assert gallery.names == ["bob"]
+    assert gallery.match(synthetic_gallery(1, seed=5))[0][0] == "bob"
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from face_index import IVF_MIN_TRAIN_SIZE, hnswlib, load_index, make_index, save_index
+
+
+def rows(count, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, 128)).astype(np.float32)
+
+
+BACKENDS = ["brute", "ivf", "sq8", "fp16", "pq"] + (["hnsw"] if hnswlib is not None else [])
+
+
+def search(index, matrix, queries, k=1):
+    return index.search(matrix, np.einsum("ij,ij->i", matrix, matrix), queries, k)
+
+
+def recall_at_1(index, matrix, targets):
+    queries = matrix[targets] + np.random.default_rng(2).normal(0, 0.01, (len(targets), 128)).astype(np.float32)
+    found, _ = search(index, matrix, queries)
+    return float(np.mean(found[:, 0] == targets))
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_find_the_nearest_row(backend):
+    matrix = rows(2000)
+    index = make_index(backend)
+    index.reset(matrix)
+    assert recall_at_1(index, matrix, np.arange(0, 2000, 40)) >= 0.95
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_rows_added_after_training_are_searchable(backend):
+    matrix = rows(2000)
+    index = make_index(backend)
+    index.reset(matrix[:1500])
+    index.add(matrix, 1500)
+    assert recall_at_1(index, matrix, np.arange(1500, 2000, 10)) >= 0.95
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_removed_rows_are_dropped_without_retraining(backend):
+    matrix = rows(2000)
+    index = make_index(backend)
+    index.reset(matrix)
+    index.reset = index._train = index._fit = None
+    keep = np.ones(2000, dtype=bool)
+    keep[::3] = False
+    index.remove(keep)
+    remaining = matrix[keep]
+    assert recall_at_1(index, remaining, np.arange(0, len(remaining), 20)) >= 0.95
+    index.add(np.concatenate([remaining, matrix[:1]]), len(remaining))
+    found, _ = search(index, np.concatenate([remaining, matrix[:1]]), matrix[:1])
+    assert found[0, 0] == len(remaining)
+
+
+def test_distances_are_euclidean():
+    matrix = rows(10)
+    index = make_index("brute")
+    index.reset(matrix)
+    _, distances = search(index, matrix, matrix[:1] + 0.5, k=1)
+    assert distances[0, 0] == pytest.approx(np.sqrt(128 * 0.25), rel=1e-4)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_saved_index_round_trips(tmp_path, backend):
+    path = str(tmp_path / "index.npz")
+    matrix = rows(2000)
+    index = make_index(backend)
+    index.reset(matrix)
+    save_index(index, path, version=(3, 10, 1))
+    loaded = load_index(path, matrix, backend, version=(3, 10, 1))
+    targets = np.arange(0, 2000, 40)
+    assert recall_at_1(loaded, matrix, targets) == recall_at_1(index, matrix, targets)
+
+
+def test_persisted_index_is_reused_only_for_its_store_version(tmp_path):
+    path = str(tmp_path / "index.npz")
+    old, new = rows(IVF_MIN_TRAIN_SIZE + 100), rows(IVF_MIN_TRAIN_SIZE + 100, seed=1)
+    index = make_index("ivf")
+    index.reset(old)
+    save_index(index, path, version=(1, 500, 7))
+    same = load_index(path, old, "ivf", version=(1, 500, 7))
+    np.testing.assert_array_equal(same.assignments, index.assignments)
+    # Same row count, different rows: the saved partition assignments must not be reused
+    rebuilt = load_index(path, new, "ivf", version=(1, 900, 8))
+    fresh = make_index("ivf")
+    fresh.reset(new)
+    np.testing.assert_array_equal(rebuilt.assignments, fresh.assignments)
+
+
+def test_unversioned_index_is_rebuilt_when_a_version_is_expected(tmp_path):
+    path = str(tmp_path / "index.npz")
+    old, new = rows(IVF_MIN_TRAIN_SIZE + 100), rows(IVF_MIN_TRAIN_SIZE + 100, seed=1)
+    index = make_index("ivf")
+    index.reset(old)
+    save_index(index, path)
+    rebuilt = load_index(path, new, "ivf", version=(1, 900, 8))
+    fresh = make_index("ivf")
+    fresh.reset(new)
+    np.testing.assert_array_equal(rebuilt.assignments, fresh.assignments)
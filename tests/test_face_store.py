@@ -0,0 +1,91 @@
+import os
+import numpy as np
+import face_store
+from face_store import FaceStore
+
+
+def rows(count, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, 128)).astype(np.float32)
+
+
+def test_remove_tombstones_earlier_rows_only(tmp_path):
+    store = FaceStore(str(tmp_path))
+    first = rows(3)
+    store.append_many(["alice", "bob", "alice"], first)
+    assert store.remove("alice") == 2
+    again = rows(1, seed=1)
+    store.append("alice", again[0])
+    assert store.has_tombstones
+    assert store.names == ["bob", "alice"]
+    np.testing.assert_array_equal(store.embeddings, np.concatenate([first[1:2], again]))
+    reopened = FaceStore(str(tmp_path))
+    assert reopened.names == ["bob", "alice"]
+    assert len(reopened) == 2
+    assert store.remove("carol") == 0
+
+
+def test_compact_drops_tombstoned_rows(tmp_path):
+    store = FaceStore(str(tmp_path))
+    data = rows(3)
+    store.append_many(["alice", "bob", "carol"], data)
+    store.remove("bob")
+    store.compact()
+    assert not store.has_tombstones
+    assert store.names == ["alice", "carol"]
+    np.testing.assert_array_equal(store.embeddings, data[[0, 2]])
+    files = sorted(os.listdir(str(tmp_path)))
+    assert files == ["CURRENT", "embeddings-000001.f32", "names-000001.jsonl"]
+
+
+def test_torn_writes_are_repaired_on_open(tmp_path):
+    store = FaceStore(str(tmp_path))
+    store.append_many(["alice", "bob"], rows(2))
+    # Crash mid-append: half a row of data and half a sidecar record
+    with open(store._embeddings_path(store.generation), "ab") as f:
+        f.write(b"\0" * 100)
+    with open(store._names_path(store.generation), "ab") as f:
+        f.write(b'{"name": "car')
+    reopened = FaceStore(str(tmp_path))
+    assert reopened.names == ["alice", "bob"]
+    assert os.path.getsize(reopened._embeddings_path(reopened.generation)) == 2 * reopened.row_bytes
+    reopened.append("carol", rows(1, seed=1)[0])
+    assert FaceStore(str(tmp_path)).names == ["alice", "bob", "carol"]
+
+
+def test_clear_switches_to_an_empty_generation(tmp_path):
+    store = FaceStore(str(tmp_path))
+    store.append_many(["alice"], rows(1))
+    store.clear()
+    assert len(store) == 0 and store.embeddings.shape == (0, 128)
+    assert len(FaceStore(str(tmp_path))) == 0
+
+
+def test_enroll_batch_replaces_names_in_one_generation(tmp_path):
+    store = FaceStore(str(tmp_path))
+    store.append_many(["alice", "bob"], rows(2))
+    generation = store.generation
+    new = rows(2, seed=1)
+    store.enroll_batch(["alice", "carol"], new, [{"batch": "b1"}, {"batch": "b1"}], replace=["alice"])
+    assert store.generation == generation + 1
+    assert store.names == ["bob", "alice", "carol"]
+    np.testing.assert_array_equal(store.embeddings[1:], new)
+    reopened = FaceStore(str(tmp_path))
+    assert reopened.names == store.names
+    assert [m.get("batch") for m in reopened.metadata] == [None, "b1", "b1"]
+
+
+def test_enroll_batch_crash_before_switch_keeps_old_enrollment(tmp_path, monkeypatch):
+    store = FaceStore(str(tmp_path))
+    store.append_many(["alice", "bob"], rows(2))
+
+    def crash(path, text):
+        raise OSError("power lost")
+    monkeypatch.setattr(face_store, "_atomic_write_text", crash)
+    try:
+        store.enroll_batch(["alice"], rows(1, seed=1), replace=["alice", "bob"])
+    except OSError:
+        pass
+    reopened = FaceStore(str(tmp_path))
+    assert reopened.names == ["alice", "bob"]
+    assert not reopened.has_tombstones
+    assert os.path.exists(os.path.join(str(tmp_path), "CURRENT"))
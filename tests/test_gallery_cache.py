@@ -0,0 +1,65 @@
+import numpy as np
+from benchmark_index import synthetic_gallery
+from face_store import FaceStore
+from gallery_cache import GalleryCache
+
+
+def make_cache(tmp_path, *names):
+    store = FaceStore(str(tmp_path / "store"))
+    if names:
+        store.append_many(list(names), synthetic_gallery(len(names)))
+    return GalleryCache(str(tmp_path / "store"), str(tmp_path / "index.npz"))
+
+
+def test_clear_then_enroll(tmp_path):
+    cache = make_cache(tmp_path, "alice")
+    cache.get()
+    cache.clear()
+    bob = synthetic_gallery(1, seed=5)
+    cache.enroll("bob", bob)
+    store, gallery = cache.get()
+    assert gallery.names == ["bob"]
+    assert FaceStore(str(tmp_path / "store")).names == ["bob"]
+    assert cache.match(bob)[0][0] == "bob"
+
+
+def test_re_enroll_replaces_the_old_encodings(tmp_path):
+    cache = make_cache(tmp_path, "alice", "bob")
+    new = synthetic_gallery(2, seed=5)
+    cache.enroll("alice", new)
+    store, gallery = cache.get()
+    assert gallery.names == ["bob", "alice", "alice"]
+    assert store.names == gallery.names
+    np.testing.assert_array_equal(gallery.embeddings[1:], new)
+    assert cache.match(synthetic_gallery(1))[0][0] == "Unknown"
+    assert cache.match(new[:1])[0][0] == "alice"
+    # Adopted its own write without a reload
+    assert cache.misses == 1
+
+
+def test_reloads_after_another_process_writes(tmp_path):
+    cache = make_cache(tmp_path, "alice")
+    assert cache.get()[1].names == ["alice"]
+    assert cache.get()[1].names == ["alice"]
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Another process (the service, bulk_enroll or the API) enrolls through its own store
+    FaceStore(str(tmp_path / "store")).append("carol", synthetic_gallery(1, seed=7)[0])
+    assert cache.get()[1].names == ["alice", "carol"]
+    assert cache.misses == 2
+    assert cache.match(synthetic_gallery(1, seed=7))[0][0] == "carol"
+
+
+def test_stats_count_live_rows_without_copying(tmp_path):
+    store = FaceStore(str(tmp_path / "store"))
+    store.append_many(["alice", "bob", "carol"], synthetic_gallery(3))
+    store.remove("bob")
+    cache = GalleryCache(str(tmp_path / "store"), str(tmp_path / "index.npz"))
+    cache.get()
+    assert cache.stats()["store_mb"] == 2 * 128 * 4 / 1024 / 1024
+
+
+def test_stats_count_the_gallery_identity_tables(tmp_path):
+    cache = make_cache(tmp_path, "alice", "bob")
+    store, gallery = cache.get()
+    assert cache.stats()["index_mb"] * 1024 * 1024 == gallery.memory_bytes()
+    assert gallery.memory_bytes() >= gallery._sq_norms.nbytes + gallery._row_identity.nbytes
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from liveness import LivenessCheck, eye_aspect_ratio
+
+FRAME = np.full((240, 320, 3), 128, dtype=np.uint8)  # Smooth: no moire
+LOCATION = (80, 195, 170, 125)
+EYE_WIDTH = 16.0  # Pixels, as on a face just above the quality gate's minimum size
+
+
+def _eye(cx, ear):
+    half_height = ear * EYE_WIDTH / 2
+    w = EYE_WIDTH
+    return [(cx - w / 2, 0, 0), (cx - w / 6, -half_height, 0), (cx + w / 6, -half_height, 0),
+            (cx + w / 2, 0, 0), (cx + w / 6, half_height, 0), (cx - w / 6, half_height, 0)]
+
+
+def face_model(ear=0.3):
+    """3D landmarks (x, y, z) in pixels: eyes, brows and lips on a plane, the nose standing out"""
+    return {
+        "left_eye": _eye(-16, ear),
+        "right_eye": _eye(16, ear),
+        "left_eyebrow": [(x, -10, 0) for x in np.linspace(-26, -8, 5)],
+        "right_eyebrow": [(x, -10, 0) for x in np.linspace(8, 26, 5)],
+        "nose_bridge": [(0, y, z) for y, z in zip(np.linspace(2, 16, 4), np.linspace(4, 12, 4))],
+        "nose_tip": [(x, 20, 10) for x in np.linspace(-6, 6, 5)],
+        "top_lip": [(x, 30 - 2 * np.cos(x / 12), 0) for x in np.linspace(-14, 14, 12)],
+        "bottom_lip": [(x, 34 + 3 * np.cos(x / 12), 0) for x in np.linspace(-14, 14, 12)],
+    }
+
+
+def project(model, yaw=0.0, flat=False, noise=0.0, rng=None):
+    """Weak-perspective view of the model turned by `yaw` degrees; flat=True is a photo of it"""
+    angle = np.radians(yaw)
+    rotation = np.array([[np.cos(angle), 0, np.sin(angle)], [0, 1, 0], [-np.sin(angle), 0, np.cos(angle)]])
+    landmarks = {}
+    for feature, points in model.items():
+        points = np.array(points, dtype=np.float64)
+        if flat:
+            points[:, 2] = 0
+        xy = (points @ rotation.T)[:, :2] + (160, 125)
+        if noise:
+            xy += rng.normal(0, noise, xy.shape)
+        landmarks[feature] = [tuple(p) for p in xy]
+    return landmarks
+
+
+def run(frames):
+    check = LivenessCheck()
+    state = "pending"
+    for landmarks in frames:
+        state, _ = check.update(FRAME, LOCATION, landmarks)
+        if state != "pending":
+            break
+    return state
+
+
+def test_eye_aspect_ratio_of_model_eye():
+    assert eye_aspect_ratio([p[:2] for p in _eye(0, 0.3)]) == pytest.approx(0.3)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_static_face_with_landmark_jitter_is_not_live(seed):
+    rng = np.random.default_rng(seed)
+    model = face_model()
+    assert run([project(model, noise=1.0, rng=rng) for _ in range(20)]) != "live"
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_moving_photo_is_not_live(seed):
+    rng = np.random.default_rng(seed)
+    model = face_model()
+    frames = [project(model, yaw=yaw, flat=True, noise=1.0, rng=rng) for yaw in np.linspace(0, 25, 20)]
+    assert run(frames) != "live"
+
+
+def test_blink_is_live():
+    rng = np.random.default_rng(0)
+    ears = [0.3] * 6 + [0.08, 0.08, 0.08] + [0.3] * 6
+    frames = [project(face_model(ear), noise=0.5, rng=rng) for ear in ears]
+    assert run(frames) == "live"
+
+
+def test_single_closed_frame_is_not_a_blink():
+    rng = np.random.default_rng(0)
+    ears = ([0.3] * 4 + [0.08]) * 4
+    assert run([project(face_model(ear), noise=0.3, rng=rng) for ear in ears]) != "live"
+
+
+def test_head_turn_is_live():
+    rng = np.random.default_rng(0)
+    model = face_model()
+    frames = [project(model, yaw=yaw, noise=0.5, rng=rng) for yaw in np.linspace(0, 20, 15)]
+    assert run(frames) == "live"
+
+
+def test_no_cue_ends_as_spoof():
+    model = face_model()
+    assert run([project(model) for _ in range(30)]) == "spoof"
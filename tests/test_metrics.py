@@ -0,0 +1,35 @@
+import threading
+from metrics import MetricsRegistry
+
+
+def test_snapshot_while_observing_from_other_threads():
+    registry = MetricsRegistry(enabled=True, window=50)
+    stop = threading.Event()
+
+    def observe():
+        while not stop.is_set():
+            registry.observe("detect", 1.0)
+    threads = [threading.Thread(target=observe) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(2000):
+            stats = registry.snapshot()["stages"].get("detect")
+            if stats and "p50" in stats:
+                assert stats["p50"] == 1.0
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert registry.snapshot()["stages"]["detect"]["count"] > 0
+
+
+def test_prometheus_text_reports_counters_once():
+    registry = MetricsRegistry(enabled=True)
+    registry.count("frames")
+    registry.count("faces", 2)
+    registry.observe("match", 3.0)
+    text = registry.prometheus_text()
+    assert "face_frames_total 1\n" in text
+    assert "face_faces_total 2\n" in text
+    assert 'face_stage_milliseconds_count{stage="match"} 1' in text
@@ -0,0 +1,60 @@
+import numpy as np
+import metrics
+from face_gallery import FaceGallery
+from face_index import make_index
+from simulator import Simulator, VirtualClock, generate_script, synthetic_people
+
+
+class ListWriter:
+    def __init__(self):
+        self.events = []
+
+    def write(self, event):
+        self.events.append(event)
+
+    def stats(self):
+        return {"written": len(self.events), "batches": 0, "dropped": 0}
+
+
+def simulate(events, users=10):
+    people = synthetic_people(users)
+    gallery = FaceGallery(capacity=len(people), index=make_index("brute"))
+    gallery.add_many(list(people), np.array(list(people.values())))
+    clock = VirtualClock(start=0.0)
+    simulator = Simulator(gallery, people, ListWriter(), clock)
+    metrics.REGISTRY.reset()
+    simulator.run(events)
+    return simulator, simulator.report(clock(), 1.0)
+
+
+def test_generated_script_is_sorted_and_reproducible():
+    users = list(synthetic_people(5))
+    script = generate_script(users, hours=2, arrivals_per_hour=60, outages=1, seed=3)
+    assert script == generate_script(users, hours=2, arrivals_per_hour=60, outages=1, seed=3)
+    assert [event["at"] for event in script] == sorted(event["at"] for event in script)
+    assert all(0 <= event["at"] for event in script)
+    assert sum(event["type"] == "power_outage" for event in script) == 1
+    # Poisson arrivals: about 60 an hour
+    assert 80 < sum(event["type"] == "arrival" for event in script) < 160
+
+
+def test_synthetic_arrivals_are_granted_and_intruders_are_not():
+    events = [{"at": 10 * i, "type": "arrival", "user": f"user{i % 10}"} for i in range(20)]
+    events += [{"at": 5 + 10 * i, "type": "intruder", "person": i % 2} for i in range(6)]
+    simulator, report = simulate(sorted(events, key=lambda event: event["at"]))
+    assert report["events"] == {"arrival": 20, "intruder": 6}
+    assert report["outcomes"].get("granted") == 20
+    assert report["errors"] == {}
+    # Two strangers keep coming back: two incidents, not six
+    assert report["incidents"]["incidents"] == 2
+    assert report["decision_ms"]["count"] == 26
+    # Virtual time: a few seconds of frames per attempt, not the real run time
+    assert report["simulated_s"] >= 55
+
+
+def test_arrivals_queue_behind_a_busy_door():
+    events = [{"at": 0, "type": "arrival", "user": "user1"}, {"at": 0, "type": "arrival", "user": "user2"}]
+    simulator, report = simulate(events)
+    assert simulator.wait_ms[0] == 0
+    assert simulator.wait_ms[1] > 0
+    assert report["outcomes"] == {"granted": 2}
@@ -0,0 +1,140 @@
+import time
+import threading
+from collections import deque
+import cv2
+import numpy as np
+from face_gallery import EMBEDDING_DIM
+
+# Unknown Face Clustering Configuration
+CLUSTER_RADIUS = 0.5  # Max distance to an incident's centroid to count as the same stranger
+MAX_INCIDENTS = 50  # Incidents kept, least recently seen evicted first
+SAMPLES_PER_INCIDENT = 10  # Encodings kept per incident (bounds the buffer to 500 vectors)
+MIN_SAMPLE_DISTANCE = 0.05  # Near-duplicate encodings only bump the sighting count
+THUMBNAIL_SIZE = 96  # Pixels, square crop of the best sighting
+
+
+def face_thumbnail(frame, location, size=THUMBNAIL_SIZE, margin=0.2):
+    """Square BGR crop around one face, with a little context"""
+    top, right, bottom, left = location
+    pad = int(max(bottom - top, right - left) * margin)
+    height, width = frame.shape[:2]
+    crop = frame[max(0, top - pad):min(height, bottom + pad), max(0, left - pad):min(width, right + pad)]
+    if crop.size == 0:
+        return None
+    return cv2.resize(crop, (size, size), interpolation=cv2.INTER_AREA)
+
+
+class UnknownFaceClusters:
+    """Leader clustering of unrecognized face encodings into incidents
+
+    Each encoding joins the incident whose centroid is nearest, if within
+    radius, or starts a new one. Incidents keep a few sample encodings, a
+    thumbnail of their largest sighting and the cameras they were seen on.
+    """
+
+    def __init__(self, radius=CLUSTER_RADIUS, max_incidents=MAX_INCIDENTS,
+                 samples_per_incident=SAMPLES_PER_INCIDENT, clock=time.time):
+        self.radius = radius
+        self.max_incidents = max_incidents
+        self.samples_per_incident = samples_per_incident
+        self.clock = clock
+        self._incidents = {}  # id -> incident, insertion ordered
+        self._centroids = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+        self._ids = []  # incident id of each centroid row
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self.sightings = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._incidents)
+
+    def _nearest(self, encoding):
+        if not self._ids:
+            return None, None
+        dists = np.linalg.norm(self._centroids - encoding, axis=1)
+        row = int(np.argmin(dists))
+        return row, float(dists[row])
+
+    def match(self, encoding):
+        """Incident this encoding belongs to, without recording a sighting"""
+        encoding = np.asarray(encoding, dtype=np.float32)
+        with self._lock:
+            row, distance = self._nearest(encoding)
+            if row is not None and distance <= self.radius:
+                return self._incidents[self._ids[row]]
+        return None
+
+    def add(self, encoding, frame=None, location=None, camera=None):
+        """Record one sighting, returns (incident, is_new)"""
+        encoding = np.asarray(encoding, dtype=np.float32).reshape(EMBEDDING_DIM)
+        now = self.clock()
+        area = (location[2] - location[0]) * (location[1] - location[3]) if location else 0
+        with self._lock:
+            self.sightings += 1
+            row, distance = self._nearest(encoding)
+            if row is not None and distance <= self.radius:
+                incident = self._incidents[self._ids[row]]
+                incident["count"] += 1
+                incident["last_seen"] = now
+                if camera is not None:
+                    incident["cameras"].add(camera)
+                incident["_sum"] += encoding
+                self._centroids[row] = incident["_sum"] / incident["count"]
+                samples = incident["samples"]
+                if min(np.linalg.norm(np.array(samples) - encoding, axis=1)) >= MIN_SAMPLE_DISTANCE:
+                    samples.append(encoding)
+                    incident["scores"].append(area)
+                if frame is not None and area > incident["thumbnail_area"]:
+                    incident["thumbnail"] = face_thumbnail(frame, location)
+                    incident["thumbnail_area"] = area
+                return incident, False
+
+            incident = {
+                "id": self._next_id,
+                "first_seen": now,
+                "last_seen": now,
+                "count": 1,
+                "cameras": {camera} if camera is not None else set(),
+                "samples": deque([encoding], maxlen=self.samples_per_incident),
+                "scores": deque([area], maxlen=self.samples_per_incident),
+                "thumbnail": face_thumbnail(frame, location) if frame is not None and location else None,
+                "thumbnail_area": area,
+                "_sum": encoding.astype(np.float64),
+            }
+            self._next_id += 1
+            self._incidents[incident["id"]] = incident
+            self._centroids = np.vstack([self._centroids, encoding[None, :]])
+            self._ids.append(incident["id"])
+            if len(self._incidents) > self.max_incidents:
+                stalest = min(self._incidents.values(), key=lambda i: i["last_seen"])
+                self._remove(stalest["id"])
+                self.evicted += 1
+            return incident, True
+
+    def _remove(self, incident_id):
+        incident = self._incidents.pop(incident_id, None)
+        if incident is not None:
+            row = self._ids.index(incident_id)
+            del self._ids[row]
+            self._centroids = np.delete(self._centroids, row, axis=0)
+        return incident
+
+    def remove(self, incident_id):
+        """Drop an incident (dismissed, or promoted into the face database) and return it"""
+        with self._lock:
+            return self._remove(incident_id)
+
+    def incidents(self):
+        """Incidents, most recently seen first"""
+        with self._lock:
+            return sorted(self._incidents.values(), key=lambda i: i["last_seen"], reverse=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "incidents": len(self._incidents),
+                "sightings": self.sightings,
+                "samples": sum(len(i["samples"]) for i in self._incidents.values()),
+                "evicted": self.evicted,
+            }